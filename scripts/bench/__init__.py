@@ -0,0 +1 @@
+"""Benchmark and test support for the admin scripts; not used by the scripts themselves."""
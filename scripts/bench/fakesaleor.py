@@ -0,0 +1,1247 @@
+"""In-process stand-in for the subset of Saleor's GraphQL API the scripts use.
+
+``FakeSaleor`` serves a seeded catalog (channel, product types, the
+property attributes, ``products`` generated properties) from memory over
+HTTP, with an optional fixed latency per request, so scripts and the
+benchmark can run without a real Saleor::
+
+    with FakeSaleor(products=1000, latency=0.01) as server:
+        client = SaleorClient(url=server.url)
+
+It also serves deterministic images under ``/images/<name>`` (with ETags)
+for the media ingest. Run ``python -m bench.fakesaleor`` (from scripts/) to
+start one on a fixed port.
+
+Only what the scripts need is implemented: a small GraphQL parser
+(operations, aliases, arguments, variables; no fragments or directives),
+cursor connections, the mutations' happy paths and their common input
+errors. Stored collections are immutable tuples that mutations replace,
+never update in place, so seeded products can share them.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from vilaasa_admin import config
+from vilaasa_admin.metrics import operation_name
+
+CHOICE_TYPES = ("DROPDOWN", "MULTISELECT", "SWATCH")
+MAX_PAGE_SIZE = 100
+# Root mutations that work without a token.
+PUBLIC_MUTATIONS = {"tokenCreate", "tokenRefresh"}
+
+PROPERTY_ATTRIBUTES = (
+    ("location", "Location", "PLAIN_TEXT", ()),
+    ("country", "Country", "PLAIN_TEXT", ()),
+    ("property-type", "Property Type", "DROPDOWN", ("Residential", "Commercial", "Luxury Villa", "Franchise")),
+    ("status", "Status", "DROPDOWN", ("Ready to Move", "Under Construction")),
+    ("total-area", "Total Area", "PLAIN_TEXT", ()),
+    ("configuration", "Configuration", "PLAIN_TEXT", ()),
+    ("possession", "Possession", "PLAIN_TEXT", ()),
+    ("rental-yield", "Rental Yield", "PLAIN_TEXT", ()),
+    ("appreciation", "Appreciation", "PLAIN_TEXT", ()),
+    ("amenities", "Amenities", "MULTISELECT", ("Swimming Pool", "Fitness Center")),
+)
+FRANCHISE_ATTRIBUTES = ("location", "country", "property-type", "status", "rental-yield")
+# The stray duplicates the fix_* scripts clean up, at their real PKs.
+DUPLICATE_VALUES = (("property-type", 175, "Franchise"), ("status", 176, "Under Construction"),
+                    ("status", 180, "Ready to Move"))
+
+
+class GraphQLError(Exception):
+    """A top-level GraphQL error (``errors`` of the response)."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+    def as_dict(self, path=None):
+        error = {"message": str(self)}
+        if path:
+            error["path"] = path
+        if self.code:
+            error["extensions"] = {"exception": {"code": self.code}}
+        return error
+
+
+class InputError(Exception):
+    """A mutation-level error (``errors`` of the mutation payload)."""
+
+    def __init__(self, field, message, code="INVALID"):
+        super().__init__(message)
+        self.error = {"field": field, "path": field, "message": message, "code": code}
+
+
+# Parsing
+
+Field = namedtuple("Field", "alias name args selections")
+Variable = namedtuple("Variable", "name")
+Operation = namedtuple("Operation", "type defaults selections")
+
+_TOKEN = re.compile(r'''
+    (?P<skip>[\s,]+|\#[^\n]*)
+  | (?P<block>"""[\s\S]*?""")
+  | (?P<string>"(?:\\.|[^"\\\n])*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z]\w*)
+  | (?P<punct>\.\.\.|[!$():=@\[\]{}|&])
+''', re.VERBOSE)
+
+
+def _tokenize(source):
+    position = 0
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            raise GraphQLError(f"Syntax Error: Unexpected character {source[position]!r}.")
+        position = match.end()
+        if match.lastgroup != "skip":
+            yield match.lastgroup, match.group()
+
+
+class _Parser:
+    def __init__(self, source):
+        self.tokens = list(_tokenize(source))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def next(self):
+        if self.position >= len(self.tokens):
+            raise GraphQLError("Syntax Error: Unexpected <EOF>.")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, text):
+        kind, found = self.next()
+        if found != text:
+            raise GraphQLError(f"Syntax Error: Expected {text}, found {found}.")
+
+    def name(self):
+        kind, text = self.next()
+        if kind != "name":
+            raise GraphQLError(f"Syntax Error: Expected Name, found {text}.")
+        return text
+
+    def document(self):
+        if self.peek() == "{":
+            operation = Operation("query", {}, self.selection_set())
+        else:
+            kind = self.name()
+            if kind not in ("query", "mutation"):
+                raise GraphQLError(f"Unsupported operation: {kind}.")
+            if self.peek() not in ("(", "{"):
+                self.name()
+            defaults = {}
+            if self.peek() == "(":
+                self.next()
+                while self.peek() != ")":
+                    self.expect("$")
+                    name = self.name()
+                    self.expect(":")
+                    self.type_reference()
+                    if self.peek() == "=":
+                        self.next()
+                        defaults[name] = self.value()
+                self.next()
+            operation = Operation(kind, defaults, self.selection_set())
+        if self.position != len(self.tokens):
+            raise GraphQLError("Only single-operation documents are supported.")
+        return operation
+
+    def type_reference(self):
+        if self.peek() == "[":
+            self.next()
+            self.type_reference()
+            self.expect("]")
+        else:
+            self.name()
+        if self.peek() == "!":
+            self.next()
+
+    def selection_set(self):
+        self.expect("{")
+        fields = []
+        while self.peek() != "}":
+            if self.peek() in ("...", "@"):
+                raise GraphQLError("Fragments and directives are not supported.")
+            fields.append(self.field())
+        self.next()
+        return tuple(fields)
+
+    def field(self):
+        alias = name = self.name()
+        if self.peek() == ":":
+            self.next()
+            name = self.name()
+        args = {}
+        if self.peek() == "(":
+            self.next()
+            while self.peek() != ")":
+                arg = self.name()
+                self.expect(":")
+                args[arg] = self.value()
+            self.next()
+        selections = self.selection_set() if self.peek() == "{" else None
+        return Field(alias, name, args, selections)
+
+    def value(self):
+        kind, text = self.next()
+        if text == "$":
+            return Variable(self.name())
+        if text == "[":
+            items = []
+            while self.peek() != "]":
+                items.append(self.value())
+            self.next()
+            return items
+        if text == "{":
+            fields = {}
+            while self.peek() != "}":
+                key = self.name()
+                self.expect(":")
+                fields[key] = self.value()
+            self.next()
+            return fields
+        if kind == "string":
+            return json.loads(text)
+        if kind == "block":
+            return text[3:-3]
+        if kind == "number":
+            return float(text) if re.search(r"[.eE]", text) else int(text)
+        if kind == "name":
+            # Enum values are passed on as their names.
+            return {"true": True, "false": False, "null": None}.get(text, text)
+        raise GraphQLError(f"Syntax Error: Unexpected {text}.")
+
+
+@lru_cache(maxsize=512)
+def parse(source):
+    """Parse a document into an ``Operation`` (cached: scripts resend the same ones)."""
+    return _Parser(source).document()
+
+
+def _substitute(value, variables):
+    if isinstance(value, Variable):
+        return variables.get(value.name)
+    if isinstance(value, list):
+        return [_substitute(v, variables) for v in value]
+    if isinstance(value, dict):
+        return {k: _substitute(v, variables) for k, v in value.items()}
+    return value
+
+
+def project(value, selections, variables):
+    """Select ``selections`` from a stored node (dicts, tuples and callables)."""
+    if value is None or selections is None:
+        return list(value) if isinstance(value, tuple) else value
+    if isinstance(value, (list, tuple)):
+        return [project(item, selections, variables) for item in value]
+    result = {}
+    for field in selections:
+        computed = COMPUTED_FIELDS.get((value.get("__typename"), field.name))
+        if computed:
+            item = computed(value, **_substitute(field.args, variables))
+        else:
+            item = value.get(field.name)
+            if callable(item):
+                item = item(**_substitute(field.args, variables))
+        result[field.alias] = project(item, field.selections, variables)
+    return result
+
+
+def _selected_attribute(product, slug):
+    return next((e for e in product["attributes"] if e["attribute"]["slug"] == slug), None)
+
+
+def _taxed(money):
+    """A ``TaxedMoney`` without tax."""
+    if money is None:
+        return None
+    zero = {"amount": 0.0, "currency": money["currency"]}
+    return {"gross": money, "net": money, "tax": zero, "currency": money["currency"]}
+
+
+def _variant_price(variant):
+    # One channel: its listing is the one the storefront's channel argument picks.
+    return next((listing["price"] for listing in variant["channelListings"]), None)
+
+
+def _variant_pricing(variant, **_):
+    price = _taxed(_variant_price(variant))
+    return price and {"onSale": False, "discount": None, "price": price, "priceUndiscounted": price}
+
+
+def _product_pricing(product, **_):
+    prices = sorted((p for p in map(_variant_price, product["variants"]) if p), key=lambda p: p["amount"])
+    if not prices:
+        return None
+    price_range = {"start": _taxed(prices[0]), "stop": _taxed(prices[-1])}
+    return {"onSale": False, "discount": None, "displayGrossPrices": True,
+            "priceRange": price_range, "priceRangeUndiscounted": price_range}
+
+
+# Fields computed from a node's data rather than stored on it.
+COMPUTED_FIELDS = {
+    ("Product", "attribute"): _selected_attribute,
+    ("Product", "pricing"): _product_pricing,
+    ("ProductVariant", "pricing"): _variant_pricing,
+}
+
+
+# Helpers
+
+def global_id(type_name, pk):
+    return base64.b64encode(f"{type_name}:{pk}".encode()).decode()
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-") or "item"
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def connection(items, first=None, after=None, last=None, **_):
+    """Page ``items`` like a Relay connection; cursors are list positions."""
+    if first is None and last is None:
+        raise GraphQLError("You must provide a `first` or `last` value to properly paginate the connection.")
+    size = first if first is not None else last
+    if size > MAX_PAGE_SIZE:
+        raise GraphQLError(f"Requesting {size} records exceeds the `first` limit of {MAX_PAGE_SIZE} records.")
+    start = int(base64.b64decode(after)) + 1 if after else 0
+    page = items[start:start + size]
+    end = start + len(page)
+    return {
+        "totalCount": len(items),
+        "pageInfo": {
+            "hasNextPage": end < len(items),
+            "hasPreviousPage": start > 0,
+            "startCursor": _cursor(start) if page else None,
+            "endCursor": _cursor(end - 1) if page else after,
+        },
+        "edges": [{"cursor": _cursor(start + i), "node": node} for i, node in enumerate(page)],
+    }
+
+
+def _cursor(position):
+    return base64.b64encode(str(position).encode()).decode()
+
+
+def _jwt(claims):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode(claims)}.fake"
+
+
+def _claims(token):
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return None
+
+
+def _money(amount):
+    return {"amount": float(amount), "currency": "USD"} if amount is not None else None
+
+
+def _merge_metadata(items, updates):
+    merged = {item["key"]: item["value"] for item in items}
+    merged.update((item["key"], str(item["value"])) for item in updates or [])
+    return tuple({"key": k, "value": v} for k, v in merged.items())
+
+
+# Store
+
+class Store:
+    """The catalog: every node by global ID, products also by slug."""
+
+    def __init__(self, products=0, media_root="/media"):
+        self.nodes = {}
+        self.types = defaultdict(dict)
+        self.products = {}
+        self.skus = set()
+        self.media_root = media_root
+        self.version = 0
+        self._counters = Counter()
+        self._lists = {}
+        self._lists_version = 0
+        self.lock = threading.RLock()
+        self._seed(products)
+
+    def _new(self, type_name, pk=None, register=True, **fields):
+        if pk is None:
+            self._counters[type_name] += 1
+            pk = self._counters[type_name]
+        node = {"__typename": type_name, "id": global_id(type_name, pk), **fields}
+        if register:
+            self._register(node)
+        return node
+
+    def _register(self, node):
+        self.nodes[node["id"]] = node
+        self.types[node["__typename"]][node["id"]] = node
+
+    def _unregister(self, node):
+        del self.nodes[node["id"]]
+        del self.types[node["__typename"]][node["id"]]
+
+    def _get(self, node_id, type_name, field):
+        node = self.nodes.get(node_id)
+        if node is None or node["__typename"] != type_name:
+            raise InputError(field, f"Couldn't resolve to a node: {node_id}", "NOT_FOUND")
+        return node
+
+    def _touch(self, product):
+        product["updatedAt"] = now().isoformat()
+        self.version += 1
+
+    # Seeding
+
+    def _seed(self, count):
+        self.channel = self._new("Channel", slug=config.CHANNEL_SLUG, name="Default Channel",
+                                 currencyCode="USD", isActive=True)
+        self.category = self._new("Category", slug="real-estate", name="Real Estate", parent=None, level=0)
+        attributes = {}
+        for slug, name, input_type, values in PROPERTY_ATTRIBUTES:
+            attribute = attributes[slug] = self.create_attribute(
+                {"slug": slug, "name": name, "inputType": input_type, "type": "PRODUCT_TYPE"})
+            for value in values:
+                self.create_value(attribute, {"name": value})
+        for slug, pk, name in DUPLICATE_VALUES:
+            self._add_value(attributes[slug], name, f"{slugify(name)}-2", pk=pk)
+        self._counters["AttributeValue"] = max(pk for _, pk, _ in DUPLICATE_VALUES)
+
+        self.property_type = self._new("ProductType", slug="luxury-property", name="Luxury Property", hasVariants=False,
+                                       productAttributes=tuple(attributes.values()))
+        self._new("ProductType", slug="franchise", name="Franchise", hasVariants=False,
+                  productAttributes=tuple(attributes[slug] for slug in FRANCHISE_ATTRIBUTES))
+
+        # Seeded products share their (immutable) collections and timestamp.
+        def entry(slug, value_slug):
+            value = next(v for v in attributes[slug]["_values"] if v["slug"] == value_slug)
+            return {"attribute": attributes[slug], "values": (value,)}
+
+        residential = entry("property-type", "residential")
+        attribute_sets = {
+            "ready-to-move": (residential, entry("status", "ready-to-move")),
+            "under-construction": (residential, entry("status", "under-construction")),
+            # 1% of products carry each stray duplicate.
+            "ready-to-move-2": (residential, entry("status", "ready-to-move-2")),
+            "under-construction-2": (residential, entry("status", "under-construction-2")),
+            "franchise-2": (entry("property-type", "franchise-2"), entry("status", "ready-to-move")),
+        }
+        duplicates = {0: "under-construction-2", 1: "ready-to-move-2", 2: "franchise-2"}
+        created = now().isoformat()
+        for i in range(1, count + 1):
+            kind = duplicates.get(i % 100) or ("under-construction" if i % 2 else "ready-to-move")
+            product = self._new(
+                "Product", slug=f"property-{i}", name=f"Property {i}", description=None,
+                created=created, updatedAt=created, productType=self.property_type, category=self.category,
+                attributes=attribute_sets[kind], variants=(), channelListings=(), metadata=(),
+                privateMetadata=(), media=(),
+            )
+            self.products[product["slug"]] = product
+
+    # Attributes
+
+    def create_attribute(self, row):
+        slug = row.get("slug") or slugify(row["name"])
+        if any(a["slug"] == slug for a in self.types["Attribute"].values()):
+            raise InputError("slug", "Attribute with this Slug already exists.", "UNIQUE")
+        attribute = self._new("Attribute", slug=slug, name=row["name"], inputType=row.get("inputType", "DROPDOWN"),
+                              type=row.get("type", "PRODUCT_TYPE"), valueRequired=row.get("valueRequired", False),
+                              _values=[])
+        attribute["choices"] = partial(self._choices, attribute)
+        for value in row.get("values") or []:
+            self.create_value(attribute, value)
+        return attribute
+
+    def _choices(self, attribute, filter=None, **kwargs):
+        if attribute["inputType"] not in CHOICE_TYPES:
+            return None
+        values = attribute["_values"]
+        if filter and filter.get("search"):
+            search = filter["search"].lower()
+            values = [v for v in values if search in v["name"].lower() or search in v["slug"]]
+        if filter and filter.get("slugs"):
+            values = [v for v in values if v["slug"] in filter["slugs"]]
+        return connection(values, **kwargs)
+
+    def _add_value(self, attribute, name, slug, pk=None, **fields):
+        value = self._new("AttributeValue", pk=pk, name=name, slug=slug, value="", plainText=None, richText=None,
+                          inputType=attribute["inputType"], _attribute=attribute, **fields)
+        attribute["_values"].append(value)
+        return value
+
+    def create_value(self, attribute, row):
+        slug = row.get("slug") or slugify(row["name"])
+        if any(v["slug"] == slug for v in attribute["_values"]):
+            raise InputError("slug", "Attribute value with this Slug already exists.", "UNIQUE")
+        return self._add_value(attribute, row["name"], slug)
+
+    def value_for(self, attribute, name):
+        """Saleor's ``values`` / ``{value: ...}`` input: look up by slug, else create."""
+        slug = slugify(name)
+        for value in attribute["_values"]:
+            if value["slug"] == slug:
+                return value
+        return self._add_value(attribute, str(name), slug)
+
+    def delete_value(self, value):
+        attribute = value["_attribute"]
+        attribute["_values"] = [v for v in attribute["_values"] if v is not value]
+        self._unregister(value)
+        self._strip_products(lambda entry: entry["attribute"] is attribute and value in entry["values"],
+                             lambda entry: {**entry, "values": tuple(v for v in entry["values"] if v is not value)})
+
+    def delete_attribute(self, attribute):
+        for value in attribute["_values"]:
+            self._unregister(value)
+        self._unregister(attribute)
+        for node in self.types["ProductType"].values():
+            if attribute in node["productAttributes"]:
+                node["productAttributes"] = tuple(a for a in node["productAttributes"] if a is not attribute)
+        self._strip_products(lambda entry: entry["attribute"] is attribute, lambda entry: None)
+
+    def _strip_products(self, matches, replace):
+        for product in self.products.values():
+            if any(matches(entry) for entry in product["attributes"]):
+                entries = (replace(e) if matches(e) else e for e in product["attributes"])
+                product["attributes"] = tuple(e for e in entries if e is not None)
+                self._touch(product)
+
+    def _input_values(self, product, attribute, row):
+        """Resolve one ``AttributeValueInput`` to a tuple of value nodes."""
+        kind = attribute["inputType"]
+        legacy = row.get("values")
+        if kind not in CHOICE_TYPES:
+            text = next((row[k] for k in ("plainText", "richText", "numeric") if row.get(k) is not None), None)
+            if text is None and legacy:
+                text = legacy[0]
+            if text in (None, ""):
+                return ()
+            # Non-choice values belong to one product and are not choices.
+            return (self._new(
+                "AttributeValue", register=False, name=str(text)[:250], slug=f"{product['id']}_{attribute['id']}",
+                value="", inputType=kind, plainText=row.get("plainText") or (text if kind == "PLAIN_TEXT" else None),
+                richText=row.get("richText"), _attribute=attribute,
+            ),)
+
+        if row.get("dropdown") is not None:
+            refs = [row["dropdown"]]
+        elif row.get("swatch") is not None:
+            refs = [row["swatch"]]
+        elif row.get("multiselect") is not None:
+            refs = row["multiselect"]
+        else:
+            refs = [{"value": name} for name in legacy or []]
+        values = []
+        for ref in refs:
+            if ref.get("id"):
+                value = self.nodes.get(ref["id"])
+                if value is None or value.get("_attribute") is not attribute:
+                    raise InputError("attributes", f"Value {ref['id']} is not a choice of {attribute['slug']}.")
+            elif ref.get("value") is not None:
+                value = self.value_for(attribute, ref["value"])
+            else:
+                continue
+            values.append(value)
+        if kind != "MULTISELECT" and len(values) > 1:
+            raise InputError("attributes", f"Attribute {attribute['slug']} must take only one value.")
+        return tuple(values)
+
+    def _set_attributes(self, product, rows):
+        entries = {e["attribute"]["id"]: e for e in product["attributes"]}
+        allowed = product["productType"]["productAttributes"]
+        for row in rows:
+            attribute = self._get(row.get("id"), "Attribute", "attributes")
+            if attribute not in allowed:
+                raise InputError("attributes", f"Attribute {attribute['slug']} is not assigned to this product type.")
+            entries[attribute["id"]] = {"attribute": attribute, "values": self._input_values(product, attribute, row)}
+        product["attributes"] = tuple(entries.values())
+
+    # Products
+
+    def filtered_products(self, filter=None, search=None):
+        """Products matching ``filter``; cached until the next product change."""
+        if self._lists_version != self.version:
+            self._lists, self._lists_version = {}, self.version
+        key = json.dumps([filter or {}, search], sort_keys=True)
+        items = self._lists.get(key)
+        if items is None:
+            items = self._lists[key] = self._filter(filter or {}, search)
+        return items
+
+    def _filter(self, f, search):
+        if f.get("slugs") is not None:
+            items = [self.products[s] for s in dict.fromkeys(f["slugs"]) if s in self.products]
+        else:
+            items = list(self.products.values())
+        if f.get("ids") is not None:
+            ids = set(f["ids"])
+            items = [p for p in items if p["id"] in ids]
+        search = search or f.get("search")
+        if search:
+            search = search.lower()
+            items = [p for p in items if search in p["name"].lower() or search in p["slug"]]
+        for key in ("productTypes", "categories"):
+            if f.get(key):
+                ids = set(f[key])
+                field = "productType" if key == "productTypes" else "category"
+                items = [p for p in items if (p[field] or {}).get("id") in ids]
+        updated = f.get("updatedAt") or {}
+        if updated.get("gte"):
+            since = datetime.fromisoformat(updated["gte"])
+            items = [p for p in items if datetime.fromisoformat(p["updatedAt"]) >= since]
+        if updated.get("lte"):
+            until = datetime.fromisoformat(updated["lte"])
+            items = [p for p in items if datetime.fromisoformat(p["updatedAt"]) <= until]
+        for condition in f.get("attributes") or []:
+            slugs = set(condition.get("values") or [])
+            items = [p for p in items if any(
+                e["attribute"]["slug"] == condition["slug"] and (not slugs or any(v["slug"] in slugs for v in e["values"]))
+                for e in p["attributes"]
+            )]
+        return items
+
+    def product(self, id=None, slug=None):
+        product = self.nodes.get(id) if id else self.products.get(slug)
+        return product if product and product["__typename"] == "Product" else None
+
+    def create_product(self, row):
+        slug = row.get("slug") or slugify(row["name"])
+        if slug in self.products:
+            raise InputError("slug", "Product with this Slug already exists.", "UNIQUE")
+        product_type = self._get(row.get("productType"), "ProductType", "productType")
+        category = self._get(row["category"], "Category", "category") if row.get("category") else None
+        timestamp = now().isoformat()
+        product = self._new(
+            "Product", register=False, slug=slug, name=row.get("name") or slug, description=None,
+            created=timestamp, updatedAt=timestamp, productType=product_type, category=category,
+            attributes=(), variants=(), channelListings=(), metadata=(), privateMetadata=(), media=(),
+        )
+        self._update_product(product, row)
+        for listing in row.get("channelListings") or []:
+            self.update_listings(product, {"updateChannels": [listing]})
+        try:
+            for variant in row.get("variants") or []:
+                self.create_variant(product, variant)
+        except InputError:
+            for variant in product["variants"]:
+                self.skus.discard(variant["sku"])
+                self._unregister(variant)
+            raise
+        self._register(product)
+        self.products[slug] = product
+        self.version += 1
+        return product
+
+    def _update_product(self, product, row):
+        if row.get("name"):
+            product["name"] = row["name"]
+        if "description" in row:
+            description = row["description"]
+            product["description"] = json.dumps(description) if isinstance(description, dict) else description
+        if row.get("category"):
+            product["category"] = self._get(row["category"], "Category", "category")
+        if row.get("attributes") is not None:
+            self._set_attributes(product, row["attributes"])
+        if row.get("metadata"):
+            product["metadata"] = _merge_metadata(product["metadata"], row["metadata"])
+        if row.get("privateMetadata"):
+            product["privateMetadata"] = _merge_metadata(product["privateMetadata"], row["privateMetadata"])
+
+    def update_product(self, product, row):
+        if row.get("slug") and row["slug"] != product["slug"]:
+            if row["slug"] in self.products:
+                raise InputError("slug", "Product with this Slug already exists.", "UNIQUE")
+            # Re-insert under the new slug.
+            del self.products[product["slug"]]
+            product["slug"] = row["slug"]
+            self.products[product["slug"]] = product
+        self._update_product(product, row)
+        self._touch(product)
+        return product
+
+    def delete_product(self, product):
+        del self.products[product["slug"]]
+        self._unregister(product)
+        for variant in product["variants"]:
+            self.skus.discard(variant["sku"])
+            self._unregister(variant)
+        for media in product["media"]:
+            self._unregister(media)
+        self.version += 1
+        return product
+
+    def update_listings(self, product, row):
+        listings = {l["channel"]["id"]: l for l in product["channelListings"]}
+        for update in row.get("updateChannels") or []:
+            channel = self._get(update.get("channelId"), "Channel", "channelId")
+            listing = dict(listings.get(channel["id"]) or {
+                "channel": channel, "isPublished": False, "visibleInListings": False,
+                "isAvailableForPurchase": False, "availableForPurchaseAt": None, "publishedAt": None,
+            })
+            listing.update((k, v) for k, v in update.items() if k != "channelId")
+            if "isAvailableForPurchase" in update and update.get("availableForPurchaseAt") is None:
+                listing["availableForPurchaseAt"] = now().isoformat() if update["isAvailableForPurchase"] else None
+            listings[channel["id"]] = listing
+        for channel_id in row.get("removeChannels") or []:
+            listings.pop(channel_id, None)
+        product["channelListings"] = tuple(listings.values())
+        self._touch(product)
+        return product
+
+    # Variants
+
+    def create_variant(self, product, row):
+        sku = row.get("sku")
+        if sku and sku in self.skus:
+            raise InputError("sku", "Product variant with this SKU already exists.", "UNIQUE")
+        variant = self._new("ProductVariant", sku=sku, name=row.get("name") or "", product=product,
+                            attributes=(), channelListings=())
+        if sku:
+            self.skus.add(sku)
+        if row.get("channelListings"):
+            self.update_variant_listings(variant, row["channelListings"])
+        product["variants"] = product["variants"] + (variant,)
+        self._touch(product)
+        return variant
+
+    def update_variant_listings(self, variant, rows):
+        listings = {l["channel"]["id"]: l for l in variant["channelListings"]}
+        for row in rows:
+            channel = self._get(row.get("channelId"), "Channel", "channelId")
+            if row.get("price") is None:
+                raise InputError("price", "This field is required.", "REQUIRED")
+            listings[channel["id"]] = {"channel": channel, "price": _money(row["price"]),
+                                       "costPrice": _money(row.get("costPrice"))}
+        variant["channelListings"] = tuple(listings.values())
+        self._touch(variant["product"])
+        return variant
+
+    # Media and metadata
+
+    def create_media(self, product, row):
+        image = row.get("image")
+        if not image and not row.get("mediaUrl"):
+            raise InputError("input", "Image or external URL is required.", "REQUIRED")
+        self._counters["ProductMedia"] += 1
+        pk = self._counters["ProductMedia"]
+        url = f"{self.media_root}/{pk}/{image['filename']}" if image else row["mediaUrl"]
+        media = self._new("ProductMedia", pk=pk, alt=row.get("alt") or "", url=url, type="IMAGE",
+                          sortOrder=len(product["media"]), product=product, _image=image)
+        product["media"] = product["media"] + (media,)
+        self._touch(product)
+        return media
+
+    def delete_media(self, media):
+        product = media["product"]
+        product["media"] = tuple(m for m in product["media"] if m is not media)
+        self._unregister(media)
+        self._touch(product)
+        return media
+
+    def update_metadata(self, node, items, key="metadata"):
+        node[key] = _merge_metadata(node.get(key) or (), items)
+        if node["__typename"] == "Product":
+            self._touch(node)
+        return node
+
+    def delete_metadata(self, node, keys, key="metadata"):
+        node[key] = tuple(item for item in node.get(key) or () if item["key"] not in keys)
+        if node["__typename"] == "Product":
+            self._touch(node)
+        return node
+
+
+# Schema
+
+class Schema:
+    """Root query and mutation resolvers over a ``Store``."""
+
+    def __init__(self, store, email, password, token_ttl):
+        self.store = store
+        self.email = email
+        self.password = password
+        self.token_ttl = token_ttl
+        self.tokens = set()
+        self.queries = {
+            "channels": self.channels, "channel": self.channel,
+            "productTypes": self.product_types, "productType": self.node_query("ProductType"),
+            "categories": self.categories, "category": self.category,
+            "attributes": self.attributes, "attribute": self.attribute,
+            "products": self.products, "product": self.product,
+            "productVariant": self.node_query("ProductVariant"),
+        }
+        self.mutations = {
+            "tokenCreate": self.token_create, "tokenRefresh": self.token_refresh,
+            "categoryCreate": self.category_create, "categoryUpdate": self.category_update,
+            "attributeCreate": self.attribute_create, "attributeDelete": self.attribute_delete,
+            "attributeValueCreate": self.attribute_value_create, "attributeValueDelete": self.attribute_value_delete,
+            "attributeValueBulkDelete": self.attribute_value_bulk_delete,
+            "productAttributeAssign": self.product_attribute_assign,
+            "productCreate": self.product_create, "productUpdate": self.product_update,
+            "productDelete": self.product_delete,
+            "productBulkCreate": self.product_bulk_create, "productBulkDelete": self.product_bulk_delete,
+            "productVariantCreate": self.variant_create, "productVariantBulkCreate": self.variant_bulk_create,
+            "productVariantChannelListingUpdate": self.variant_listing_update,
+            "productChannelListingUpdate": self.product_listing_update,
+            "productMediaCreate": self.media_create, "productMediaDelete": self.media_delete,
+            "updateMetadata": partial(self.metadata_update, key="metadata"),
+            "updatePrivateMetadata": partial(self.metadata_update, key="privateMetadata"),
+            "deleteMetadata": partial(self.metadata_delete, key="metadata"),
+            "deletePrivateMetadata": partial(self.metadata_delete, key="privateMetadata"),
+        }
+
+    def execute(self, query, variables=None, authorization=None):
+        """Run one document and return the response dict (``data``/``errors``)."""
+        try:
+            operation = parse(query or "")
+        except GraphQLError as e:
+            return {"errors": [e.as_dict()]}
+        variables = {**operation.defaults, **(variables or {})}
+        roots = self.mutations if operation.type == "mutation" else self.queries
+        try:
+            self.authorize(operation, authorization)
+        except GraphQLError as e:
+            return {"data": None, "errors": [e.as_dict()]}
+
+        data, errors = {}, []
+        with self.store.lock:
+            for field in operation.selections:
+                resolver = roots.get(field.name)
+                try:
+                    if resolver is None:
+                        raise GraphQLError(f"Cannot query field '{field.name}' on type '{operation.type.title()}'.")
+                    value = resolver(**_substitute(field.args, variables))
+                    data[field.alias] = project(value, field.selections, variables)
+                except GraphQLError as e:
+                    data[field.alias] = None
+                    errors.append(e.as_dict([field.alias]))
+                except (KeyError, TypeError) as e:
+                    data[field.alias] = None
+                    errors.append({"message": f"Invalid input: {e}", "path": [field.alias]})
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def authorize(self, operation, authorization):
+        token = authorization.split(" ", 1)[-1] if authorization else None
+        if token:
+            claims = _claims(token)
+            if claims is None:
+                raise GraphQLError("Invalid token.", "DecodeError")
+            if claims.get("exp", 0) < time.time():
+                raise GraphQLError("Signature has expired", "ExpiredSignatureError")
+            if token not in self.tokens:
+                raise GraphQLError("Signature verification failed", "InvalidSignatureError")
+        elif operation.type == "mutation" and any(f.name not in PUBLIC_MUTATIONS for f in operation.selections):
+            raise GraphQLError("You need one of the following permissions: MANAGE_PRODUCTS", "PermissionDenied")
+
+    def _issue(self, kind, ttl):
+        issued = int(time.time())
+        token = _jwt({"iat": issued, "exp": issued + ttl, "email": self.email, "type": kind, "jti": uuid.uuid4().hex})
+        self.tokens.add(token)
+        return token
+
+    # Queries
+
+    def node_query(self, type_name):
+        def resolve(id=None, **_):
+            node = self.store.nodes.get(id)
+            return node if node and node["__typename"] == type_name else None
+        return resolve
+
+    def _of_type(self, type_name):
+        return list(self.store.types[type_name].values())
+
+    def channels(self):
+        return self._of_type("Channel")
+
+    def channel(self, id=None, slug=None):
+        return next((c for c in self._of_type("Channel") if c["id"] == id or c["slug"] == slug), None)
+
+    def product_types(self, filter=None, **kwargs):
+        return connection(self._of_type("ProductType"), **kwargs)
+
+    def categories(self, filter=None, level=None, **kwargs):
+        items = self._of_type("Category")
+        if level is not None:
+            items = [c for c in items if c["level"] == level]
+        return connection(items, **kwargs)
+
+    def category(self, id=None, slug=None):
+        return next((c for c in self._of_type("Category") if c["id"] == id or c["slug"] == slug), None)
+
+    def attributes(self, filter=None, search=None, **kwargs):
+        items = self._of_type("Attribute")
+        if filter and filter.get("slugs"):
+            items = [a for a in items if a["slug"] in filter["slugs"]]
+        search = search or (filter or {}).get("search")
+        if search:
+            items = [a for a in items if search.lower() in a["name"].lower() or search.lower() in a["slug"]]
+        return connection(items, **kwargs)
+
+    def attribute(self, id=None, slug=None):
+        return next((a for a in self._of_type("Attribute") if a["id"] == id or a["slug"] == slug), None)
+
+    def products(self, filter=None, search=None, channel=None, sortBy=None, where=None, **kwargs):
+        return connection(self.store.filtered_products(filter, search), **kwargs)
+
+    def product(self, id=None, slug=None, channel=None, **_):
+        return self.store.product(id, slug)
+
+    # Mutations
+
+    def _payload(self, key, resolve, *args):
+        try:
+            return {key: resolve(*args), "errors": []}
+        except InputError as e:
+            return {key: None, "errors": [e.error]}
+
+    def token_create(self, email, password):
+        if email != self.email or password != self.password:
+            return {"token": None, "refreshToken": None,
+                    "errors": [InputError("email", "Please, enter valid credentials", "INVALID_CREDENTIALS").error]}
+        return {"token": self._issue("access", self.token_ttl), "refreshToken": self._issue("refresh", 30 * 86400),
+                "user": {"email": self.email}, "errors": []}
+
+    def token_refresh(self, refreshToken=None, **_):
+        claims = _claims(refreshToken or "")
+        if refreshToken not in self.tokens or not claims or claims.get("exp", 0) < time.time():
+            return {"token": None, "errors": [InputError("refreshToken", "Invalid refresh token", "JWT_INVALID_TOKEN").error]}
+        return {"token": self._issue("access", self.token_ttl), "errors": []}
+
+    def category_create(self, input, parent=None):
+        def create():
+            parent_node = self.store._get(parent, "Category", "parent") if parent else None
+            slug = input.get("slug") or slugify(input["name"])
+            if any(c["slug"] == slug for c in self._of_type("Category")):
+                raise InputError("slug", "Category with this Slug already exists.", "UNIQUE")
+            return self.store._new("Category", slug=slug, name=input["name"], parent=parent_node,
+                                   level=parent_node["level"] + 1 if parent_node else 0)
+        return self._payload("category", create)
+
+    def category_update(self, id, input):
+        def update():
+            category = self.store._get(id, "Category", "id")
+            category.update((k, input[k]) for k in ("name", "slug") if input.get(k))
+            return category
+        return self._payload("category", update)
+
+    def attribute_create(self, input):
+        return self._payload("attribute", self.store.create_attribute, input)
+
+    def attribute_delete(self, id):
+        def delete():
+            attribute = self.store._get(id, "Attribute", "id")
+            self.store.delete_attribute(attribute)
+            return attribute
+        return self._payload("attribute", delete)
+
+    def attribute_value_create(self, attribute, input):
+        def create():
+            return self.store.create_value(self.store._get(attribute, "Attribute", "attribute"), input)
+        payload = self._payload("attributeValue", create)
+        payload["attribute"] = self.store.nodes.get(attribute)
+        return payload
+
+    def attribute_value_delete(self, id):
+        def delete():
+            value = self.store._get(id, "AttributeValue", "id")
+            self.store.delete_value(value)
+            return value
+        return self._payload("attributeValue", delete)
+
+    def attribute_value_bulk_delete(self, ids):
+        values = [self.store.nodes.get(i) for i in ids]
+        if any(v is None or v["__typename"] != "AttributeValue" for v in values):
+            return {"count": 0, "errors": [InputError("ids", "Couldn't resolve every value.", "NOT_FOUND").error]}
+        for value in values:
+            self.store.delete_value(value)
+        return {"count": len(values), "errors": []}
+
+    def product_attribute_assign(self, productTypeId, operations):
+        def assign():
+            product_type = self.store._get(productTypeId, "ProductType", "productTypeId")
+            for operation in operations:
+                attribute = self.store._get(operation["id"], "Attribute", "operations")
+                if attribute in product_type["productAttributes"]:
+                    raise InputError("operations", f"{attribute['slug']} is already assigned.", "ATTRIBUTE_ALREADY_ASSIGNED")
+                product_type["productAttributes"] = product_type["productAttributes"] + (attribute,)
+            return product_type
+        return self._payload("productType", assign)
+
+    def product_create(self, input):
+        return self._payload("product", self.store.create_product, input)
+
+    def product_update(self, id, input):
+        def update():
+            return self.store.update_product(self.store._get(id, "Product", "id"), input)
+        return self._payload("product", update)
+
+    def product_delete(self, id):
+        return self._payload("product", lambda: self.store.delete_product(self.store._get(id, "Product", "id")))
+
+    def product_bulk_create(self, products, errorPolicy="REJECT_EVERYTHING"):
+        results, created = [], []
+        for index, row in enumerate(products):
+            try:
+                product = self.store.create_product(row)
+                created.append(product)
+                results.append({"product": product, "errors": []})
+            except InputError as e:
+                results.append({"product": None, "errors": [{**e.error, "index": index}]})
+        if errorPolicy == "REJECT_EVERYTHING" and len(created) < len(products):
+            for product in created:
+                self.store.delete_product(product)
+            results = [{"product": None, "errors": r["errors"]} for r in results]
+            created = []
+        return {"count": len(created), "results": results, "errors": []}
+
+    def product_bulk_delete(self, ids):
+        products = [self.store.nodes.get(i) for i in ids]
+        if any(p is None or p["__typename"] != "Product" for p in products):
+            return {"count": 0, "errors": [InputError("ids", "Couldn't resolve every product.", "NOT_FOUND").error]}
+        for product in products:
+            self.store.delete_product(product)
+        return {"count": len(products), "errors": []}
+
+    def variant_create(self, input):
+        def create():
+            return self.store.create_variant(self.store._get(input.get("product"), "Product", "product"), input)
+        return self._payload("productVariant", create)
+
+    def variant_bulk_create(self, product, variants, errorPolicy=None):
+        try:
+            node = self.store._get(product, "Product", "product")
+            created = [self.store.create_variant(node, row) for row in variants]
+        except InputError as e:
+            return {"count": 0, "productVariants": [], "results": [], "errors": [e.error]}
+        return {"count": len(created), "productVariants": created,
+                "results": [{"productVariant": v, "errors": []} for v in created], "errors": []}
+
+    def variant_listing_update(self, id, input):
+        def update():
+            return self.store.update_variant_listings(self.store._get(id, "ProductVariant", "id"), input)
+        return self._payload("variant", update)
+
+    def product_listing_update(self, id, input):
+        def update():
+            return self.store.update_listings(self.store._get(id, "Product", "id"), input)
+        return self._payload("product", update)
+
+    def media_create(self, input):
+        def create():
+            return self.store.create_media(self.store._get(input.get("product"), "Product", "product"), input)
+        payload = self._payload("media", create)
+        payload["product"] = self.store.nodes.get(input.get("product"))
+        return payload
+
+    def media_delete(self, id):
+        def delete():
+            return self.store.delete_media(self.store._get(id, "ProductMedia", "id"))
+        payload = self._payload("media", delete)
+        payload["product"] = payload["media"] and payload["media"]["product"]
+        return payload
+
+    def metadata_update(self, id, input, key):
+        node = self.store.nodes.get(id)
+        if node is None:
+            return {"item": None, "errors": [InputError("id", f"Couldn't resolve to a node: {id}", "NOT_FOUND").error]}
+        return {"item": self.store.update_metadata(node, input, key), "errors": []}
+
+    def metadata_delete(self, id, keys, key):
+        node = self.store.nodes.get(id)
+        if node is None:
+            return {"item": None, "errors": [InputError("id", f"Couldn't resolve to a node: {id}", "NOT_FOUND").error]}
+        return {"item": self.store.delete_metadata(node, keys, key), "errors": []}
+
+
+# HTTP
+
+def parse_multipart(body, content_type):
+    """Decode a GraphQL multipart request into its operations, files inlined."""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    fields, files = {}, {}
+    for part in body.split(b"--" + boundary)[1:-1]:
+        head, _, content = part[2:].partition(b"\r\n\r\n")
+        content = content[:-2]
+        headers = head.decode()
+        name = re.search(r'name="([^"]*)"', headers).group(1)
+        filename = re.search(r'filename="([^"]*)"', headers)
+        if filename:
+            content_type = re.search(r"Content-Type: *([^\r\n]+)", headers, re.IGNORECASE)
+            files[name] = {
+                "filename": filename.group(1),
+                "contentType": content_type.group(1) if content_type else "application/octet-stream",
+                "size": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+            }
+        else:
+            fields[name] = content.decode()
+    operations = json.loads(fields["operations"])
+    for key, paths in json.loads(fields.get("map") or "{}").items():
+        for path in paths:
+            *parents, last = path.split(".")
+            target = operations
+            for step in parents:
+                target = target[int(step)] if isinstance(target, list) else target[step]
+            target[last] = files.get(key)
+    return operations
+
+
+def image_bytes(name, size):
+    """Deterministic pseudo-image content for ``/images/<name>``."""
+    seed = hashlib.sha256(name.encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server.fake
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        content_type = self.headers.get("Content-Type", "")
+        try:
+            if content_type.startswith("multipart/form-data"):
+                payload = parse_multipart(body, content_type)
+            else:
+                payload = json.loads(body)
+        except (ValueError, KeyError, IndexError, AttributeError) as e:
+            self._send(400, json.dumps({"errors": [{"message": f"Unable to parse request: {e}"}]}).encode())
+            return
+        server.count(operation_name(payload.get("query")))
+        server.wait()
+        result = server.schema.execute(payload.get("query"), payload.get("variables"), self.headers.get("Authorization"))
+        self._send(200, json.dumps(result).encode())
+
+    def do_GET(self):
+        server = self.server.fake
+        match = re.match(r"^/images/([\w.-]+)$", self.path.split("?")[0])
+        if not match:
+            self._send(404, b"Not found", "text/plain")
+            return
+        server.count("GET /images")
+        server.wait()
+        etag = '"%s"' % hashlib.sha1(match.group(1).encode()).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers={"ETag": etag})
+            return
+        self._send(200, image_bytes(match.group(1), server.image_size), "image/jpeg", {"ETag": etag})
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class FakeSaleor:
+    """A threaded HTTP server answering GraphQL from an in-memory ``Store``.
+
+    ``latency`` seconds are added to every request (outside the store lock,
+    so concurrent requests overlap like against a real server). ``requests``
+    counts requests by GraphQL operation name.
+    """
+
+    def __init__(self, products=0, latency=0.0, host="127.0.0.1", port=0, image_size=64 * 1024,
+                 email=None, password=None, token_ttl=300):
+        self.latency = latency
+        self.image_size = image_size
+        self.requests = Counter()
+        self._counter_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+        self.schema = Schema(None, email or config.ADMIN_EMAIL, password or config.ADMIN_PASSWORD, token_ttl)
+        self.reset(products)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/graphql/"
+
+    def image_url(self, name):
+        return f"{self.base_url}/images/{name}"
+
+    def reset(self, products=0):
+        """Replace the catalog with a freshly seeded one and zero the counters."""
+        self.schema.store = Store(products, media_root=f"{self.base_url}/media")
+        with self._counter_lock:
+            self.requests.clear()
+
+    @property
+    def store(self):
+        return self.schema.store
+
+    def count(self, operation):
+        with self._counter_lock:
+            self.requests[operation] += 1
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Saleor GraphQL API from memory.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--products", type=int, default=100, help="number of seeded properties")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args(argv)
+    server = FakeSaleor(args.products, args.latency, args.host, args.port)
+    print(f"Fake Saleor with {args.products} products at {server.url}")
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark the admin scripts against an in-process fake Saleor.
+
+    python benchmark.py                                  # every scenario at 10, 1k and 100k products
+    python benchmark.py --sizes 10,1000 --latency 0.02 fix-status setup-amenities
+    python benchmark.py --output bench.json              # also write the results as JSON
+
+Each scenario runs in a fresh child process with an empty local cache
+(cold registry, no cached token) against a freshly seeded catalog
+(see ``bench/fakesaleor.py``). Reported per run: wall time,
+requests served (GraphQL plus image downloads) and the child's peak RSS.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from bench.fakesaleor import FakeSaleor
+
+SCENARIOS = {
+    "seed-franchises": "recreate_franchises_v2:main",
+    "recreate-franchises-bulk": "benchmark:recreate_franchises_bulk",
+    "fix-status": "fix_status_values:run_fix",
+    "setup-amenities": "setup_amenities:run_setup",
+    "upload-media": "benchmark:upload_media",
+    "export": "benchmark:export_jsonl",
+}
+SIZES = (10, 1000, 100000)
+# Distinct images behind the catalog; products beyond that share them.
+IMAGE_COUNT = 50
+
+
+def recreate_franchises_bulk(client):
+    """The productBulkCreate path; it fails if the run adds attribute values."""
+    from recreate_franchises_v2 import main
+
+    main(client, bulk=True)
+
+
+def upload_media(client):
+    """Attach an image to every product, as upload_images_to_backend does for its map."""
+    from vilaasa_admin import iter_products
+    from vilaasa_admin.media import MEDIA_FIELDS, MediaIndex, ingest
+
+    products = {p["id"]: p for p in iter_products(client, "slug " + MEDIA_FIELDS)}
+    base = client.url.rsplit("/graphql/", 1)[0]
+    items = [(product_id, f"{base}/images/{i % IMAGE_COUNT}.jpg", f"Image for {product['slug']}")
+             for i, (product_id, product) in enumerate(products.items())]
+    index = MediaIndex(products)
+    failed = sum(1 for _, _, payload, error in ingest(client, items, index=index) if error or payload["errors"])
+    index.save(client)
+    print(f"{len(items) - failed} images attached, {failed} failed.")
+
+
+def export_jsonl(client):
+    """Export the catalog to compressed JSONL in a throwaway file."""
+    from vilaasa_admin.export import export_catalog
+
+    with tempfile.TemporaryDirectory() as directory:
+        count = export_catalog(client, os.path.join(directory, "catalog.jsonl.gz"), workers=2)
+    print(f"{count} products exported.")
+
+
+def _run(target, conn, quiet):
+    # Runs in the child: SALEOR_URL and VILAASA_CACHE_DIR come from the parent.
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+    from vilaasa_admin.cli import load
+    from vilaasa_admin.client import get_client
+
+    error = None
+    started = time.perf_counter()
+    try:
+        load(target)(get_client())
+    except BaseException as e:  # scripts exit() on missing prerequisites
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+    conn.send((elapsed, peak_rss(), error))
+    conn.close()
+
+
+def peak_rss():
+    """Peak resident set size of this process, in bytes."""
+    # The child is forked from the harness before exec; ru_maxrss survives
+    # the exec (and so counts the fake's catalog), VmHWM does not.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_scenario(server, name, size, quiet=True):
+    """Run one scenario against a reseeded ``server``; return a result dict."""
+    server.reset(size)
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["SALEOR_URL"] = server.url
+        os.environ["VILAASA_CACHE_DIR"] = cache_dir
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run, args=(SCENARIOS[name], sender, quiet))
+        process.start()
+        sender.close()
+        try:
+            elapsed, peak, error = receiver.recv()
+        except EOFError:
+            elapsed, peak, error = None, None, "child died"
+        process.join()
+    return {
+        "scenario": name,
+        "products": size,
+        "seconds": elapsed,
+        "requests": sum(server.requests.values()),
+        "operations": dict(server.requests),
+        "peak_bytes": peak,
+        "error": error or (f"exit code {process.exitcode}" if process.exitcode else None),
+    }
+
+
+def format_results(results):
+    header = f"{'scenario':<26} {'products':>9} {'wall s':>9} {'requests':>9} {'peak MB':>8}  top operations"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        top = ", ".join(f"{op} {n}" for op, n in sorted(r["operations"].items(), key=lambda i: -i[1])[:3])
+        if r["error"]:
+            top = f"FAILED: {r['error']}"
+        seconds = f"{r['seconds']:.2f}" if r["seconds"] is not None else "-"
+        peak = f"{r['peak_bytes'] / 2 ** 20:.1f}" if r["peak_bytes"] is not None else "-"
+        lines.append(f"{r['scenario']:<26} {r['products']:>9} {seconds:>9} {r['requests']:>9} {peak:>8}  {top}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the admin scripts against a fake Saleor.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated catalog sizes")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake server adds to every request")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    with FakeSaleor(latency=args.latency) as server:
+        for size in (int(s) for s in args.sizes.split(",")):
+            for name in args.scenarios or SCENARIOS:
+                results.append(run_scenario(server, name, size, quiet=not args.verbose))
+                print(format_results(results[-1:]).splitlines()[-1], flush=True)
+    print()
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 #!/bin/bash
 
 # Complete script to create attribute values and products
+# (Superseded by `scripts/vilaasa-admin setup`, which reconciles the same
+# catalog in one process; see scripts/seed_properties.py.)
 
 BASE_URL="http://localhost:8000/graphql/"
 
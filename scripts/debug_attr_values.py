@@ -1,42 +1,17 @@
 
-import requests
-import json
+from vilaasa_admin import AttributeCatalog, get_client
 
-SALEOR_URL = "http://localhost:8000/graphql/"
+SEARCH = "Amenities"
 
-QUERY = """
-query {
-  attributes(first: 50, search: "Amenities") {
-    edges {
-      node {
-        id
-        slug
-        inputType
-        choices(first: 20) {
-          edges {
-            node {
-              id
-              name
-              slug
-            }
-          }
-        }
-      }
-    }
-  }
-}
-"""
-
-def run_query():
-    response = requests.post(SALEOR_URL, json={'query': QUERY})
-    data = response.json()
-    if 'data' in data and 'attributes' in data['data']:
-        for edge in data['data']['attributes']['edges']:
-            attr = edge['node']
-            print(f"Attribute: {attr['slug']} ({attr['id']}) | Type: {attr['inputType']}")
-            for val_edge in attr['choices']['edges']:
-                val = val_edge['node']
-                print(f"  - Value: '{val['name']}' (Slug: '{val['slug']}', ID: '{val['id']}')")
+def run_query(client):
+    # Every choice is listed, not just the first 20
+    catalog = AttributeCatalog(client).load()
+    for attr in catalog.attributes.values():
+        if SEARCH.lower() not in attr['name'].lower() and SEARCH.lower() not in attr['slug']:
+            continue
+        print(f"Attribute: {attr['slug']} ({attr['id']}) | Type: {attr['inputType']}")
+        for val in attr['choices']:
+            print(f"  - Value: '{val['name']}' (Slug: '{val['slug']}', ID: '{val['id']}')")
 
 if __name__ == "__main__":
-    run_query()
+    run_query(get_client(authenticate=False))
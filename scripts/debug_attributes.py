@@ -1,8 +1,5 @@
 
-import requests
-import json
-
-SALEOR_URL = "http://localhost:8000/graphql/"
+from vilaasa_admin import SaleorError, get_client
 
 QUERY = """
 query {
@@ -17,13 +14,13 @@ query {
 }
 """
 
-def run_query():
-    response = requests.post(SALEOR_URL, json={'query': QUERY})
-    if response.status_code != 200:
-        print("Error fetching data:", response.status_code)
+def run_query(client):
+    try:
+        data = client.execute(QUERY)
+    except SaleorError as e:
+        print("Error fetching data:", e)
         return
 
-    data = response.json()
     if 'errors' in data:
         print("GraphQL Errors:", data['errors'])
         return
@@ -34,4 +31,4 @@ def run_query():
         print(f"Slug: {product['slug']} | Name: {product['name']}")
 
 if __name__ == "__main__":
-    run_query()
+    run_query(get_client(authenticate=False))
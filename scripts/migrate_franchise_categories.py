@@ -1,102 +1,87 @@
-import requests
-import json
-
-SALEOR_API_URL = "http://localhost:8000/graphql/"
-AUTH_EMAIL = "superadmin@example.com"
-AUTH_PASS = "admin123"
-
-def get_token():
-    query = 'mutation { tokenCreate(email: "%s", password: "%s") { token } }' % (AUTH_EMAIL, AUTH_PASS)
-    res = requests.post(SALEOR_API_URL, json={'query': query})
-    return res.json()['data']['tokenCreate']['token']
-
-TOKEN = get_token()
-HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
-
-def run_query(query, variables=None):
-    res = requests.post(SALEOR_API_URL, json={'query': query, 'variables': variables}, headers=HEADERS)
-    if res.status_code != 200:
-        print("HTTP Error:", res.text)
-        return None
-    return res.json()
-
-# 1. Create Parent Category "Franchises"
-print("Setting up Categories...")
-# Check if exists
-cat_res = run_query('query { categories(first: 20) { edges { node { id name slug } } } }')
-PARENT_ID = next((e['node']['id'] for e in cat_res['data']['categories']['edges'] if e['node']['slug'] == "franchises"), None)
-
-if not PARENT_ID:
-    print("Creating Parent 'Franchises'...")
-    create_res = run_query('mutation { categoryCreate(input: { name: "Franchises", slug: "franchises" }) { category { id } } }')
-    PARENT_ID = create_res['data']['categoryCreate']['category']['id']
-print(f"Parent Category: {PARENT_ID}")
-
-# 2. Create Subcategories and Map Products
-MAPPING = {
-    "wellness": ["wellness-resorts-kerala", "zen-wellness-goa", "ayur-wellness-bangalore"],
-    "spa": ["carlton-wellness-spa"],
-    "resort": ["colton-resort-chennai"],
-    "saloon": ["luxe-saloon-mumbai"],
-    "hotel": ["wellness-bangalore"]
-}
-
-# Values from previous step were capitalized (Wellness, Spa...), but logic implies handling slugs or names. 
-# I will create proper Display Name categories.
-
-CATEGORY_NAMES = {
-    "wellness": "Wellness",
-    "spa": "Spa",
-    "resort": "Resort",
-    "saloon": "Saloon",
-    "hotel": "Hotel"
-}
-
-for key, products in MAPPING.items():
-    cat_name = CATEGORY_NAMES[key]
-    cat_slug = f"franchise-{key}"
-    
-    # Check/Create Subcategory
-    sub_id = None
-    # Assuming we can just create and catch error or check existing (lazy check in this script for speed)
-    # Better to check if existing under parent, but global slug check is enough
-    
-    sub_res = run_query(f'query {{ category(slug: "{cat_slug}") {{ id }} }}')
-    if sub_res['data']['category']:
-        sub_id = sub_res['data']['category']['id']
-    else:
-        print(f"Creating {cat_name}...")
-        # Fix: parent is a separate argument, not inside input
-        c_res = run_query(f'mutation {{ categoryCreate(parent: "{PARENT_ID}", input: {{ name: "{cat_name}", slug: "{cat_slug}" }}) {{ category {{ id }} }} }}')
-        
-        if 'errors' in c_res['data']['categoryCreate'] and c_res['data']['categoryCreate']['errors']:
-             print("Error creating category:", c_res['data']['categoryCreate']['errors'])
-             continue
-             
-        sub_id = c_res['data']['categoryCreate']['category']['id']
-    
-    print(f"Category {cat_name}: {sub_id}")
-    
-    # Move Products
-    for prod_slug in products:
-        print(f"Moving {prod_slug} to {cat_name}...")
-        p_res = run_query(f'query {{ product(slug: "{prod_slug}") {{ id }} }}')
-        if p_res['data']['product']:
-            pid = p_res['data']['product']['id']
-            # Update Category
-            run_query(f'mutation {{ productUpdate(id: "{pid}", input: {{ category: "{sub_id}" }}) {{ product {{ id }} }} }}')
-        else:
+from add_franchise_category import load_franchise_categories
+from vilaasa_admin import get_client, run_concurrently
+from vilaasa_admin.batch import resolve_products
+from vilaasa_admin.registry import get_registry
+
+def run_migration(client):
+    registry = get_registry(client)
+
+    def run_query(query, variables=None):
+        return client.execute(query, variables)
+
+    # 1. Create Parent Category "Franchises"
+    print("Setting up Categories...")
+    # Check if exists
+    PARENT_ID = registry.id("category", slug="franchises")
+
+    if not PARENT_ID:
+        print("Creating Parent 'Franchises'...")
+        create_res = run_query('mutation { categoryCreate(input: { name: "Franchises", slug: "franchises" }) { category { id } } }')
+        PARENT_ID = create_res['data']['categoryCreate']['category']['id']
+        registry.record("category", PARENT_ID, slug="franchises", name="Franchises")
+    print(f"Parent Category: {PARENT_ID}")
+
+    # 2. Create Subcategories and Map Products
+    # Category names are the franchise-category values (Wellness, Spa...);
+    # data/franchise_categories.csv maps each franchise to one.
+    MAPPING = {}
+    for prod_slug, cat_name in load_franchise_categories():
+        MAPPING.setdefault(cat_name, []).append(prod_slug)
+
+    MOVES = []
+
+    for cat_name, products in MAPPING.items():
+        cat_slug = f"franchise-{cat_name.lower()}"
+
+        # Check/Create Subcategory
+        sub_id = None
+        # Assuming we can just create and catch error or check existing (lazy check in this script for speed)
+        # Better to check if existing under parent, but global slug check is enough
+
+        sub_id = registry.id("category", slug=cat_slug)
+        if not sub_id:
+            print(f"Creating {cat_name}...")
+            # Fix: parent is a separate argument, not inside input
+            c_res = run_query(f'mutation {{ categoryCreate(parent: "{PARENT_ID}", input: {{ name: "{cat_name}", slug: "{cat_slug}" }}) {{ category {{ id }} }} }}')
+
+            if 'errors' in c_res['data']['categoryCreate'] and c_res['data']['categoryCreate']['errors']:
+                 print("Error creating category:", c_res['data']['categoryCreate']['errors'])
+                 continue
+
+            sub_id = c_res['data']['categoryCreate']['category']['id']
+            registry.record("category", sub_id, slug=cat_slug, name=cat_name, parent=PARENT_ID)
+
+        print(f"Category {cat_name}: {sub_id}")
+
+        MOVES.extend((prod_slug, cat_name, sub_id) for prod_slug in products)
+
+    # Move Products (one aliased lookup, then all updates concurrently)
+    found = resolve_products(client, [prod_slug for prod_slug, _, _ in MOVES])
+
+    update_query = 'mutation Move($id: ID!, $category: ID!) { productUpdate(id: $id, input: { category: $category }) { product { id } errors { message } } }'
+    updates = []
+    for prod_slug, cat_name, sub_id in MOVES:
+        if not found[prod_slug]:
             print(f"Product {prod_slug} not found.")
+            continue
+        updates.append((prod_slug, cat_name, (update_query, {"id": found[prod_slug]['id'], "category": sub_id})))
+
+    results = run_concurrently(client, [job for _, _, job in updates])
+    for (prod_slug, cat_name, _), (data, error) in zip(updates, results):
+        errors = error or data['productUpdate']['errors']
+        print(f"Moved {prod_slug} to {cat_name}" + (f": {errors}" if errors else "."))
+
+    # 3. Remove "Franchise Category" Attribute
+    print("Cleaning up old attribute...")
+    attr_id = registry.id("attribute", slug="franchise-category")
+    if attr_id:
+        # Unassign from Product Type first?
+        # Actually deleting the attribute automatically unassigns it.
+        print(f"Deleting attribute {attr_id}...")
+        run_query(f'mutation {{ attributeDelete(id: "{attr_id}") {{ attribute {{ id }} }} }}')
+        registry.forget("attribute", attr_id)
+
+    print("Migration Done.")
 
-# 3. Remove "Franchise Category" Attribute
-print("Cleaning up old attribute...")
-attr_res = run_query('query { attribute(slug: "franchise-category") { id } }')
-if attr_res['data']['attribute']:
-    attr_id = attr_res['data']['attribute']['id']
-    
-    # Unassign from Product Type first?
-    # Actually deleting the attribute automatically unassigns it.
-    print(f"Deleting attribute {attr_id}...")
-    run_query(f'mutation {{ attributeDelete(id: "{attr_id}") {{ attribute {{ id }} }} }}')
-
-print("Migration Done.")
+if __name__ == "__main__":
+    run_migration(get_client())
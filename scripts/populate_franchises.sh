@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# (Superseded by `scripts/vilaasa-admin import scripts/data/franchises.csv`, which
+# validates the rows first and only sends what differs from the live catalog.)
+
 # Saleor GraphQL Endpoint
 SALEOR_API_URL="http://localhost:8000/graphql/"
 
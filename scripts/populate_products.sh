@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# (Superseded by `scripts/vilaasa-admin import scripts/data/properties.csv`, which
+# validates the rows first and only sends what differs from the live catalog.)
+
 # Saleor Property Data Population Script - Fixed Version
 # Description must be in EditorJS JSON format
 
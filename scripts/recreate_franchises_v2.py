@@ -1,183 +1,150 @@
-import requests
 import json
-import re
-
-SALEOR_API_URL = "http://localhost:8000/graphql/"
-AUTH_EMAIL = "superadmin@example.com"
-AUTH_PASS = "admin123"
-
-# Authentication
-def get_token():
-    query = """
-    mutation {
-      tokenCreate(email: "%s", password: "%s") {
-        token
-      }
+import os
+import sys
+
+from vilaasa_admin import AttributeCatalog, SaleorError, get_client, iter_connection
+from vilaasa_admin.attributes import ATTRIBUTE_CHOICES_QUERY
+from vilaasa_admin.bulk import bulk_create_products, bulk_delete_products, find_products_by_slug
+from vilaasa_admin.config import CHANNEL_SLUG
+from vilaasa_admin.importer import RowValidator, import_catalog, read_rows
+from vilaasa_admin.journal import Journal
+from vilaasa_admin.registry import get_registry
+
+FRANCHISES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "franchises.csv")
+PUBLISH_AT = "2025-01-01T00:00:00+00:00"
+
+def load_ids(client, catalog):
+    """Resolve the IDs the recreate paths need; attributes come from ``catalog``."""
+    registry = get_registry(client)
+    ids = {
+        "property-type": catalog.attribute_id("property-type"),
+        "status": catalog.attribute_id("status"),
+        "location": catalog.attribute_id("location"),
+        "country": catalog.attribute_id("country"),
+        "rental-yield": catalog.attribute_id("rental-yield"),
+        # Category ID (Real Estate)
+        "category": registry.id("category", slug="real-estate"),
+        # Product Type (Franchise)
+        "product_type": registry.id("product_type", name="Franchise"),
+        "channel": registry.id("channel", slug=CHANNEL_SLUG),
     }
-    """ % (AUTH_EMAIL, AUTH_PASS)
-    response = requests.post(SALEOR_API_URL, json={'query': query})
-    data = response.json()
-    return data['data']['tokenCreate']['token']
-
-TOKEN = get_token()
-HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
-
-def run_query(query, variables=None):
-    payload = {'query': query}
-    if variables:
-        payload['variables'] = variables
-    response = requests.post(SALEOR_API_URL, json=payload, headers=HEADERS)
-    if response.status_code != 200:
-        raise Exception(f"Query failed: {response.text}")
-    return response.json()
-
-# IDs
-PROPERTY_TYPE_ATTR = "QXR0cmlidXRlOjM="
-STATUS_ATTR = "QXR0cmlidXRlOjQ="
-LOCATION_ATTR = "QXR0cmlidXRlOjE="
-COUNTRY_ATTR = "QXR0cmlidXRlOjI="
-YIELD_ATTR = "QXR0cmlidXRlOjk="
-
-# Fetch Category ID (Real Estate)
-cat_res = run_query('query { category(slug: "real-estate") { id } }')
-CATEGORY_ID = cat_res['data']['category']['id']
-print(f"Category ID: {CATEGORY_ID}")
-
-# Fetch Product Type (Franchise)
-pt_res = run_query('query { productTypes(first: 20) { edges { node { id name } } } }')
-FRANCHISE_PT_ID = next((edge['node']['id'] for edge in pt_res['data']['productTypes']['edges'] if edge['node']['name'] == "Franchise"), None)
-print(f"Franchise Product Type ID: {FRANCHISE_PT_ID}")
-
-if not FRANCHISE_PT_ID:
-    print("Franchise Product Type not found! Check previous steps.")
-    exit(1)
-
-# Ensure Attributes Assigned
-assign_query = """
-mutation {
-  productAttributeAssign(productTypeId: "%s", operations: [
-    { id: "%s", type: PRODUCT },
-    { id: "%s", type: PRODUCT },
-    { id: "%s", type: PRODUCT },
-    { id: "%s", type: PRODUCT },
-    { id: "%s", type: PRODUCT }
-  ]) {
-    productType { id }
-    errors { message }
-  }
-}
-""" % (FRANCHISE_PT_ID, LOCATION_ATTR, COUNTRY_ATTR, PROPERTY_TYPE_ATTR, STATUS_ATTR, YIELD_ATTR)
-# run_query(assign_query) # Assuming assigned, but safe to skip if mostly setup
-
-# Fetch Attribute Value IDs (Correct ones)
-def get_attr_value_id(attr_id, value_name):
-    res = run_query(f'query {{ attribute(id: "{attr_id}") {{ choices(first: 50) {{ edges {{ node {{ id name slug }} }} }} }} }}')
-    for edge in res['data']['attribute']['choices']['edges']:
-        if edge['node']['name'] == value_name:
-            return edge['node']['id']
-    return None
-
-FRANCHISE_VAL_ID = get_attr_value_id(PROPERTY_TYPE_ATTR, "Franchise")
-READY_VAL_ID = get_attr_value_id(STATUS_ATTR, "Ready to Move")
-UNDER_CONST_VAL_ID = get_attr_value_id(STATUS_ATTR, "Under Construction")
-
-print(f"Franchise Val ID: {FRANCHISE_VAL_ID}")
-print(f"Ready Val ID: {READY_VAL_ID}")
-
-# Fetch Channel ID
-chan_res = run_query('{ channels { id } }')
-CHANNEL_ID = chan_res['data']['channels'][0]['id']
-
-def create_franchise(name, slug, location, subtype, price, roi, status_txt, features):
-    print(f"Processing {name}...")
-    
-    # Check exists
-    prod_check = run_query(f'query {{ product(slug: "{slug}") {{ id }} }}')
-    if prod_check['data']['product']:
-        old_id = prod_check['data']['product']['id']
-        print(f"Deleting existing {old_id}...")
-        run_query(f'mutation {{ productDelete(id: "{old_id}") {{ product {{ id }} }} }}')
-
-    status_val = UNDER_CONST_VAL_ID if status_txt == "Opening 2025" else READY_VAL_ID
-    
-    # Construct Description (Rich Text)
-    # Using simple paragraphs for better compatibility but structured.
-    description_json = {
-        "blocks": [
-            {
-                "type": "header",
-                "data": {"text": "Franchise Overview", "level": 2}
-            },
-            {
-                "type": "paragraph", 
-                "data": {"text": f"This is a premium {subtype} opportunity located in {location}."}
-            },
-            {
-                "type": "header",
-                "data": {"text": "Key Highlights", "level": 3}
-            },
-            {
-                "type": "list",
-                "data": {
-                    "style": "unordered",
-                    "items": [f.strip() for f in features.split(',')]
-                }
-            },
-            {
-                "type": "paragraph",
-                "data": {"text": f"Expected ROI: {roi}"}
-            }
+    print(f"Category ID: {ids['category']}")
+    print(f"Franchise Product Type ID: {ids['product_type']}")
+
+    if not ids["product_type"]:
+        print("Franchise Product Type not found! Check previous steps.")
+        exit(1)
+
+    # Attribute Value IDs (Correct ones), from the run's snapshot of all choices
+    ids["franchise_value"] = catalog.value_id("property-type", name="Franchise")
+    ids["ready_value"] = catalog.value_id("status", name="Ready to Move")
+    ids["under_construction_value"] = catalog.value_id("status", name="Under Construction")
+
+    print(f"Franchise Val ID: {ids['franchise_value']}")
+    print(f"Ready Val ID: {ids['ready_value']}")
+    missing = [key for key in ("franchise_value", "ready_value", "under_construction_value") if not ids[key]]
+    if missing:
+        raise SaleorError(f"Attribute values not found: {', '.join(missing)}")
+    return ids
+
+def load_franchises(client, catalog):
+    """The franchises in data/franchises.csv as reconcile product documents."""
+    validator = RowValidator(catalog, get_registry(client))
+    products = []
+    for line, row, problem in read_rows(FRANCHISES):
+        product, problems = (None, [problem]) if problem else validator.document(line, row)
+        if problems:
+            raise SaleorError(f"{FRANCHISES} line {line}: {'; '.join(problems)}")
+        products.append(product)
+    return products
+
+def journaled_ids(client, catalog, journal):
+    """``load_ids`` once per run: a resumed run reuses the IDs the journal recorded."""
+    return journal.step("ids", lambda: load_ids(client, catalog))
+
+def choice_values(ids, product):
+    """The resolved value IDs of a franchise's choice attributes."""
+    status = product["attributes"]["status"]
+    return {
+        "property-type": ids["franchise_value"],
+        "status": ids["under_construction_value"] if status == "Under Construction" else ids["ready_value"],
+    }
+
+def franchise_input(ids, product):
+    attributes = product["attributes"]
+    values = choice_values(ids, product)
+
+    return {
+        "name": product["name"],
+        "slug": product["slug"],
+        "category": ids["category"],
+        "productType": ids["product_type"],
+        "description": json.dumps(product["description"]),
+        "attributes": [
+            {"id": ids["location"], "plainText": attributes["location"]},
+            {"id": ids["country"], "plainText": attributes["country"]},
+            # By ID: {"value": ...} is a value *name* and would create a new value.
+            {"id": ids["property-type"], "dropdown": {"id": values["property-type"]}},
+            {"id": ids["status"], "dropdown": {"id": values["status"]}},
+            {"id": ids["rental-yield"], "plainText": attributes["rental-yield"]}
         ]
     }
-    
-    variables = {
-        "input": {
-            "name": name,
-            "slug": slug,
-            "category": CATEGORY_ID,
-            "productType": FRANCHISE_PT_ID,
-            "description": json.dumps(description_json),
-            "attributes": [
-                {"id": LOCATION_ATTR, "plainText": location},
-                {"id": COUNTRY_ATTR, "plainText": "India"},
-                {"id": PROPERTY_TYPE_ATTR, "dropdown": {"value": FRANCHISE_VAL_ID}},
-                {"id": STATUS_ATTR, "dropdown": {"value": status_val}},
-                {"id": YIELD_ATTR, "plainText": roi}
-            ]
+
+def create_franchise(client, ids, product, journal):
+    slug, price = product["slug"], product["variant"]["price"]
+    print(f"Processing {product['name']}...")
+    run_query = client.execute
+
+    def create():
+        # Check exists
+        prod_check = run_query(f'query {{ product(slug: "{slug}") {{ id }} }}')
+        if prod_check['data']['product']:
+            old_id = prod_check['data']['product']['id']
+            print(f"Deleting existing {old_id}...")
+            res = run_query(f'mutation {{ productDelete(id: "{old_id}") {{ product {{ id }} }} }}')
+            if res['data']['productDelete']['product']:
+                get_registry(client).forget("product", old_id)
+
+        variables = {"input": franchise_input(ids, product)}
+
+        create_query = """
+        mutation CreateProduct($input: ProductCreateInput!) {
+          productCreate(input: $input) {
+            product { id }
+            errors { field message }
+          }
         }
-    }
-    
-    create_query = """
-    mutation CreateProduct($input: ProductCreateInput!) {
-      productCreate(input: $input) {
-        product { id }
-        errors { field message }
-      }
-    }
-    """
-    res = run_query(create_query, variables)
-    if 'errors' in res['data']['productCreate'] and res['data']['productCreate']['errors']:
-        print("Error creating product:", res['data']['productCreate']['errors'])
+        """
+        res = run_query(create_query, variables)
+        if 'errors' in res['data']['productCreate'] and res['data']['productCreate']['errors']:
+            print("Error creating product:", res['data']['productCreate']['errors'])
+            return None
+        return res['data']['productCreate']['product']['id']
+
+    # Each step is journaled; a rerun after a crash skips the finished ones.
+    product_id = journal.step(f"create:{slug}", create, values=choice_values(ids, product))
+    if not product_id:
         return
+    print(f"Product: {product_id}")
 
-    product_id = res['data']['productCreate']['product']['id']
-    print(f"Created Product: {product_id}")
-    
-    # Create Variant
-    var_query = """
-    mutation {
-        productVariantCreate(input: { product: "%s", sku: "%s-default", attributes: [] }) {
-            productVariant { id }
-            errors { message } 
+    def create_variant():
+        var_query = """
+        mutation {
+            productVariantCreate(input: { product: "%s", sku: "%s-default", attributes: [] }) {
+                productVariant { id }
+                errors { message }
+            }
         }
-    }
-    """ % (product_id, slug)
-    var_res = run_query(var_query)
-    
-    if var_res['data']['productVariantCreate']['productVariant']:
-        var_id = var_res['data']['productVariantCreate']['productVariant']['id']
-        
-        # Price
+        """ % (product_id, slug)
+        var_res = run_query(var_query)
+        variant = var_res['data']['productVariantCreate']['productVariant']
+        return variant and variant['id']
+
+    var_id = journal.step(f"variant:{slug}", create_variant)
+    if not var_id:
+        return
+
+    def set_price():
         price_query = """
         mutation {
             productVariantChannelListingUpdate(id: "%s", input: [{ channelId: "%s", price: %s, costPrice: %s }]) {
@@ -185,29 +152,106 @@ def create_franchise(name, slug, location, subtype, price, roi, status_txt, feat
                 errors { message }
             }
         }
-        """ % (var_id, CHANNEL_ID, price, price)
-        run_query(price_query)
-        
-        # Publish
+        """ % (var_id, ids["channel"], price, price)
+        res = run_query(price_query)
+        return None if res['data']['productVariantChannelListingUpdate']['errors'] else var_id
+
+    def publish():
         pub_query = """
         mutation {
-            productChannelListingUpdate(id: "%s", input: { updateChannels: [{ channelId: "%s", isPublished: true, isAvailableForPurchase: true, availableForPurchaseAt: "2025-01-01T00:00:00+00:00", visibleInListings: true }] }) {
-                product { id } 
+            productChannelListingUpdate(id: "%s", input: { updateChannels: [{ channelId: "%s", isPublished: true, isAvailableForPurchase: true, availableForPurchaseAt: "%s", visibleInListings: true }] }) {
+                product { id }
+                errors { message }
             }
         }
-        """ % (product_id, CHANNEL_ID)
-        run_query(pub_query)
-
-# Data
-franchises = [
-    ("Wellness Resorts", "wellness-resorts-kerala", "Kerala & Pondicherry", "Wellness Resort", 7000000, "24% annually", "Opening 2025", "Authentic Ayurvedic treatments, Yoga & meditation programs, Transformative wellness journeys, 5000+ years healing wisdom"),
-    ("Carlton Wellness Spa", "carlton-wellness-spa", "Integrated Across All Properties", "Spa", 7000000, "26% annually", "Available Now", "Bespoke wellness treatments, Ayurvedic & contemporary therapies, Available at all properties, Signature Carlton experiences"),
-    ("Colton Beach Resort", "colton-resort-chennai", "Chennai ECR", "Resort", 7000000, "22% annually", "Available Now", "Beachfront location, Premium amenities, FOCO model"),
-    ("Luxe Premium Saloon", "luxe-saloon-mumbai", "Mumbai, Delhi, Bangalore", "Saloon", 7000000, "28% annually", "Available Now", "European techniques, Premium clientele, Monthly payouts"),
-    ("Zen Wellness Spa", "zen-wellness-goa", "Goa, Kerala, Rishikesh", "Wellness", 70300000, "25% annually", "Available Now", "Holistic wellness, Ayurveda + modern spa, Retreat packages"),
-    ("Ayur Wellness Center", "ayur-wellness-bangalore", "Bangalore, Chennai, Pune", "Wellness", 9000000, "30% annually", "Available Now", "Medical wellness, Subscription model, Doctor network"),
-    ("Ayur Wellness Center Hotel", "wellness-bangalore", "Bangalore, Chennai, Pune", "Hotel", 7000000, "30% annually", "Available Now", "Medical wellness, Subscription model, Doctor network, Hotel")
-]
-
-for f in franchises:
-    create_franchise(*f)
+        """ % (product_id, ids["channel"], PUBLISH_AT)
+        res = run_query(pub_query)
+        return None if res['data']['productChannelListingUpdate']['errors'] else product_id
+
+    journal.step(f"price:{slug}", set_price)
+    journal.step(f"publish:{slug}", publish)
+
+CHOICE_ATTRIBUTES = ("property-type", "status")
+
+def choice_ids(client, catalog):
+    """The value IDs of the franchise choice attributes, read fresh from the server."""
+    return {
+        value["id"]
+        for slug in CHOICE_ATTRIBUTES if catalog.attribute_id(slug)
+        for value in iter_connection(client, ATTRIBUTE_CHOICES_QUERY, "attribute.choices",
+                                     {"id": catalog.attribute_id(slug)}, page_size=100)
+    }
+
+def create_franchises_bulk(client, catalog, ids, rows, journal, chunk_size=50):
+    """Recreate all franchises with productBulkCreate instead of ~6 calls each.
+
+    Raises ``SaleorError`` if the run added attribute values: franchises
+    only ever pick existing ones.
+    """
+    # The run's catalog snapshot is the "before"; only the after check hits the server.
+    before = {v["id"] for slug in CHOICE_ATTRIBUTES for v in (catalog.attribute(slug) or {}).get("choices", [])}
+    # Rows committed by an interrupted earlier run are neither deleted nor recreated.
+    rows = [row for row in rows if not journal.done(f"create:{row['slug']}")]
+    existing = find_products_by_slug(client, [row["slug"] for row in rows])
+    if existing:
+        print(f"Deleting {len(existing)} existing franchises...")
+        bulk_delete_products(client, existing.values(), registry=get_registry(client))
+
+    products = []
+    for row in rows:
+        slug, price = row["slug"], row["variant"]["price"]
+        product = franchise_input(ids, row)
+        product["channelListings"] = [{
+            "channelId": ids["channel"],
+            "isPublished": True,
+            "visibleInListings": True,
+            "isAvailableForPurchase": True,
+            "availableForPurchaseAt": PUBLISH_AT,
+        }]
+        product["variants"] = [{
+            "sku": f"{slug}-default",
+            "attributes": [],
+            "channelListings": [{"channelId": ids["channel"], "price": price, "costPrice": price}],
+        }]
+        products.append(product)
+        journal.plan(f"create:{slug}", values=choice_values(ids, row))
+
+    for product, created, errors in bulk_create_products(client, products, chunk_size):
+        if errors:
+            print(f"Error creating {product['slug']}:", errors)
+        else:
+            journal.commit(f"create:{product['slug']}", created['id'])
+            print(f"Created {product['slug']}: {created['id']}")
+
+    added = choice_ids(client, catalog) - before
+    if added:
+        raise SaleorError(f"Bulk create added {len(added)} attribute value(s): {', '.join(sorted(added))}")
+
+def main(client, bulk=False, recreate=False, dry_run=False):
+    """Bring the franchises in line with data/franchises.csv.
+
+    By default only the mutations needed to match the live catalog are sent;
+    ``dry_run`` prints that plan. ``bulk`` and ``recreate`` delete and
+    recreate everything, journaling every step so that rerunning with the
+    same flag after a crash resumes where the last run stopped.
+    """
+    # One snapshot of every attribute and its choices serves the whole run.
+    catalog = AttributeCatalog(client)
+    if bulk:
+        with Journal("recreate-franchises-bulk") as journal:
+            ids = journaled_ids(client, catalog, journal)
+            create_franchises_bulk(client, catalog, ids, load_franchises(client, catalog), journal)
+    elif recreate:
+        with Journal("recreate-franchises") as journal:
+            ids = journaled_ids(client, catalog, journal)
+            for product in load_franchises(client, catalog):
+                create_franchise(client, ids, product, journal)
+    else:
+        import_catalog(client, FRANCHISES, dry_run=dry_run)
+
+def run_recreate(client, bulk=False):
+    """CLI entry point: delete and recreate every franchise, journaled."""
+    main(client, bulk=bulk, recreate=not bulk)
+
+if __name__ == "__main__":
+    main(get_client(), bulk="--bulk" in sys.argv, recreate="--recreate" in sys.argv, dry_run="--dry-run" in sys.argv)
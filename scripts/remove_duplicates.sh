@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# (Superseded by `scripts/vilaasa-admin dedupe-values`, which finds the
+# duplicates itself and moves their products to the kept value first.)
+
 # Saleor GraphQL Endpoint
 SALEOR_API_URL="http://localhost:8000/graphql/"
 
@@ -0,0 +1,29 @@
+import os
+import sys
+
+from vilaasa_admin import get_client
+from vilaasa_admin.config import CHANNEL_SLUG
+from vilaasa_admin.importer import import_catalog
+from vilaasa_admin.reconcile import reconcile
+
+# Python port of complete_setup.sh: the same properties, reconciled instead
+# of created with one curl call per field. The listings themselves live in
+# data/properties.csv (see vilaasa_admin/importer.py for the columns).
+PROPERTIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "properties.csv")
+
+# What the listings refer to and the feed does not create.
+SCAFFOLD = {
+    "channel": CHANNEL_SLUG,
+    "categories": [{"slug": "real-estate", "name": "Real Estate"}],
+    "attributes": {
+        "property-type": ["Residential", "Commercial", "Luxury Villa"],
+        "status": ["Ready to Move", "Under Construction"],
+    },
+}
+
+def run_seed(client, dry_run=False):
+    reconcile(client, SCAFFOLD, dry_run=dry_run)
+    return import_catalog(client, PROPERTIES, dry_run=dry_run)
+
+if __name__ == "__main__":
+    run_seed(get_client(), dry_run="--dry-run" in sys.argv)
@@ -1,47 +1,18 @@
 
-import requests
-import json
-
-SALEOR_URL = "http://localhost:8000/graphql/"
-ADMIN_EMAIL = "superadmin@example.com"
-ADMIN_PASSWORD = "admin123"
+from vilaasa_admin import get_client, iter_products, run_concurrently
+from vilaasa_admin.config import CHANNEL_SLUG
+from vilaasa_admin.registry import get_registry
 
 PRODUCT_TYPE_SLUG = "property" # Assuming there is a product type slug, or I'll need to find it.
 # Actually I need to add the attribute to the Product Type too.
 
-def get_token():
-    query = """
-    mutation {
-      tokenCreate(email: "%s", password: "%s") {
-        token
-      }
-    }
-    """ % (ADMIN_EMAIL, ADMIN_PASSWORD)
-    response = requests.post(SALEOR_URL, json={'query': query})
-    return response.json()['data']['tokenCreate']['token']
+def run_setup(client):
+    registry = get_registry(client)
 
-def run_setup(token):
-    headers = {"Authorization": f"JWT {token}"}
-    
     # 1. Find existing Amenities attribute ID
     print("Finding existing Amenities attribute...")
-    query = """
-    query {
-      attributes(first: 1, search: "Amenities") {
-        edges {
-          node {
-            id
-            slug
-          }
-        }
-      }
-    }
-    """
-    res = requests.post(SALEOR_URL, json={'query': query}, headers=headers)
-    data = res.json()
-    existing_id = None
-    if data['data']['attributes']['edges']:
-        existing_id = data['data']['attributes']['edges'][0]['node']['id']
+    existing_id = registry.id("attribute", slug="amenities")
+    if existing_id:
         print(f"Found existing Amenities attribute: {existing_id}")
         
     # 2. Delete if exists
@@ -54,7 +25,8 @@ def run_setup(token):
           }
         }
         """
-        requests.post(SALEOR_URL, json={'query': mut, 'variables': {'id': existing_id}}, headers=headers)
+        client.execute(mut, {'id': existing_id})
+        registry.forget("attribute", existing_id)
 
     # 3. Create new Attribute
     print("Creating new Amenities attribute (MULTISELECT)...")
@@ -79,13 +51,14 @@ def run_setup(token):
         "inputType": "MULTISELECT",
         "valueRequired": False # Optional
     }
-    res = requests.post(SALEOR_URL, json={'query': create_mut, 'variables': {'input': input_data}}, headers=headers)
-    new_attr_data = res.json()['data']['attributeCreate']
+    res = client.execute(create_mut, {'input': input_data})
+    new_attr_data = res['data']['attributeCreate']
     if new_attr_data['errors']:
         print("Error creating attribute:", new_attr_data['errors'])
         return
         
     attr_id = new_attr_data['attribute']['id']
+    registry.record("attribute", attr_id, slug="amenities", name="Amenities")
     print(f"Created Amenities attribute: {attr_id}")
     
     # 4. Create Values
@@ -107,13 +80,14 @@ def run_setup(token):
           }
         }
         """
-        vres = requests.post(SALEOR_URL, json={'query': val_mut, 'variables': {'id': attr_id, 'input': {'name': val}}}, headers=headers)
-        if 'data' in vres.json() and vres.json()['data']['attributeValueCreate']['attributeValue']:
-             v_obj = vres.json()['data']['attributeValueCreate']['attributeValue']
+        vres = client.execute(val_mut, {'id': attr_id, 'input': {'name': val}})
+        if 'data' in vres and vres['data']['attributeValueCreate']['attributeValue']:
+             v_obj = vres['data']['attributeValueCreate']['attributeValue']
              val_map[val] = v_obj['id']
+             registry.record("attribute_value", v_obj['id'], slug=v_obj['slug'], name=v_obj['name'], parent=attr_id)
              print(f"  - Created {val}")
         else:
-             print(f"  - Error creating {val}: {vres.json()}")
+             print(f"  - Error creating {val}: {vres}")
 
     # 5. Assign Attribute to Product Type "Property" (or whatever the main type is)
     # I need to find the product type ID first.
@@ -130,14 +104,14 @@ def run_setup(token):
       }
     }
     """
-    pt_res = requests.post(SALEOR_URL, json={'query': pt_query}, headers=headers)
-    if 'data' not in pt_res.json():
-         print("Error fetching productTypes:", pt_res.json())
+    pt_res = client.execute(pt_query)
+    if 'data' not in pt_res:
+         print("Error fetching productTypes:", pt_res)
          return
 
     pt_id = None
     # Look for "Property" or "Default Type" or similar
-    for edge in pt_res.json()['data']['productTypes']['edges']:
+    for edge in pt_res['data']['productTypes']['edges']:
         pt = edge['node']
         print(f"Checking Product Type: {pt['name']}")
         if "Property" in pt['name'] or "Default" in pt['name']:
@@ -145,8 +119,8 @@ def run_setup(token):
              break
     
     # If not found, just take the first one?
-    if not pt_id and pt_res.json()['data']['productTypes']['edges']:
-         pt_id = pt_res.json()['data']['productTypes']['edges'][0]['node']['id']
+    if not pt_id and pt_res['data']['productTypes']['edges']:
+         pt_id = pt_res['data']['productTypes']['edges'][0]['node']['id']
 
     if pt_id:
         print(f"Found Product Type: {pt_id}")
@@ -162,25 +136,15 @@ def run_setup(token):
         """
         # Note: operations expect IDs.
         ops = [{"id": attr_id, "type": "PRODUCT"}] 
-        requests.post(SALEOR_URL, json={'query': assign_mut, 'variables': {'productTypeId': pt_id, 'operations': ops}}, headers=headers)
+        client.execute(assign_mut, {'productTypeId': pt_id, 'operations': ops})
     
     # 6. Assign Default Amenities to All Products
     # To save time, I'll assign ALL created values to ALL products for now, or a subset.
     # Let's assign 4 random ones to "The Aurum Residence" and "Palm Royale Villa" specifically to test.
     
     print("Assigning amenities to products...")
-    # Get specific products
-    p_query = """
-    query {
-      products(first: 50, channel: "default-channel") {
-        edges {
-           node { id name } 
-        }
-      }
-    }
-    """
-    p_res = requests.post(SALEOR_URL, json={'query': p_query}, headers=headers)
-    products = p_res.json()['data']['products']['edges']
+    # Streams every page of products, not just the first 50
+    products = iter_products(client, "id name", channel=CHANNEL_SLUG)
     
     # Values to assign (IDs)
     pool_id = val_map.get("Swimming Pool")
@@ -190,20 +154,20 @@ def run_setup(token):
     
     default_ids = [v for v in [pool_id, gym_id, security_id, spa_id] if v]
     
-    for edge in products:
-        prod = edge['node']
-        print(f"Updating {prod['name']}...")
-        update_mut = """
-        mutation UpdateProduct($id: ID!, $attributes: [AttributeValueInput!]!) {
-          productUpdate(id: $id, input: { attributes: $attributes }) {
-            errors { message }
-          }
-        }
-        """
-        # Assign default set
-        attrs = [{"id": attr_id, "values": default_ids}]
-        requests.post(SALEOR_URL, json={'query': update_mut, 'variables': {'id': prod['id'], 'attributes': attrs}}, headers=headers)
+    update_mut = """
+    mutation UpdateProduct($id: ID!, $attributes: [AttributeValueInput!]!) {
+      productUpdate(id: $id, input: { attributes: $attributes }) {
+        errors { message }
+      }
+    }
+    """
+    # Assign default set
+    attrs = [{"id": attr_id, "multiselect": [{"id": value_id} for value_id in default_ids]}]
+    products = list(products)
+    jobs = [(update_mut, {'id': prod['id'], 'attributes': attrs}) for prod in products]
+    for prod, (data, error) in zip(products, run_concurrently(client, jobs)):
+        errors = error or data['productUpdate']['errors']
+        print(f"Updated {prod['name']}" + (f": {errors}" if errors else "."))
 
 if __name__ == "__main__":
-    token = get_token()
-    run_setup(token)
+    run_setup(get_client())
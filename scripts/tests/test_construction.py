@@ -0,0 +1,23 @@
+"""Run from scripts/: ``python -m pytest -q tests``."""
+from update_construction_data import CONSTRUCTION_DATA
+from vilaasa_admin.construction import SUMMARY, decode, dumps, encode, is_summary, summarize
+
+
+def test_summary_is_smaller_than_the_document():
+    assert len(dumps(summarize(CONSTRUCTION_DATA))) < len(dumps(CONSTRUCTION_DATA))
+
+
+def test_summary_of_a_long_gallery_keeps_only_the_latest_photos():
+    gallery = [{"id": str(i), "url": f"https://example.com/{i}.jpg", "date": f"2024-{i:02}-01", "caption": "Site"}
+               for i in range(1, 13)]
+    document = dict(CONSTRUCTION_DATA, gallery=gallery)
+    summary = summarize(document)
+    assert [item["date"] for item in summary["gallery"]] == ["2024-12-01", "2024-11-01", "2024-10-01"]
+    assert len(dumps(summary)) < len(dumps(document))
+
+
+def test_summary_is_marked_and_never_decoded_as_a_document():
+    summary = summarize(CONSTRUCTION_DATA)
+    assert summary[SUMMARY] == 1 and "nextMilestone" not in summary
+    assert is_summary(decode({"construction_asset": dumps(summary)}))
+    assert not is_summary(decode(encode(CONSTRUCTION_DATA)))
@@ -1,11 +1,5 @@
-
-import json
-import requests
-
-# Configuration
-SALEOR_URL = "http://localhost:8000/graphql/"
-ADMIN_EMAIL = "superadmin@example.com"
-ADMIN_PASSWORD = "admin123"
+from vilaasa_admin import get_client
+from vilaasa_admin.construction import sync_construction
 
 # Data from VaultConstruction.tsx
 CONSTRUCTION_DATA = {
@@ -26,70 +20,13 @@ CONSTRUCTION_DATA = {
     ],
 }
 
-def get_token():
-    query = """
-    mutation {
-      tokenCreate(email: "%s", password: "%s") {
-        token
-      }
-    }
-    """ % (ADMIN_EMAIL, ADMIN_PASSWORD)
-    response = requests.post(SALEOR_URL, json={'query': query})
-    return response.json()['data']['tokenCreate']['token']
-
-def update_product_metadata(token, slug, key, value_json):
-    query = """
-    mutation UpdateMetadata($id: ID!, $input: [MetadataInput!]!) {
-      updateMetadata(id: $id, input: $input) {
-        item {
-          metadata {
-            key
-            value
-          }
-        }
-        errors {
-          message
-        }
-      }
-    }
-    """
-    
-    # First get Product ID
-    product_query = """
-    query {
-      product(slug: "%s", channel: "default-channel") {
-        id
-        name
-      }
-    }
-    """ % slug
-    
-    headers = {"Authorization": f"JWT {token}"}
-    p_res = requests.post(SALEOR_URL, json={'query': product_query}, headers=headers)
-    p_data = p_res.json()
-    
-    if not p_data.get('data') or not p_data['data'].get('product'):
-        print(f"Product {slug} not found.")
-        return
-
-    product_id = p_data['data']['product']['id']
-    print(f"Updating product: {p_data['data']['product']['name']} ({product_id})")
-
-    variables = {
-        "id": product_id,
-        "input": [{
-            "key": key,
-            "value": json.dumps(value_json)
-        }]
-    }
-    
-    m_res = requests.post(SALEOR_URL, json={'query': query, 'variables': variables}, headers=headers)
-    print("Update Response:", m_res.json())
+def run_update(client, dry_run=False):
+    # Update "palm-royale" or similar if exists. 
+    # I'll try "palm-royale" first as it is in DEFAULT_PROPERTY_IMAGES
+    # Only the metadata keys that differ are written (see vilaasa_admin/construction.py).
+    sync_construction(client, {"palm-royale": CONSTRUCTION_DATA}, dry_run=dry_run)
 
 if __name__ == "__main__":
-    token = get_token()
+    client = get_client()
     print("Authenticated.")
-    
-    # Update "palm-royale" or similar if exists. 
-    # I'll try "palm-royale" first as it is in DEFAULT_PROPERTY_IMAGES
-    update_product_metadata(token, "palm-royale", "construction_asset", CONSTRUCTION_DATA)
+    run_update(client)
@@ -1,11 +1,9 @@
+import sys
 
-import requests
-import json
-import os
-
-SALEOR_URL = "http://localhost:8000/graphql/"
-ADMIN_EMAIL = "superadmin@example.com"
-ADMIN_PASSWORD = "admin123"
+from vilaasa_admin import SaleorError, get_client
+from vilaasa_admin.batch import resolve_products
+from vilaasa_admin.config import CHANNEL_SLUG
+from vilaasa_admin.media import MEDIA_FIELDS, MediaIndex, ingest
 
 # Mapping from slug to URL (Same as DEFAULT_PROPERTY_IMAGES in src/types/property.ts)
 IMAGE_MAP = {
@@ -27,107 +25,43 @@ IMAGE_MAP = {
     'zen-wellness-goa': 'https://images.unsplash.com/photo-1591343395082-e120087004b4?w=1920&q=80',
 }
 
-def get_token():
-    query = """
-    mutation {
-      tokenCreate(email: "%s", password: "%s") {
-        token
-      }
-    }
-    """ % (ADMIN_EMAIL, ADMIN_PASSWORD)
-    response = requests.post(SALEOR_URL, json={'query': query})
-    if 'data' not in response.json():
-        print("Auth failed:", response.json())
-        exit(1)
-    return response.json()['data']['tokenCreate']['token']
-
-def get_product_id(token, slug):
-    query = """
-    query GetProduct($slug: String!) {
-      product(slug: $slug, channel: "default-channel") {
-        id
-        media { id }
-      }
-    }
-    """
-    headers = {"Authorization": f"JWT {token}"}
-    response = requests.post(SALEOR_URL, json={'query': query, 'variables': {'slug': slug}}, headers=headers)
-    data = response.json()
-    if data.get('data') and data['data'].get('product'):
-        return data['data']['product']
-    return None
+def get_products(client, slugs):
+    """Fetch id, media and the media index for every slug in one aliased request."""
+    return resolve_products(client, slugs, MEDIA_FIELDS, channel=CHANNEL_SLUG)
 
-def upload_image(token, product_id, image_url, alt_text):
-    # 1. Download image
-    try:
-        img_resp = requests.get(image_url)
-        if img_resp.status_code != 200:
-            print(f"Failed to download image from {image_url}")
-            return
-    except Exception as e:
-        print(f"Error downloading {image_url}: {e}")
-        return
+def upload_image(client, product_id, image_url, alt_text, cache=None):
+    """Upload one image (downloaded through the on-disk cache)."""
+    [(_, _, payload, error)] = ingest(client, [(product_id, image_url, alt_text)], cache=cache)
+    print(f"Upload response: {error or payload}")
 
-    # 2. Upload to Saleor
-    # For file upload, we use multipart/form-data with 'operations', 'map', and the file.
-    
-    mutation = """
-    mutation ProductMediaCreate($product: ID!, $image: Upload!, $alt: String!) {
-      productMediaCreate(input: { product: $product, image: $image, alt: $alt }) {
-        media {
-          id
-          url
-        }
-        errors {
-          message
-        }
-      }
-    }
-    """
-    
-    operations = json.dumps({
-        "query": mutation,
-        "variables": {
-            "product": product_id,
-            "image": None, # Handled by map
-            "alt": alt_text
-        }
-    })
-    
-    file_map = json.dumps({"0": ["variables.image"]})
-    
-    files = {
-        "0": ("image.jpg", img_resp.content, "image/jpeg")
-    }
-    
-    headers = {"Authorization": f"JWT {token}"}
-    # Note: Do not set Content-Type header when using files parameter in requests, it sets multipart boundary automatically.
-    
-    response = requests.post(
-        SALEOR_URL,
-        data={"operations": operations, "map": file_map},
-        files=files,
-        headers=headers
-    )
-    
-    print(f"Upload response: {response.json()}")
-
-if __name__ == "__main__":
-    token = get_token()
-    print("Authenticated.")
-    
+def run_upload(client, revalidate=False):
+    products = get_products(client, IMAGE_MAP.keys())
+    todo = []
     for slug, url in IMAGE_MAP.items():
-        print(f"Processing {slug}...")
-        product_data = get_product_id(token, slug)
-        
-        if not product_data:
+        if not products[slug]:
             print(f"Product {slug} not found.")
             continue
-            
-        # Check if media already exists?
-        # If media list is empty, upload.
-        if len(product_data['media']) == 0:
-            print(f"Uploading image for {slug}...")
-            upload_image(token, product_data['id'], url, f"Image for {slug}")
+        todo.append((products[slug]['id'], url, f"Image for {slug}"))
+
+    # Downloads (served from the local cache on reruns) and uploads overlap.
+    # The index skips images a product already has, by content hash.
+    index = MediaIndex({p['id']: p for p in products.values() if p})
+    for (product_id, url, alt), action, payload, error in ingest(client, todo, revalidate=revalidate, index=index):
+        if error:
+            print(f"Failed {alt}: {error}")
+        elif payload['errors']:
+            print(f"Failed {alt}: {payload['errors']}")
+        elif action == MediaIndex.SKIP:
+            print(f"{alt} already attached as {payload['media']['id']}, skipping.")
         else:
-            print(f"Media already exists for {slug}, skipping.")
+            print(f"{'Replaced' if action == MediaIndex.REPLACE else 'Attached'} {alt}: {payload['media']['id']}")
+    index.save(client)
+
+if __name__ == "__main__":
+    try:
+        client = get_client()
+    except SaleorError as e:
+        print("Auth failed:", e)
+        exit(1)
+    print("Authenticated.")
+    run_upload(client, revalidate="--revalidate" in sys.argv)
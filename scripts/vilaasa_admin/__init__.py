@@ -0,0 +1,30 @@
+"""Shared toolkit for the Saleor admin scripts in this directory."""
+import importlib
+
+# Exports are resolved on first access so that importing the package (and
+# running ``python -m vilaasa_admin --help``) does not load requests.
+_EXPORTS = {
+    "AttributeCatalog": "attributes",
+    "SaleorClient": "client",
+    "SaleorError": "client",
+    "get_client": "client",
+    "iter_connection": "pagination",
+    "iter_products": "pagination",
+    "run_concurrently": "executor",
+}
+
+__all__ = [
+    "AttributeCatalog",
+    "SaleorClient",
+    "SaleorError",
+    "get_client",
+    "iter_connection",
+    "iter_products",
+    "run_concurrently",
+]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
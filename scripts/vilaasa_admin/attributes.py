@@ -0,0 +1,162 @@
+from .client import SaleorError
+from .pagination import iter_connection
+
+ATTRIBUTES_QUERY = """
+query Attributes($first: Int!, $after: String) {
+  attributes(first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id slug name inputType
+        choices(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          edges { node { id slug name } }
+        }
+      }
+    }
+  }
+}
+"""
+
+ATTRIBUTE_CHOICES_QUERY = """
+query AttributeChoices($id: ID!, $first: Int!, $after: String) {
+  attribute(id: $id) {
+    choices(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      edges { node { id slug name } }
+    }
+  }
+}
+"""
+
+ATTRIBUTE_VALUE_CREATE = """
+mutation AttributeValueCreate($attribute: ID!, $input: AttributeValueCreateInput!) {
+  attributeValueCreate(attribute: $attribute, input: $input) {
+    attributeValue { id slug name }
+    errors { field message }
+  }
+}
+"""
+
+ATTRIBUTE_VALUE_DELETE = """
+mutation AttributeValueDelete($id: ID!) {
+  attributeValueDelete(id: $id) {
+    errors { field message }
+  }
+}
+"""
+
+
+def iter_attributes(client):
+    """Yield every attribute with *all* of its choices under ``choices``.
+
+    The first 100 choices come inline with the attribute page; attributes
+    with more are completed with follow-up pages of ``attribute.choices``.
+    """
+    for attribute in iter_connection(client, ATTRIBUTES_QUERY, "attributes", page_size=20, prefetch=False):
+        connection = attribute["choices"] or {"edges": [], "pageInfo": {"hasNextPage": False}}
+        choices = [edge["node"] for edge in connection["edges"]]
+        if connection["pageInfo"]["hasNextPage"]:
+            choices.extend(iter_connection(
+                client, ATTRIBUTE_CHOICES_QUERY, "attribute.choices", {"id": attribute["id"]},
+                page_size=100, after=connection["pageInfo"]["endCursor"],
+            ))
+        attribute["choices"] = choices
+        yield attribute
+
+
+class AttributeCatalog:
+    """In-memory snapshot of every attribute and all of its choices.
+
+    Loaded once, on first use, with paginated requests. Values are indexed
+    by (attribute slug, value name), (attribute slug, value slug) and value
+    ID. Values created or deleted through the catalog update the indexes in
+    place, so there is no need to reload after a mutation.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.attributes = None
+
+    def load(self):
+        self.attributes = {}
+        self._by_name = {}
+        self._by_slug = {}
+        self._by_id = {}
+        for attribute in iter_attributes(self.client):
+            self.attributes[attribute["slug"]] = attribute
+            for value in attribute["choices"]:
+                self._index(attribute["slug"], value)
+        return self
+
+    def attribute(self, slug):
+        """Return the attribute dict (with ``choices``) or ``None``."""
+        self._ensure_loaded()
+        return self.attributes.get(slug)
+
+    def attribute_id(self, slug):
+        attribute = self.attribute(slug)
+        return attribute["id"] if attribute else None
+
+    def value_id(self, attribute_slug, name=None, slug=None):
+        """Return a value ID by name or slug. With duplicate names the first one wins."""
+        self._ensure_loaded()
+        index, key = (self._by_slug, slug) if slug is not None else (self._by_name, name)
+        value = index.get((attribute_slug, key))
+        return value["id"] if value else None
+
+    def value(self, value_id):
+        """Return ``(attribute_slug, value)`` for a value ID, or ``None``."""
+        self._ensure_loaded()
+        return self._by_id.get(value_id)
+
+    def ensure_value(self, attribute_slug, name):
+        """Return the ID of the named value, creating it if it is missing."""
+        return self.value_id(attribute_slug, name=name) or self.create_value(attribute_slug, name)
+
+    def create_value(self, attribute_slug, name):
+        attribute = self.attribute(attribute_slug)
+        if attribute is None:
+            raise SaleorError(f"Unknown attribute: {attribute_slug}")
+        res = self.client.data(ATTRIBUTE_VALUE_CREATE, {"attribute": attribute["id"], "input": {"name": name}})
+        payload = res["attributeValueCreate"]
+        if payload["errors"]:
+            raise SaleorError(f"Could not create {attribute_slug}={name}", errors=payload["errors"])
+        value = payload["attributeValue"]
+        attribute["choices"].append(value)
+        self._index(attribute_slug, value)
+        return value["id"]
+
+    def delete_value(self, value_id):
+        payload = self.client.data(ATTRIBUTE_VALUE_DELETE, {"id": value_id})["attributeValueDelete"]
+        if payload["errors"]:
+            raise SaleorError(f"Could not delete value {value_id}", errors=payload["errors"])
+        self.forget_value(value_id)
+
+    def forget_value(self, value_id):
+        """Drop a value deleted elsewhere (e.g. in bulk) from the indexes."""
+        found = self.value(value_id)
+        if found:
+            self._unindex(*found)
+
+    def _ensure_loaded(self):
+        if self.attributes is None:
+            self.load()
+
+    def _index(self, attribute_slug, value):
+        self._by_name.setdefault((attribute_slug, value["name"]), value)
+        self._by_slug[(attribute_slug, value["slug"])] = value
+        self._by_id[value["id"]] = (attribute_slug, value)
+
+    def _unindex(self, attribute_slug, value):
+        attribute = self.attributes[attribute_slug]
+        attribute["choices"] = [v for v in attribute["choices"] if v["id"] != value["id"]]
+        self._by_slug.pop((attribute_slug, value["slug"]), None)
+        self._by_id.pop(value["id"], None)
+        if self._by_name.get((attribute_slug, value["name"])) is value:
+            # Fall back to the next value with the same name, if any.
+            del self._by_name[(attribute_slug, value["name"])]
+            for other in attribute["choices"]:
+                if other["name"] == value["name"]:
+                    self._by_name[(attribute_slug, value["name"])] = other
+                    break
@@ -0,0 +1,158 @@
+"""Access/refresh tokens cached on disk and shared by every script run."""
+import base64
+import fcntl
+import json
+import os
+import threading
+import time
+
+import requests
+
+from . import config
+from .client import SaleorError
+from .metrics import operation_name
+
+TOKEN_CREATE = """
+mutation TokenCreate($email: String!, $password: String!) {
+  tokenCreate(email: $email, password: $password) {
+    token
+    refreshToken
+    errors { field message }
+  }
+}
+"""
+
+TOKEN_REFRESH = """
+mutation TokenRefresh($refreshToken: String!) {
+  tokenRefresh(refreshToken: $refreshToken) {
+    token
+    errors { field message }
+  }
+}
+"""
+
+# Refresh this many seconds before the access token actually expires.
+REFRESH_MARGIN = 60
+
+
+def token_expiry(token):
+    """Return the ``exp`` claim of a JWT (no signature check), or 0."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
+
+
+class TokenManager:
+    """Hands out a valid access token for one admin account.
+
+    Tokens are kept in a 0600 file per server, so a warm start costs no
+    round-trip. An access token close to expiry is renewed through
+    ``tokenRefresh`` (or a fresh ``tokenCreate`` once the refresh token has
+    expired too). Renewal holds an exclusive file lock and re-reads the file
+    first, so parallel workers and processes share one token instead of
+    each logging in.
+    """
+
+    def __init__(self, client, path=None, margin=REFRESH_MARGIN):
+        self.client = client
+        self.path = path or config.state_path("tokens.json", client.url)
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._tokens = None
+
+    def token(self):
+        """Return a valid access token, renewing it if needed."""
+        with self._lock:
+            if self._tokens is None:
+                self._tokens = self._read()
+            if not self._fresh(self._tokens):
+                self._tokens = self._renew()
+            return self._tokens["token"]
+
+    def expiring(self):
+        tokens = self._tokens
+        return tokens is not None and not self._fresh(tokens)
+
+    def forget(self):
+        """Drop the cached tokens, e.g. after the server rejected them."""
+        with self._lock, self._file_lock():
+            self._tokens = None
+            accounts = self._read_all()
+            accounts.pop(self.client.email, None)
+            self._write_all(accounts)
+
+    def _fresh(self, tokens):
+        return bool(tokens.get("token")) and token_expiry(tokens["token"]) - self.margin > time.time()
+
+    def _renew(self):
+        with self._file_lock():
+            # Another worker may have renewed while we waited for the lock.
+            tokens = self._read()
+            if self._fresh(tokens):
+                return tokens
+            refresh = tokens.get("refreshToken")
+            if refresh and token_expiry(refresh) - self.margin > time.time():
+                payload = self._mutate(TOKEN_REFRESH, {"refreshToken": refresh}, "tokenRefresh")
+                if payload.get("token"):
+                    tokens = {"token": payload["token"], "refreshToken": refresh}
+                else:
+                    tokens = {}
+            if not self._fresh(tokens):
+                payload = self._mutate(TOKEN_CREATE, {"email": self.client.email, "password": self.client.password}, "tokenCreate")
+                if not payload.get("token"):
+                    raise SaleorError("Authentication failed", errors=payload.get("errors"))
+                tokens = {"token": payload["token"], "refreshToken": payload.get("refreshToken")}
+            accounts = self._read_all()
+            accounts[self.client.email] = tokens
+            self._write_all(accounts)
+            return tokens
+
+    def _mutate(self, query, variables, field):
+        # Sent without the session's Authorization header: an expired token
+        # there would make Saleor reject the request.
+        try:
+            response = self.client.transport.send(lambda: self.client.session.post(
+                self.client.url, json={"query": query, "variables": variables},
+                headers={"Authorization": None}, timeout=self.client.timeout,
+            ), operation=operation_name(query))
+        except requests.RequestException as e:
+            raise SaleorError(f"Request to {self.client.url} failed: {e}") from e
+        res = self.client.decode(response)
+        return (res.get("data") or {}).get(field) or {"errors": res.get("errors")}
+
+    def _read(self):
+        return self._read_all().get(self.client.email) or {}
+
+    def _read_all(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_all(self, accounts):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(accounts, f)
+        os.replace(tmp, self.path)
+
+    def _file_lock(self):
+        return _FileLock(self.path + ".lock")
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
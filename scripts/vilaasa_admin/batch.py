@@ -0,0 +1,47 @@
+from . import config
+from .bulk import chunked
+from .executor import run_concurrently
+
+
+def aliased_document(operation, name, field, arguments, selection, count, shared=None):
+    """Build one document that calls ``field`` ``count`` times under aliases.
+
+    ``arguments`` maps a field argument to its GraphQL type; call ``i`` reads
+    them from variables ``$<arg><i>``. ``shared`` arguments (same value for
+    every call) are declared once as ``$<arg>``.
+    """
+    shared = shared or {}
+    declarations = [f"${arg}: {type_}" for arg, type_ in shared.items()]
+    calls = []
+    for i in range(count):
+        declarations.extend(f"${arg}{i}: {type_}" for arg, type_ in arguments.items())
+        args = [f"{arg}: ${arg}{i}" for arg in arguments] + [f"{arg}: ${arg}" for arg in shared]
+        calls.append(f"  a{i}: {field}({', '.join(args)}) {{ {selection} }}")
+    return f"{operation} {name}({', '.join(declarations)}) {{\n" + "\n".join(calls) + "\n}"
+
+
+def resolve_products(client, slugs, fields="id", channel=None, chunk_size=None):
+    """Resolve many product slugs with one aliased query per chunk.
+
+    Returns ``{slug: node}``; slugs that do not exist map to ``None``.
+    Chunks are sent concurrently.
+    """
+    slugs = list(dict.fromkeys(slugs))
+    chunks = list(chunked(slugs, chunk_size or config.BATCH_SIZE))
+    jobs = []
+    for chunk in chunks:
+        query = aliased_document(
+            "query", "ResolveProducts", "product", {"slug": "String!"}, fields, len(chunk),
+            shared={"channel": "String"},
+        )
+        variables = {f"slug{i}": slug for i, slug in enumerate(chunk)}
+        variables["channel"] = channel
+        jobs.append((query, variables))
+
+    found = {}
+    for chunk, (data, error) in zip(chunks, run_concurrently(client, jobs)):
+        if error:
+            raise error
+        for i, slug in enumerate(chunk):
+            found[slug] = data[f"a{i}"]
+    return found
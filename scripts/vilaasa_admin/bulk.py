@@ -0,0 +1,92 @@
+import itertools
+
+PRODUCT_BULK_CREATE = """
+mutation ProductBulkCreate($products: [ProductBulkCreateInput!]!) {
+  productBulkCreate(products: $products, errorPolicy: REJECT_FAILED_ROWS) {
+    count
+    results {
+      product { id slug }
+      errors { path message code }
+    }
+    errors { path message code }
+  }
+}
+"""
+
+PRODUCT_BULK_DELETE = """
+mutation ProductBulkDelete($ids: [ID!]!) {
+  productBulkDelete(ids: $ids) {
+    count
+    errors { field message }
+  }
+}
+"""
+
+PRODUCTS_BY_SLUG = """
+query ProductsBySlug($slugs: [String!], $first: Int!) {
+  products(first: $first, filter: { slugs: $slugs }) {
+    edges { node { id slug } }
+  }
+}
+"""
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def batched(iterable, size):
+    """Like ``chunked`` for any iterable, consuming it one batch at a time."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def find_products_by_slug(client, slugs, chunk_size=100):
+    """Return ``{slug: id}`` for the given slugs that exist, one request per chunk."""
+    found = {}
+    for chunk in chunked(list(slugs), chunk_size):
+        data = client.data(PRODUCTS_BY_SLUG, {"slugs": chunk, "first": len(chunk)})
+        for edge in data["products"]["edges"]:
+            found[edge["node"]["slug"]] = edge["node"]["id"]
+    return found
+
+
+def bulk_delete_products(client, ids, chunk_size=100, registry=None):
+    """Delete products by ID; return how many were deleted.
+
+    With a ``registry``, the IDs of every chunk deleted without errors are
+    forgotten there.
+    """
+    deleted = 0
+    for chunk in chunked(list(ids), chunk_size):
+        res = client.data(PRODUCT_BULK_DELETE, {"ids": chunk})["productBulkDelete"]
+        if res["errors"]:
+            print("Error deleting products:", res["errors"])
+        elif registry is not None:
+            for product_id in chunk:
+                registry.forget("product", product_id)
+        deleted += res["count"]
+    return deleted
+
+
+def bulk_create_products(client, products, chunk_size=50):
+    """Create products (with inline variants and channel listings) in chunks.
+
+    Returns one ``(input, product, errors)`` tuple per input row, in input
+    order. A failing row does not reject the rest of its chunk.
+    """
+    results = []
+    for chunk in chunked(list(products), chunk_size):
+        res = client.data(PRODUCT_BULK_CREATE, {"products": chunk})["productBulkCreate"]
+        if res["errors"] and not res["results"]:
+            # The whole chunk was rejected before any row was processed.
+            results.extend((row, None, res["errors"]) for row in chunk)
+            continue
+        for row, result in zip(chunk, res["results"]):
+            results.append((row, result["product"], result["errors"]))
+    return results
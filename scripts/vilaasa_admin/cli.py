@@ -0,0 +1,159 @@
+"""``vilaasa-admin``: one entry point for every admin task.
+
+Subcommands are declared here as ``"module:function"`` targets and only
+imported when run, so ``--help`` never loads requests or touches the
+network. Every target is called as ``function(client, **options)`` with
+the shared client; a workflow such as ``setup`` runs several targets in one
+process and so shares one session, token and ID registry.
+"""
+import argparse
+import importlib
+import inspect
+import os
+import sys
+from collections import namedtuple
+
+Command = namedtuple("Command", "name targets help options auth")
+
+DRY_RUN = (("--dry-run",), {"action": "store_true", "help": "print the plan without changing anything"})
+REVALIDATE = (("--revalidate",), {"action": "store_true", "help": "revalidate cached downloads with the origin"})
+
+COMMANDS = [
+    Command("list", ["list_all_products:run_query"], "list every product", [], True),
+    Command("export", ["vilaasa_admin.export:run_export"],
+            "stream every product with attributes, metadata, media, variants and listings to a file",
+            [(("path",), {"help": "output file: .jsonl[.gz|.bz2|.xz], .parquet or .arrow (pyarrow), or - for stdout"}),
+             (("--workers",), {"type": int, "default": 0, "help": "compress in N worker processes"}),
+             (("--channel",), {"help": "channel slug for channel-scoped fields"})], True),
+    Command("import", ["vilaasa_admin.importer:run_import"],
+            "create or update products from a CSV or JSONL feed, validated against the catalog first",
+            [(("path",), {"help": "feed file: .csv or .jsonl, optionally .gz (columns: see vilaasa_admin/importer.py)"}),
+             (("--chunk-size",), {"type": int, "metavar": "N",
+                                  "help": "rows per bulk mutation (default: SALEOR_BATCH_SIZE, 50)"}),
+             (("--errors",), {"metavar": "PATH", "help": "write rejected rows to this CSV file"}),
+             (("--create-values",), {"action": "store_true",
+                                     "help": "create unknown choice values instead of rejecting the row"}),
+             DRY_RUN], True),
+    Command("seed", ["seed_properties:run_seed", "recreate_franchises_v2:main"],
+            "reconcile properties and franchises with the checked-in catalog", [DRY_RUN], True),
+    Command("recreate-franchises", ["recreate_franchises_v2:run_recreate"],
+            "delete and recreate every franchise (journaled, resumable)",
+            [(("--bulk",), {"action": "store_true", "help": "use productBulkCreate"})], True),
+    Command("fix-values", ["fix_status_values:run_fix", "fix_property_type_values:run_fix"],
+            "move products off the duplicate status / property-type values", [DRY_RUN], True),
+    Command("remap-values", ["vilaasa_admin.remap:run_remap"],
+            "move products from one attribute value to another and delete the old value",
+            [(("remaps",), {"nargs": "+", "metavar": "ATTRIBUTE:OLD=NEW",
+                            "help": "values by ID, slug or name, e.g. status:under-construction-2=under-construction"}),
+             DRY_RUN,
+             (("--keep",), {"action": "store_true", "help": "keep the old values"})], True),
+    Command("dedupe-values", ["vilaasa_admin.dedupe:run_dedupe"],
+            "merge duplicate attribute values (same name up to case and punctuation) and delete the extras",
+            [(("--attribute",), {"action": "append", "metavar": "SLUG", "help": "only this attribute (repeatable)"}),
+             DRY_RUN], True),
+    Command("add-franchise-category", ["add_franchise_category:run_setup"],
+            "create the franchise-category attribute and tag franchises", [], True),
+    Command("migrate-categories", ["migrate_franchise_categories:run_migration"],
+            "move franchises into category subtrees and drop franchise-category", [], True),
+    Command("setup-amenities", ["setup_amenities:run_setup"], "recreate the amenities attribute", [], True),
+    Command("upload-media", ["upload_images_to_backend:run_upload"], "attach product images", [REVALIDATE], True),
+    Command("update-construction", ["update_construction_data:run_update"],
+            "write construction progress metadata", [DRY_RUN], True),
+    Command("sync-construction", ["vilaasa_admin.construction:run_sync"],
+            "apply construction progress updates for many properties, writing only changed metadata keys",
+            [(("path",), {"help": "updates as a JSON object {slug: update} or JSON lines with a slug key each"}),
+             (("--replace",), {"action": "store_true", "help": "treat updates as complete documents, not partial ones"}),
+             DRY_RUN], True),
+    Command("construction-history", ["vilaasa_admin.construction:show_history"],
+            "print the locally recorded construction progress of a property",
+            [(("slug",), {}),
+             (("--since",), {"metavar": "DATE", "help": "first date (YYYY-MM-DD or ISO time)"}),
+             (("--until",), {"metavar": "DATE", "help": "last date (YYYY-MM-DD or ISO time)"})], False),
+    Command("snapshot", ["vilaasa_admin.snapshot:run_snapshot"],
+            "write the storefront's product queries as static, content-hashed JSON shards for a CDN",
+            [(("output",), {"help": "output directory, e.g. public/catalog"}),
+             (("--source",), {"metavar": "PATH", "help": "TypeScript file with the queries (default: src/lib/graphql.ts)"})],
+            False),
+    Command("overfetch", ["vilaasa_admin.overfetch:run_overfetch"],
+            "report the byte cost of every field the storefront queries select, and which ones it never reads",
+            [(("--recorded",), {"metavar": "PATH", "help": "use responses saved with --record instead of a backend"}),
+             (("--record",), {"metavar": "PATH", "help": "save the responses to this JSON file"}),
+             (("--live",), {"action": "store_true",
+                            "help": "query the configured server instead of a stand-in seeded with data/*.csv"})],
+            False),
+    Command("registry", ["vilaasa_admin.registry:run_registry"],
+            "resync the local slug/name -> ID registry from the server, or clear it (e.g. after a database reset)",
+            [(("action",), {"choices": ["sync", "clear"]}),
+             (("--full",), {"action": "store_true", "help": "with sync: reload products fully, dropping deleted ones"})],
+            True),
+    Command("debug-attributes", ["debug_attr_values:run_query"], "print attributes and their values", [], False),
+    Command("setup", ["seed_properties:run_seed", "recreate_franchises_v2:main", "upload_images_to_backend:run_upload"],
+            "full catalog setup (what complete_setup.sh did) in one process", [DRY_RUN], True),
+]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vilaasa-admin", description="Saleor catalog administration.")
+    parser.add_argument(
+        "--profile", nargs="?", const="", metavar="PATH",
+        help="print per-operation request stats at exit; also write them to PATH (.json, or .prom for Prometheus)",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for command in COMMANDS:
+        sub = subparsers.add_parser(command.name, help=command.help, description=command.help)
+        for flags, kwargs in command.options:
+            sub.add_argument(*flags, **kwargs)
+    return parser
+
+
+def load(target):
+    module_name, function_name = target.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run(command, options):
+    # The script modules live next to the package.
+    scripts_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+
+    from .client import get_client
+
+    client = get_client(authenticate=command.auth)
+    for target in command.targets:
+        function = load(target)
+        accepted = inspect.signature(function).parameters
+        if options.get("dry_run") and "dry_run" not in accepted:
+            print(f"Skipping {target} (no dry-run support).")
+            continue
+        function(client, **{k: v for k, v in options.items() if k in accepted})
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    profile = args.pop("profile")
+    name = args.pop("command")
+    command = next(c for c in COMMANDS if c.name == name)
+    from .client import SaleorError
+
+    try:
+        run(command, args)
+    except SaleorError as e:
+        print(f"{name}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profile is not None:
+            report(profile)
+
+
+def report(path):
+    from .metrics import METRICS
+
+    print(METRICS.table(), file=sys.stderr)
+    if path:
+        METRICS.write(path)
+        print(f"Profile written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
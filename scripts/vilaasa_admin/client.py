@@ -0,0 +1,220 @@
+import io
+import json
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config
+from .metrics import METRICS, operation_name
+from .transport import Transport, is_idempotent
+
+# Error codes Saleor returns when the Authorization header is unusable.
+TOKEN_ERRORS = {"ExpiredSignatureError", "InvalidSignatureError", "DecodeError", "JSONWebTokenError"}
+
+
+class SaleorError(Exception):
+    """Raised when the API cannot be reached or answers with a non-200 status."""
+
+    def __init__(self, message, response=None, errors=None):
+        super().__init__(message)
+        self.response = response
+        self.errors = errors or []
+
+
+class MultipartBody:
+    """A ``multipart/form-data`` body that streams its file parts.
+
+    Exposes ``read()`` and ``__len__`` so ``requests`` sends it with a
+    ``Content-Length`` header (Saleor's WSGI server does not accept chunked
+    uploads) while reading files in blocks: memory use stays constant
+    whatever the file size.
+    """
+
+    def __init__(self, fields, files):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._parts = []
+        for name, value in fields:
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            self._parts.append(header.encode() + value.encode() + b"\r\n")
+        for name, filename, content, content_type in files:
+            header = (
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            )
+            self._parts.append(header.encode())
+            self._parts.append(io.BytesIO(content) if isinstance(content, bytes) else content)
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+        self._length = sum(len(p) if isinstance(p, bytes) else _remaining(p) for p in self._parts)
+        self._sources = [(io.BytesIO(p), 0) if isinstance(p, bytes) else (p, p.tell()) for p in self._parts]
+        self.rewind()
+
+    def rewind(self):
+        """Reset to the start, so a retried request can send the body again."""
+        for source, start in self._sources:
+            source.seek(start)
+        self._parts = [source for source, _ in self._sources]
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = b"".join(part.read() for part in self._parts)
+            self._parts = []
+            return data
+        chunks = []
+        while size > 0 and self._parts:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
+def _remaining(f):
+    position = f.tell()
+    end = f.seek(0, io.SEEK_END)
+    f.seek(position)
+    return end - position
+
+
+class SaleorClient:
+    """Thin GraphQL client around one pooled, keep-alive ``requests.Session``.
+
+    Every script used to call ``requests.post`` directly, which opened a new
+    TCP connection per operation. Reusing the session keeps connections warm
+    for the whole run.
+    """
+
+    def __init__(self, url=None, email=None, password=None, concurrency=None, timeout=None):
+        self.url = url or config.SALEOR_URL
+        self.email = email or config.ADMIN_EMAIL
+        self.password = password or config.ADMIN_PASSWORD
+        self.concurrency = concurrency or config.CONCURRENCY
+        self.timeout = timeout or (config.CONNECT_TIMEOUT, config.READ_TIMEOUT)
+        self.token = None
+        self.tokens = None
+        self.transport = Transport(concurrency=self.concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def login(self):
+        """Authenticate through the shared on-disk token cache.
+
+        A cached, unexpired token makes this free; otherwise the token is
+        refreshed or a new one created (see ``auth.TokenManager``).
+        """
+        if self.tokens is None:
+            # Imported here because auth depends on this module.
+            from .auth import TokenManager
+            self.tokens = TokenManager(self)
+        self.set_token(self.tokens.token())
+        return self.token
+
+    def set_token(self, token):
+        # Saleor accepts both "JWT" and "Bearer"; the scripts standardise on Bearer.
+        self.token = token
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def post(self, query=None, **kwargs):
+        """POST to the API through the retrying, rate-limited transport.
+
+        ``query`` is the GraphQL document being sent (taken from ``json``
+        when omitted); it decides whether a failed request may be retried.
+        """
+        if self.tokens is not None and self.tokens.expiring():
+            # Renew ahead of expiry so long runs never send a stale token.
+            self.set_token(self.tokens.token())
+        if query is None and "json" in kwargs:
+            query = kwargs["json"].get("query")
+        body = kwargs.get("data")
+        try:
+            return self.transport.send(
+                lambda: self.session.post(self.url, timeout=self.timeout, **kwargs),
+                idempotent=query is not None and is_idempotent(query),
+                rewind=getattr(body, "rewind", None),
+                operation=operation_name(query),
+            )
+        except requests.RequestException as e:
+            raise SaleorError(f"Request to {self.url} failed: {e}") from e
+
+    def execute(self, query, variables=None):
+        """Run a query and return the decoded response (``data`` and ``errors``)."""
+        payload = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+        res = self.decode(self.post(json=payload))
+        if self.tokens is not None and _token_rejected(res):
+            # A cached token the server no longer accepts (secret rotated,
+            # user logged out): drop it and retry once with a new one.
+            self.tokens.forget()
+            self.login()
+            res = self.decode(self.post(json=payload))
+        if res.get("errors"):
+            METRICS.error(operation_name(query))
+        return res
+
+    def data(self, query, variables=None):
+        """Run a query and return only ``data``, raising on GraphQL errors."""
+        res = self.execute(query, variables)
+        if res.get("errors"):
+            raise SaleorError(res["errors"][0].get("message", "GraphQL error"), errors=res["errors"])
+        return res["data"]
+
+    def upload(self, query, variables, files):
+        """Run a mutation using the GraphQL multipart request protocol.
+
+        ``files`` maps a variable name to a ``(filename, content, content_type)``
+        tuple; the variable itself is sent as ``null`` and wired up via ``map``.
+        ``content`` may be bytes or a seekable binary file, which is streamed
+        from its current position instead of being read into memory.
+        """
+        variables = dict(variables)
+        file_map = {}
+        parts = []
+        for index, (name, (filename, content, content_type)) in enumerate(files.items()):
+            key = str(index)
+            variables[name] = None
+            file_map[key] = [f"variables.{name}"]
+            parts.append((key, filename, content, content_type))
+
+        operations = json.dumps({"query": query, "variables": variables})
+        body = MultipartBody([("operations", operations), ("map", json.dumps(file_map))], parts)
+        return self.decode(self.post(query, data=body, headers={"Content-Type": body.content_type}))
+
+    def decode(self, response):
+        if response.status_code != 200:
+            raise SaleorError(f"Query failed ({response.status_code}): {response.text[:500]}", response=response)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+def _token_rejected(res):
+    for error in res.get("errors") or []:
+        code = (error.get("extensions") or {}).get("exception", {}).get("code")
+        if code in TOKEN_ERRORS:
+            return True
+    return False
+
+
+_client = None
+
+
+def get_client(authenticate=True):
+    """Return the process-wide client, logging in on first use if requested."""
+    global _client
+    if _client is None:
+        _client = SaleorClient()
+    if authenticate and _client.token is None:
+        _client.login()
+    return _client
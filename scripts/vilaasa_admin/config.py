@@ -0,0 +1,36 @@
+import hashlib
+import os
+
+# Connection settings shared by every admin script. Override through the
+# environment instead of editing the scripts.
+SALEOR_URL = os.environ.get("SALEOR_URL", "http://localhost:8000/graphql/")
+ADMIN_EMAIL = os.environ.get("SALEOR_ADMIN_EMAIL", "superadmin@example.com")
+ADMIN_PASSWORD = os.environ.get("SALEOR_ADMIN_PASSWORD", "admin123")
+CHANNEL_SLUG = os.environ.get("SALEOR_CHANNEL", "default-channel")
+
+# HTTP tuning. CONCURRENCY is the most requests one client has in flight:
+# its connection pool holds that many connections, worker pools never run
+# more threads than that, and the adaptive limiter (transport.py) starts at
+# half of it and probes up to it. SALEOR_POOL_SIZE is the old name.
+CONCURRENCY = int(os.environ.get("SALEOR_CONCURRENCY") or os.environ.get("SALEOR_POOL_SIZE") or "10")
+CONNECT_TIMEOUT = float(os.environ.get("SALEOR_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("SALEOR_READ_TIMEOUT", "60"))
+# Retries for failed requests (see transport.py) and an optional cap on
+# requests per second; 0 means unlimited.
+MAX_RETRIES = int(os.environ.get("SALEOR_MAX_RETRIES", "5"))
+RATE_LIMIT = float(os.environ.get("SALEOR_RATE_LIMIT", "0"))
+# How many aliased lookups go into one batched GraphQL document.
+BATCH_SIZE = int(os.environ.get("SALEOR_BATCH_SIZE", "50"))
+
+# Local state (ID registry, caches) lives here, one set of files per server.
+CACHE_DIR = os.path.expanduser(os.environ.get("VILAASA_CACHE_DIR", "~/.cache/vilaasa-admin"))
+# Seconds before cached registry IDs of a kind are resynced from the server.
+REGISTRY_TTL = float(os.environ.get("SALEOR_REGISTRY_TTL", "86400"))
+
+
+def state_path(filename, url=None):
+    """Return the path of a per-server state file under CACHE_DIR."""
+    digest = hashlib.sha1((url or SALEOR_URL).encode()).hexdigest()[:12]
+    directory = os.path.join(CACHE_DIR, digest)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, filename)
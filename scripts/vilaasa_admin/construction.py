@@ -0,0 +1,260 @@
+"""Construction progress: full documents kept privately, summaries published.
+
+The full construction document of a property (progress percentages,
+``lastUpdate``, ``milestones`` and ``gallery``) lives in its *private*
+metadata under three keys. A routine progress tick rewrites only the small
+core and never the photos:
+
+    construction_asset             {"overallProgress": 55, "lastUpdate": ...}
+    construction_asset.milestones  [{"id": "1", "name": ..., "status": ...}, ...]
+    construction_asset.gallery     [{"id": "1", "url": ..., "caption": ...}, ...]
+
+The storefront reads public metadata. It gets one small ``construction_asset``
+summary, marked ``"summary": 1``: the percentages, the milestones and the
+latest photos, without the entries' ``id``s (they only key merges here; the
+storefront numbers the entries itself), so it is smaller than the document.
+Every synced document is also appended to the local progress history
+(``history.py``).
+
+A summary is derived and lossy, so it is never read back as a document.
+Products from before this layout (an unmarked document in their public
+keys) are read from there and migrated on their next update.
+
+Updates are partial documents. Milestones and gallery entries are merged by
+``id``, so a day's update names only what changed. Current metadata is read
+with batched lookups, and only keys whose value differs are written (or
+deleted), in aliased batches.
+"""
+import json
+from collections import Counter
+
+from . import config
+from .batch import aliased_document, resolve_products
+from .bulk import chunked
+from .executor import run_concurrently
+from .history import ConstructionHistory, isoformat, timestamp
+
+KEY = "construction_asset"
+SPLIT_KEYS = ("milestones", "gallery")
+# Photos in the public summary, newest first.
+SUMMARY_PHOTOS = 3
+# Marks a public value as a summary (and its format version).
+SUMMARY = "summary"
+SUMMARY_VERSION = 1
+
+
+def dumps(value):
+    # Canonical form: equal documents give equal strings, so comparing
+    # metadata values is a plain string comparison.
+    return json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def decode(metadata):
+    """Rebuild the construction document from ``{key: value}`` metadata."""
+    if KEY not in metadata:
+        return {}
+    document = json.loads(metadata[KEY])
+    for name in SPLIT_KEYS:
+        if f"{KEY}.{name}" in metadata:
+            document[name] = json.loads(metadata[f"{KEY}.{name}"])
+    return document
+
+
+def is_summary(document):
+    """Whether a decoded public value is a published summary, not a source document."""
+    # Summaries published before they were marked have a nextMilestone.
+    return SUMMARY in document or "nextMilestone" in document
+
+
+def encode(document):
+    """Return the metadata ``{key: value}`` entries of a construction document."""
+    entries = {KEY: dumps({k: v for k, v in document.items() if k not in SPLIT_KEYS})}
+    for name in SPLIT_KEYS:
+        if name in document:
+            entries[f"{KEY}.{name}"] = dumps(document[name])
+    return entries
+
+
+def merge(document, update):
+    """Apply a partial update; list entries with an ``id`` update the entry with that ID."""
+    merged = dict(document)
+    for key, value in update.items():
+        if key in SPLIT_KEYS and isinstance(value, list):
+            merged[key] = merge_items(document.get(key) or [], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def merge_items(items, updates):
+    items = [dict(item) for item in items]
+    positions = {item["id"]: i for i, item in enumerate(items) if "id" in item}
+    for update in updates:
+        if update.get("id") in positions:
+            items[positions[update["id"]]].update(update)
+        else:
+            if "id" in update:
+                positions[update["id"]] = len(items)
+            items.append(dict(update))
+    return items
+
+
+def load_updates(path):
+    """Read ``{slug: update}`` from a JSON object, or JSON lines with a ``slug`` key each.
+
+    Several lines for one slug are merged in order.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            updates = {}
+            for text in f:
+                if text.strip():
+                    update = json.loads(text)
+                    slug = update.pop("slug")
+                    updates[slug] = merge(updates.get(slug, {}), update)
+            return updates
+        return json.load(f)
+
+
+def summarize(document, photos=SUMMARY_PHOTOS):
+    """The public summary of a construction document."""
+    gallery = sorted(document.get("gallery") or [], key=lambda item: item.get("date") or "", reverse=True)
+    summary = {k: v for k, v in document.items() if k not in SPLIT_KEYS}
+    summary["milestones"] = [_without_id(m) for m in document.get("milestones") or []]
+    summary["gallery"] = [_without_id(item) for item in gallery[:photos]]
+    summary[SUMMARY] = SUMMARY_VERSION
+    return summary
+
+
+def _without_id(item):
+    return {k: v for k, v in item.items() if k != "id"}
+
+
+def next_milestone(document):
+    """The first milestone not completed yet, or ``None``."""
+    return next((m for m in document.get("milestones") or [] if m.get("status") != "completed"), None)
+
+
+def sync_construction(client, updates, replace=False, dry_run=False, chunk_size=None, history=None):
+    """Apply ``{slug: update}``; return ``{"changed", "unchanged", "missing", "stale", "failed"}``.
+
+    With ``replace`` each update is the complete document instead of a
+    partial one. Updates dated before the latest recorded snapshot are stale
+    and skipped, so replaying an old file cannot roll progress back.
+    """
+    history = history or ConstructionHistory(url=client.url)
+    products = resolve_products(client, list(updates), "id metadata { key value } privateMetadata { key value }")
+    private_writes, public_writes, public_deletes = [], [], []
+    changed_slugs, unchanged, missing, stale, recorded = set(), 0, 0, 0, 0
+    for slug, update in updates.items():
+        product = products.get(slug)
+        if product is None:
+            print(f"{slug}: product not found, skipping.")
+            missing += 1
+            continue
+        private = {m["key"]: m["value"] for m in product["privateMetadata"]}
+        public = {m["key"]: m["value"] for m in product["metadata"]}
+        try:
+            current = {} if replace else decode(private)
+            if not current and not replace:
+                # Products not migrated yet keep the full document in public metadata.
+                current = decode(public)
+                if is_summary(current):
+                    print(f"{slug}: only a published summary found, starting from the update.")
+                    current = {}
+        except ValueError:
+            print(f"{slug}: unreadable {KEY} metadata, rewriting it.")
+            current = {}
+        document = merge(current, update)
+        latest = history.latest_time(slug)
+        if latest is not None and timestamp(document.get("lastUpdate")) < latest:
+            print(f"{slug}: update from {document.get('lastUpdate')} is older than the history "
+                  f"({isoformat(latest)}), skipping.")
+            stale += 1
+            continue
+        if not dry_run and history.record(slug, document):
+            recorded += 1
+
+        writes = [
+            (private_writes, private, encode(document)),
+            (public_writes, public, {KEY: dumps(summarize(document))}),
+        ]
+        for batch, live, entries in writes:
+            changed = [{"key": k, "value": v} for k, v in entries.items() if live.get(k) != v]
+            if changed:
+                batch.append((slug, product["id"], changed))
+                changed_slugs.add(slug)
+        obsolete = [f"{KEY}.{name}" for name in SPLIT_KEYS if f"{KEY}.{name}" in public]
+        if obsolete:
+            public_deletes.append((slug, product["id"], obsolete))
+            changed_slugs.add(slug)
+        if slug not in changed_slugs:
+            unchanged += 1
+
+    keys = Counter()
+    for scope, batch in (("private", private_writes), ("public", public_writes)):
+        keys.update(f"{scope} {m['key']}" for _, _, changed in batch for m in changed)
+    keys.update(f"public {key} (deleted)" for _, _, obsolete in public_deletes for key in obsolete)
+    if dry_run:
+        for scope, batch in (("private", private_writes), ("public", public_writes)):
+            for slug, _, changed in batch:
+                size = sum(len(m["value"]) for m in changed)
+                print(f"{slug}: {scope} {', '.join(m['key'] for m in changed)} ({size} bytes)")
+    if keys:
+        print(("Keys to write: " if dry_run else "Keys written: ") + ", ".join(f"{key} x{count}" for key, count in sorted(keys.items())))
+
+    failed = set()
+    if not dry_run:
+        failed |= send(client, "updatePrivateMetadata", {"id": "ID!", "input": "[MetadataInput!]!"}, private_writes, chunk_size)
+        failed |= send(client, "updateMetadata", {"id": "ID!", "input": "[MetadataInput!]!"}, public_writes, chunk_size)
+        failed |= send(client, "deleteMetadata", {"id": "ID!", "keys": "[String!]!"}, public_deletes, chunk_size)
+        print(f"{recorded} snapshot(s) added to the local history.")
+    verb = "to update" if dry_run else "updated"
+    print(f"{len(changed_slugs) - len(failed)} product(s) {verb}, {unchanged} unchanged, "
+          f"{missing} not found, {stale} stale, {len(failed)} failed.")
+    return {"changed": len(changed_slugs) - len(failed), "unchanged": unchanged, "missing": missing,
+            "stale": stale, "failed": len(failed)}
+
+
+def send(client, field, arguments, writes, chunk_size=None):
+    """Send ``(slug, id, value)`` writes as aliased ``field`` calls; return the failed slugs."""
+    argument = [name for name in arguments if name != "id"][0]
+    chunks = list(chunked(writes, chunk_size or config.BATCH_SIZE))
+    jobs = []
+    for chunk in chunks:
+        query = aliased_document("mutation", "SyncConstruction", field, arguments, "errors { field message }", len(chunk))
+        variables = {}
+        for i, (_, product_id, value) in enumerate(chunk):
+            variables[f"id{i}"] = product_id
+            variables[f"{argument}{i}"] = value
+        jobs.append((query, variables))
+    failed = set()
+    for chunk, (data, error) in zip(chunks, run_concurrently(client, jobs)):
+        for i, (slug, _, _) in enumerate(chunk):
+            errors = error or data[f"a{i}"]["errors"]
+            if errors:
+                print(f"Error in {field} for {slug}:", errors)
+                failed.add(slug)
+    return failed
+
+
+def show_history(client, slug, since=None, until=None):
+    """CLI entry point: print the recorded progress of one property."""
+    history = ConstructionHistory(url=client.url)
+    snapshots = history.snapshots(slug, since, until)
+    if not snapshots:
+        print(f"No history for {slug}.")
+        return
+    print(f"{'time':<26} {'structure':>9} {'interior':>9} {'overall':>9}")
+    for snapshot in snapshots:
+        print(f"{snapshot['time']:<26} {snapshot['structureProgress']:>9g} "
+              f"{snapshot['interiorProgress']:>9g} {snapshot['overallProgress']:>9g}")
+    latest = history.document(slug, until)
+    upcoming = next_milestone(latest)
+    if upcoming:
+        print(f"Next milestone: {upcoming.get('name')} ({upcoming.get('date')})")
+
+
+def run_sync(client, path, replace=False, dry_run=False):
+    """CLI entry point: ``path`` holds the updates (see ``load_updates``)."""
+    sync_construction(client, load_updates(path), replace=replace, dry_run=dry_run)
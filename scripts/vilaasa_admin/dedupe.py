@@ -0,0 +1,106 @@
+"""Find and merge duplicate attribute values.
+
+Seeding runs that created a value instead of reusing it left duplicates
+such as ``franchise-2`` next to ``franchise``. Values of one attribute
+are duplicates when their names normalise to the same key (case,
+whitespace and punctuation ignored) or their slugs do once a ``-N`` suffix
+Saleor added to avoid a clash is removed (``under-construction-2`` named
+"Under construction (new)" matches ``under-construction``; ``phase-2``
+named "Phase 2" keeps its suffix). Groups sharing either key are merged,
+so duplicates chained through a name and a slug end up in one group.
+
+The canonical value of a group is the oldest one whose slug is not
+another's with a ``-N`` suffix appended (``franchise`` over
+``franchise-2``). The others are merged into it with
+``remap.remap_values``: one filtered products query per attribute,
+batched updates and one bulk delete for the whole catalog.
+"""
+import re
+
+from .attributes import AttributeCatalog
+from .remap import CHOICE_TYPES, Remap, remap_values
+
+_SUFFIX = re.compile(r"-\d+$")
+
+
+def normalize(name):
+    """Grouping key of a value name: ``" Under  construction"`` -> ``"under-construction"``."""
+    return re.sub(r"[^a-z0-9]+", "-", " ".join(name.split()).casefold()).strip("-")
+
+
+def slug_key(value):
+    """Grouping key of a value slug: without a ``-N`` suffix that is not part of the name."""
+    slug = value["slug"]
+    if _SUFFIX.search(slug) and normalize(value["name"]) != slug:
+        slug = _SUFFIX.sub("", slug)
+    return normalize(slug)
+
+
+def canonical(values):
+    """Pick the value to keep: the oldest whose slug is not another's plus ``-N``."""
+    slugs = {v["slug"] for v in values}
+    for value in values:
+        if _SUFFIX.sub("", value["slug"]) not in slugs - {value["slug"]}:
+            return value
+    return values[0]
+
+
+def find_duplicates(catalog, attributes=None):
+    """Return ``[(attribute_slug, keep, [duplicates])]`` in one pass over the choices."""
+    groups = []
+    for slug, attribute in catalog.attributes.items():
+        if attribute["inputType"] not in CHOICE_TYPES or (attributes and slug not in attributes):
+            continue
+        for values in _groups(attribute["choices"]):
+            if len(values) > 1:
+                keep = canonical(values)
+                groups.append((slug, keep, [v for v in values if v is not keep]))
+    return groups
+
+
+def _groups(values):
+    """Partition ``values`` into groups that share a name or slug key, in input order."""
+    parent = list(range(len(values)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first = {}
+    for i, value in enumerate(values):
+        for key in (("name", normalize(value["name"])), ("slug", slug_key(value))):
+            if not key[1]:
+                continue
+            if key in first:
+                a, b = root(first[key]), root(i)
+                # The lower index stays the root, so groups keep the input (creation) order.
+                parent[max(a, b)] = min(a, b)
+            else:
+                first[key] = i
+    groups = {}
+    for i, value in enumerate(values):
+        groups.setdefault(root(i), []).append(value)
+    return list(groups.values())
+
+
+def dedupe_values(client, attributes=None, dry_run=False):
+    """Merge every duplicate value (of ``attributes``, default all) into its canonical one."""
+    catalog = AttributeCatalog(client).load()
+    groups = find_duplicates(catalog, attributes)
+    if not groups:
+        print("No duplicate values.")
+        return {"updated": 0, "failed": 0, "deleted": []}
+    for slug, keep, duplicates in groups:
+        merged = ", ".join(v["slug"] for v in duplicates[:5])
+        if len(duplicates) > 5:
+            merged += f" and {len(duplicates) - 5} more"
+        print(f"{slug}: {keep['name']!r} keeps {keep['slug']}, merges {merged}")
+    remaps = [Remap(slug, value["id"], keep["id"]) for slug, keep, duplicates in groups for value in duplicates]
+    return remap_values(client, remaps, dry_run=dry_run, catalog=catalog)
+
+
+def run_dedupe(client, attribute=None, dry_run=False):
+    """CLI entry point; ``attribute`` is a list of attribute slugs or ``None``."""
+    dedupe_values(client, attribute, dry_run=dry_run)
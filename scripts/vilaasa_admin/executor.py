@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import SaleorError
+
+
+def run_concurrently(client, jobs, concurrency=None):
+    """Run ``(query, variables)`` jobs on a bounded thread pool.
+
+    Returns one ``(data, error)`` tuple per job, in input order. ``error`` is
+    the exception raised by that job (HTTP failure or top-level GraphQL
+    error); mutation-level ``errors`` stay inside ``data`` as usual.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    # More workers than pooled connections would just queue on the pool.
+    workers = min(concurrency or client.concurrency, client.concurrency, len(jobs))
+
+    def run(job):
+        query, variables = job
+        try:
+            return client.data(query, variables), None
+        except SaleorError as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, jobs))
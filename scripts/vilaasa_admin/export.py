@@ -0,0 +1,242 @@
+"""Stream the whole catalog to a JSONL, Parquet or Arrow snapshot.
+
+Products are read through cursor pagination (adaptive page size, next page
+prefetched) and written batch by batch as they arrive, so memory stays flat
+whatever the catalog size: a couple of pages for JSONL, one row group for
+Parquet/Arrow.
+
+The format follows the file name: ``.jsonl`` (``-`` for stdout),
+``.jsonl.gz`` / ``.bz2`` / ``.xz``, ``.parquet`` or ``.arrow``. Parquet and
+Arrow need pyarrow. Compressed JSONL is compressed one batch at a time, in
+a process pool when ``workers`` is set. Each batch becomes one stream of a
+multi-stream file, which gzip, bzip2 and xz read as a single file.
+"""
+import bz2
+import gzip
+import json
+import lzma
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .bulk import batched
+from .client import SaleorError
+from .pagination import iter_products
+
+EXPORT_FIELDS = """
+id slug name description created updatedAt
+productType { slug }
+category { slug }
+attributes {
+  attribute { slug }
+  values { name plainText richText }
+}
+metadata { key value }
+privateMetadata { key value }
+media { id url alt }
+variants {
+  id sku
+  channelListings { channel { slug } price { amount currency } costPrice { amount } }
+}
+channelListings { channel { slug } isPublished visibleInListings isAvailableForPurchase availableForPurchaseAt }
+"""
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+
+# Products serialised (and compressed) per batch.
+BATCH_SIZE = 1000
+ROW_GROUP_SIZE = 20000
+
+
+def record(product):
+    """Flatten one product node into an export row."""
+    return {
+        "id": product["id"],
+        "slug": product["slug"],
+        "name": product["name"],
+        "product_type": (product["productType"] or {}).get("slug"),
+        "category": (product["category"] or {}).get("slug"),
+        "created": product["created"],
+        "updated_at": product["updatedAt"],
+        # EditorJS JSON, as Saleor stores it.
+        "description": product["description"],
+        "attributes": [
+            {"slug": a["attribute"]["slug"], "values": [_value_text(v) for v in a["values"]]}
+            for a in product["attributes"]
+        ],
+        "metadata": product["metadata"],
+        "private_metadata": product["privateMetadata"],
+        "media": product["media"],
+        "variants": [
+            {
+                "id": v["id"],
+                "sku": v["sku"],
+                "channel_listings": [
+                    {
+                        "channel": l["channel"]["slug"],
+                        "price": l["price"]["amount"] if l["price"] else None,
+                        "cost_price": l["costPrice"]["amount"] if l["costPrice"] else None,
+                        "currency": l["price"]["currency"] if l["price"] else None,
+                    }
+                    for l in v["channelListings"] or []
+                ],
+            }
+            for v in product["variants"] or []
+        ],
+        "channel_listings": [
+            {
+                "channel": l["channel"]["slug"],
+                "is_published": l["isPublished"],
+                "visible_in_listings": l["visibleInListings"],
+                "is_available_for_purchase": l["isAvailableForPurchase"],
+                "available_for_purchase_at": l["availableForPurchaseAt"],
+            }
+            for l in product["channelListings"] or []
+        ],
+    }
+
+
+def _value_text(value):
+    if value.get("plainText") is not None:
+        return value["plainText"]
+    if value.get("richText") is not None:
+        return value["richText"]
+    return value["name"]
+
+
+def arrow_schema(pa):
+    key_value = pa.list_(pa.struct([("key", pa.string()), ("value", pa.string())]))
+    return pa.schema([
+        ("id", pa.string()),
+        ("slug", pa.string()),
+        ("name", pa.string()),
+        ("product_type", pa.string()),
+        ("category", pa.string()),
+        ("created", pa.string()),
+        ("updated_at", pa.string()),
+        ("description", pa.string()),
+        ("attributes", pa.list_(pa.struct([("slug", pa.string()), ("values", pa.list_(pa.string()))]))),
+        ("metadata", key_value),
+        ("private_metadata", key_value),
+        ("media", pa.list_(pa.struct([("id", pa.string()), ("url", pa.string()), ("alt", pa.string())]))),
+        ("variants", pa.list_(pa.struct([
+            ("id", pa.string()),
+            ("sku", pa.string()),
+            ("channel_listings", pa.list_(pa.struct([
+                ("channel", pa.string()), ("price", pa.float64()),
+                ("cost_price", pa.float64()), ("currency", pa.string()),
+            ]))),
+        ]))),
+        ("channel_listings", pa.list_(pa.struct([
+            ("channel", pa.string()), ("is_published", pa.bool_()), ("visible_in_listings", pa.bool_()),
+            ("is_available_for_purchase", pa.bool_()), ("available_for_purchase_at", pa.string()),
+        ]))),
+    ])
+
+
+class JsonlWriter:
+    """Writes JSON lines, optionally compressed per batch in worker processes."""
+
+    def __init__(self, f, compress=None, workers=0):
+        self.f = f
+        self.compress = compress
+        self.pool = ProcessPoolExecutor(workers) if compress and workers else None
+        self.limit = workers * 2
+        self.pending = deque()
+
+    def write(self, records):
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records).encode()
+        if self.pool:
+            self.pending.append(self.pool.submit(self.compress, data))
+            # Bounded, in-order: at most ``limit`` batches in flight.
+            while len(self.pending) > self.limit:
+                self.f.write(self.pending.popleft().result())
+        else:
+            self.f.write(self.compress(data) if self.compress else data)
+
+    def close(self):
+        while self.pending:
+            self.f.write(self.pending.popleft().result())
+        if self.pool:
+            self.pool.shutdown()
+
+
+class ArrowWriter:
+    """Writes Parquet (zstd) or Arrow IPC files one row group at a time."""
+
+    def __init__(self, path, parquet=True, row_group_size=ROW_GROUP_SIZE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SaleorError("Parquet and Arrow exports need pyarrow (pip install pyarrow)") from None
+        self.pa = pa
+        self.schema = arrow_schema(pa)
+        if parquet:
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+        self.row_group_size = row_group_size
+        self.rows = []
+
+    def write(self, records):
+        self.rows.extend(records)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_catalog(client, path, workers=0, channel=None, batch_size=BATCH_SIZE):
+    """Write every product to ``path``; return the number of products written.
+
+    The file is written under a temporary name and renamed when complete,
+    so an interrupted export never leaves a truncated snapshot behind.
+    """
+    products = (record(p) for p in iter_products(client, EXPORT_FIELDS, channel=channel, page_size=100))
+    if path == "-":
+        writer = JsonlWriter(sys.stdout.buffer)
+        return _write_all(writer, products, batch_size)
+
+    tmp = f"{path}.part"
+    base, suffix = os.path.splitext(path)
+    try:
+        if suffix in (".parquet", ".arrow"):
+            count = _write_all(ArrowWriter(tmp, parquet=suffix == ".parquet"), products, batch_size)
+        else:
+            compress = COMPRESSORS.get(suffix)
+            if compress is None and suffix != ".jsonl":
+                raise SaleorError(f"Unknown export format: {path} (use .jsonl[.gz|.bz2|.xz], .parquet or .arrow)")
+            with open(tmp, "wb") as f:
+                count = _write_all(JsonlWriter(f, compress, workers), products, batch_size)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return count
+
+
+def _write_all(writer, records, batch_size):
+    count = 0
+    try:
+        for batch in batched(records, batch_size):
+            writer.write(batch)
+            count += len(batch)
+    finally:
+        writer.close()
+    return count
+
+
+def run_export(client, path, workers=0, channel=None):
+    count = export_catalog(client, path, workers=workers, channel=channel)
+    if path != "-":
+        print(f"Exported {count} products to {path}.", file=sys.stderr)
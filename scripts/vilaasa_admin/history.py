@@ -0,0 +1,157 @@
+"""Append-only local history of construction progress, one column set per property.
+
+    <state dir>/construction-history/<slug, percent-encoded>/
+        time.i64           snapshot times, seconds since the epoch, non-decreasing
+        <field>.f32        one file per progress field, one float per snapshot
+        documents.jsonl    milestones and gallery, only for snapshots that changed them
+
+A snapshot costs 20 bytes of columns, and a range query bisects the time
+column and reads only the columns it needs. ``time.i64`` is written last and
+its length is the snapshot count, so a write cut short by a crash leaves
+trailing values that are ignored (and trimmed on the next append).
+"""
+import bisect
+import json
+import os
+from array import array
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+from . import config
+
+FIELDS = ("structureProgress", "interiorProgress", "overallProgress")
+DOCUMENT_FIELDS = ("milestones", "gallery")
+
+
+def timestamp(value=None):
+    """Seconds since the epoch for a date or ISO time string (UTC if naive); now for ``None``."""
+    if value is None:
+        return int(datetime.now(timezone.utc).timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def isoformat(seconds):
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    if moment.hour == moment.minute == moment.second == 0:
+        return moment.date().isoformat()
+    return moment.isoformat()
+
+
+def directory_name(slug):
+    """``slug`` as one path component that stays inside the history.
+
+    Percent-encoding escapes separators and ``%``; a leading dot is encoded
+    too, so ``.``, ``..`` and hidden names cannot occur.
+    """
+    if not slug:
+        raise ValueError("A product slug is required")
+    name = quote(slug, safe="")
+    return f"%2E{name[1:]}" if name.startswith(".") else name
+
+
+class ConstructionHistory:
+    def __init__(self, path=None, url=None):
+        self.path = path or config.state_path("construction-history", url)
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+
+    def slugs(self):
+        return sorted(unquote(name) for name in os.listdir(self.path)
+                      if os.path.exists(os.path.join(self.path, name, "time.i64")))
+
+    def latest_time(self, slug):
+        """Time of the latest snapshot of ``slug`` in seconds, or ``None``."""
+        times = self._column(slug, "time.i64", "q")
+        return times[-1] if times else None
+
+    def record(self, slug, document):
+        """Append ``document`` as a snapshot; return ``False`` if it adds nothing.
+
+        The snapshot is taken at the document's ``lastUpdate`` (now if it has
+        none). Snapshots older than the latest one are refused, and a snapshot
+        equal to the latest one is skipped, so recording is idempotent.
+        """
+        at = timestamp(document.get("lastUpdate"))
+        times = self._column(slug, "time.i64", "q")
+        if times and at < times[-1]:
+            return False
+        latest = self.document(slug) if times else None
+        # Compared as stored, in single precision.
+        values = list(array("f", [float(document.get(field) or 0) for field in FIELDS]))
+        changed = {f: document[f] for f in DOCUMENT_FIELDS if f in document and (latest or {}).get(f) != document[f]}
+        if latest and at == times[-1] and not changed and values == [latest[f] for f in FIELDS]:
+            return False
+
+        os.makedirs(os.path.join(self.path, directory_name(slug)), exist_ok=True)
+        count = len(times)
+        for field, value in zip(FIELDS, values):
+            self._append(slug, f"{field}.f32", array("f", [value]), count)
+        if changed:
+            self._trim_documents(slug, count)
+            with open(self._file(slug, "documents.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"index": count, **changed}, separators=(",", ":")) + "\n")
+        self._append(slug, "time.i64", array("q", [at]), count)
+        return True
+
+    def snapshots(self, slug, start=None, end=None, fields=FIELDS):
+        """Return ``[{"time", field: value}]`` for snapshots with ``start <= time <= end``."""
+        times = self._column(slug, "time.i64", "q")
+        lo = bisect.bisect_left(times, timestamp(start)) if start is not None else 0
+        hi = bisect.bisect_right(times, timestamp(end)) if end is not None else len(times)
+        columns = {field: self._column(slug, f"{field}.f32", "f", len(times)) for field in fields}
+        return [{"time": isoformat(times[i]), **{f: columns[f][i] for f in fields}} for i in range(lo, hi)]
+
+    def document(self, slug, at=None):
+        """Rebuild the full document as of ``at`` (default: the latest snapshot), or ``None``."""
+        times = self._column(slug, "time.i64", "q")
+        index = (bisect.bisect_right(times, timestamp(at)) if at is not None else len(times)) - 1
+        if index < 0:
+            return None
+        document = {field: self._column(slug, f"{field}.f32", "f", len(times))[index] for field in FIELDS}
+        document["lastUpdate"] = isoformat(times[index])
+        path = self._file(slug, "documents.jsonl")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.pop("index") > index:
+                        break
+                    document.update(entry)
+        return document
+
+    def _file(self, slug, name):
+        return os.path.join(self.path, directory_name(slug), name)
+
+    def _column(self, slug, name, typecode, count=None):
+        values = array(typecode)
+        path = self._file(slug, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            values.frombytes(data[:len(data) - len(data) % values.itemsize])
+        if name == "time.i64":
+            return values
+        return values[:count]
+
+    def _trim_documents(self, slug, count):
+        path = self._file(slug, "documents.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+        kept = [line for line in lines if json.loads(line)["index"] < count]
+        if len(kept) < len(lines):
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(kept)
+
+    def _append(self, slug, name, values, count):
+        path = self._file(slug, name)
+        with open(path, "ab") as f:
+            # Drop values left behind by an interrupted append.
+            if f.tell() > count * values.itemsize:
+                f.truncate(count * values.itemsize)
+            values.tofile(f)
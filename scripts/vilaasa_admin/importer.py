@@ -0,0 +1,332 @@
+"""Create or update products from a CSV or JSONL feed.
+
+    vilaasa-admin import data/franchises.csv
+    vilaasa-admin import partner-feed.jsonl.gz --errors rejected.csv --dry-run
+
+One row per product. Columns (the CSV header, or JSONL keys):
+
+``slug``, ``name``, ``product_type``
+    Required; the product type by name or slug.
+``category``
+    Category slug.
+``description``
+    Text turned into EditorJS: ``#`` to ``######`` lines are headers, runs
+    of ``- `` lines are lists, other lines are paragraphs (a blank line
+    ends one). ``description_json`` takes an EditorJS document as is.
+``price``, ``sku``
+    The default variant; ``sku`` defaults to ``<slug>-default``.
+``published``, ``available_at``
+    Channel listing. Published rows (the default) are also visible and
+    purchasable, from ``available_at`` when given.
+``metadata.<key>``
+    Public metadata.
+any attribute slug
+    The value by name; choices also match ignoring case and punctuation.
+    Multiselect values are separated by ``;`` (or given as a JSON list).
+
+Rows are streamed and validated locally against the attribute catalog and
+the registry, so a typo costs a line in the error report rather than a
+request or a stray attribute value. Valid rows go through the reconcile
+engine a round at a time: missing products are created with
+``productBulkCreate`` in ``chunk_size`` rows, changed ones are updated and
+unchanged ones are left alone, so rerunning a feed is cheap.
+"""
+import csv
+import difflib
+import gzip
+import json
+import re
+from collections import Counter
+
+from . import config
+from .attributes import AttributeCatalog
+from .bulk import batched
+from .dedupe import normalize
+from .reconcile import Reconciler
+from .registry import get_registry
+from .remap import CHOICE_TYPES
+
+COLUMNS = ("slug", "name", "product_type", "category", "description", "description_json",
+           "price", "sku", "published", "available_at")
+# Rows validated and reconciled together; bounds memory for any feed size.
+ROUND_SIZE = 500
+
+_SLUG = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+_HEADER = re.compile(r"^(#{1,6})\s+(.*)$")
+_BOOLEANS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+
+
+def read_rows(path):
+    """Yield ``(line, row, problem)`` from a CSV or JSONL file, gzipped or not.
+
+    ``problem`` is a message for rows that could not be parsed at all.
+    Empty CSV cells are dropped, so they mean "not given".
+    """
+    base = path[:-3] if path.endswith(".gz") else path
+    opener = gzip.open if base != path else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if base.endswith(".csv"):
+            reader = csv.DictReader(f)
+            reader.fieldnames  # reads the header, so line numbers start after it
+            while True:
+                line = reader.line_num + 1
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                if None in row:
+                    yield line, row, f"{len(row[None])} cell(s) more than the header"
+                    continue
+                yield line, {k: v.strip() for k, v in row.items() if v and v.strip()}, None
+        elif base.endswith((".jsonl", ".ndjson")):
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as e:
+                    yield line, {}, f"invalid JSON: {e}"
+                    continue
+                if not isinstance(row, dict):
+                    yield line, {}, "expected a JSON object"
+                    continue
+                yield line, {k: v for k, v in row.items() if v not in (None, "")}, None
+        else:
+            raise ValueError(f"Unknown feed format: {path} (use .csv or .jsonl, optionally .gz)")
+
+
+def editorjs(text):
+    """Turn plain text into an EditorJS document (see the module docstring)."""
+    blocks, paragraph, items = [], [], []
+
+    def flush():
+        if paragraph:
+            blocks.append({"type": "paragraph", "data": {"text": " ".join(paragraph)}})
+            paragraph.clear()
+        if items:
+            blocks.append({"type": "list", "data": {"style": "unordered", "items": list(items)}})
+            items.clear()
+
+    for line in text.splitlines():
+        line = line.strip()
+        header = _HEADER.match(line)
+        if not line:
+            flush()
+        elif header:
+            flush()
+            blocks.append({"type": "header", "data": {"text": header.group(2), "level": len(header.group(1))}})
+        elif line.startswith("- "):
+            if paragraph:
+                flush()
+            items.append(line[2:].strip())
+        else:
+            if items:
+                flush()
+            paragraph.append(line)
+    flush()
+    return {"blocks": blocks}
+
+
+class RowValidator:
+    """Turns feed rows into reconcile product documents, or lists of problems."""
+
+    def __init__(self, catalog, registry, create_values=False):
+        self.catalog = catalog
+        self.registry = registry
+        self.create_values = create_values
+        self.seen = {}  # slug -> first line
+
+    def document(self, line, row):
+        """Return ``(document, problems)``; ``document`` is ``None`` when there are problems."""
+        problems = []
+        slug, name, product_type = row.get("slug"), row.get("name"), row.get("product_type")
+        if not slug:
+            problems.append("slug is required")
+        elif not _SLUG.match(str(slug)):
+            problems.append(f"slug {slug!r} is not lowercase letters, digits and dashes")
+        elif slug in self.seen:
+            problems.append(f"slug {slug!r} already used on line {self.seen[slug]}")
+        else:
+            self.seen[slug] = line
+        if not name:
+            problems.append("name is required")
+        if not product_type:
+            problems.append("product_type is required")
+        elif not (self.registry.id("product_type", name=product_type) or self.registry.id("product_type", slug=product_type)):
+            problems.append(f"unknown product type {product_type!r}")
+
+        document = {"slug": slug, "name": name, "productType": product_type}
+        if "category" in row:
+            if self.registry.id("category", slug=row["category"]):
+                document["category"] = row["category"]
+            else:
+                problems.append(f"unknown category {row['category']!r}")
+        if "description_json" in row:
+            try:
+                value = row["description_json"]
+                document["description"] = json.loads(value) if isinstance(value, str) else value
+            except ValueError as e:
+                problems.append(f"description_json is not JSON: {e}")
+        elif "description" in row:
+            document["description"] = editorjs(str(row["description"]))
+
+        if "price" in row:
+            try:
+                price = float(row["price"])
+            except (TypeError, ValueError):
+                problems.append(f"price {row['price']!r} is not a number")
+            else:
+                if price < 0:
+                    problems.append("price is negative")
+                document["variant"] = {"sku": row.get("sku") or f"{slug}-default", "price": price}
+
+        published = _BOOLEANS.get(str(row.get("published", "true")).lower())
+        if published is None:
+            problems.append(f"published {row['published']!r} is not true or false")
+        else:
+            document["listing"] = {"isPublished": published, "visibleInListings": published,
+                                   "isAvailableForPurchase": published}
+            if published and "available_at" in row:
+                document["listing"]["availableForPurchaseAt"] = row["available_at"]
+
+        attributes, metadata = {}, {}
+        for key, value in row.items():
+            if key in COLUMNS:
+                continue
+            if key.startswith("metadata."):
+                metadata[key[len("metadata."):]] = value
+            elif self.catalog.attribute(key) is None:
+                problems.append(f"unknown column or attribute {key!r}")
+            else:
+                value, problem = self._attribute_value(key, value)
+                if problem:
+                    problems.append(problem)
+                else:
+                    attributes[key] = value
+        if attributes:
+            document["attributes"] = attributes
+        if metadata:
+            document["metadata"] = metadata
+        return (None, problems) if problems else (document, [])
+
+    def _attribute_value(self, slug, value):
+        attribute = self.catalog.attribute(slug)
+        kind = attribute["inputType"]
+        if kind == "RICH_TEXT":
+            return (editorjs(value) if isinstance(value, str) else value), None
+        if kind == "NUMERIC":
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                return None, f"{slug}: {value!r} is not a number"
+            return str(value), None
+        if kind not in CHOICE_TYPES:
+            return str(value), None
+
+        if isinstance(value, list):
+            names = [str(v).strip() for v in value]
+        else:
+            names = [v.strip() for v in str(value).split(";")] if kind == "MULTISELECT" else [str(value)]
+        if kind != "MULTISELECT" and len(names) != 1:
+            return None, f"{slug}: takes one value, got {len(names)}"
+        resolved = []
+        for name in names:
+            choice = self._choice(attribute, name)
+            if choice is None:
+                if not self.create_values:
+                    choices = [c["name"] for c in attribute["choices"]]
+                    close = difflib.get_close_matches(name, choices, 1)
+                    hint = f" (did you mean {close[0]!r}?)" if close else ""
+                    return None, f"{slug}: unknown value {name!r}{hint}"
+                choice = name
+            resolved.append(choice)
+        return (resolved if kind == "MULTISELECT" else resolved[0]), None
+
+    def _choice(self, attribute, name):
+        if self.catalog.value_id(attribute["slug"], name=name):
+            return name
+        key = normalize(name)
+        return next((c["name"] for c in attribute["choices"] if normalize(c["name"]) == key), None)
+
+
+class ErrorReport:
+    """Prints rejected rows and, given a path, writes them to a CSV file."""
+
+    def __init__(self, path=None):
+        self.count = 0
+        self.file = open(path, "w", newline="", encoding="utf-8") if path else None
+        self.writer = csv.writer(self.file) if path else None
+        if self.writer:
+            self.writer.writerow(["line", "slug", "stage", "message"])
+
+    def add(self, line, slug, stage, problems, echo=True):
+        self.count += 1
+        message = "; ".join(describe(p) for p in problems)
+        if echo:
+            print(f"Line {line} ({slug or 'no slug'}): {message}")
+        if self.writer:
+            self.writer.writerow([line, slug or "", stage, message])
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def describe(problem):
+    if isinstance(problem, dict):
+        where = problem.get("field") or ".".join(str(p) for p in problem.get("path") or [])
+        return f"{where}: {problem.get('message')}" if where else str(problem.get("message"))
+    return str(problem)
+
+
+def summary(counts):
+    return ", ".join(f"{counts[k]} {k}" for k in ("created", "updated", "unchanged", "failed"))
+
+
+def import_catalog(client, path, chunk_size=None, dry_run=False, create_values=False, errors=None, channel=None):
+    """Import the feed at ``path``; return counts of rows created, updated, unchanged and failed."""
+    catalog = AttributeCatalog(client).load()
+    validator = RowValidator(catalog, get_registry(client), create_values)
+    report = ErrorReport(errors)
+    totals = Counter()
+    try:
+        for rows in batched(read_rows(path), ROUND_SIZE):
+            documents, lines = [], {}
+            for line, row, problem in rows:
+                document, problems = (None, [problem]) if problem else validator.document(line, row)
+                if problems:
+                    report.add(line, row.get("slug"), "validate", problems)
+                    continue
+                documents.append(document)
+                lines[document["slug"]] = line
+
+            round_totals = Counter(failed=len(rows) - len(documents))
+            if documents:
+                reconciler = Reconciler(client, {"channel": channel or config.CHANNEL_SLUG, "products": documents},
+                                        chunk_size or config.BATCH_SIZE, catalog=catalog)
+                changes = reconciler.plan() if dry_run else reconciler.apply()
+                status = {}
+                for change in changes:
+                    if change.kind == "product" and change.action == "create":
+                        status[change.key] = "created"
+                    elif change.kind != "attribute_value":
+                        status.setdefault(change.key, "updated")
+                for slug, problems in reconciler.errors.items():
+                    # Already printed by the reconciler.
+                    report.add(lines[slug], slug, "apply", problems, echo=False)
+                    status[slug] = "failed"
+                for document in documents:
+                    round_totals[status.get(document["slug"], "unchanged")] += 1
+            totals.update(round_totals)
+            totals["rows"] += len(rows)
+            print(f"Lines {rows[0][0]}-{rows[-1][0]}: {summary(round_totals)}")
+    finally:
+        report.close()
+    print(f"{'Dry run, nothing changed. ' if dry_run else ''}{totals['rows']} row(s): {summary(totals)}.")
+    if report.count and errors:
+        print(f"Rejected rows written to {errors}.")
+    return dict(totals)
+
+
+def run_import(client, path, chunk_size=None, errors=None, create_values=False, dry_run=False):
+    import_catalog(client, path, chunk_size=chunk_size, dry_run=dry_run, create_values=create_values, errors=errors)
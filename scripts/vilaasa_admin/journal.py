@@ -0,0 +1,131 @@
+"""Append-only write-ahead journal so interrupted admin runs can resume.
+
+Each step of a run is identified by a stable key (``"create:zen-wellness-goa"``).
+Before the mutation is sent the step is journaled as planned; once it
+succeeded the result ID is journaled as committed. Rerunning the script
+replays the journal and skips every committed step, returning its
+recorded result instead of talking to the server again.
+
+Records are buffered and fsynced in batches (every ``sync_every`` commits
+or ``sync_interval`` seconds, and on close), so journaling costs one disk
+flush per batch rather than per mutation. A crash can therefore lose at
+most the last unsynced batch; those steps run again on resume.
+"""
+import json
+import os
+import threading
+import time
+
+from . import config
+
+PLANNED = "planned"
+COMMITTED = "committed"
+
+
+class Journal:
+    def __init__(self, name, path=None, sync_every=50, sync_interval=1.0):
+        self.path = path or config.state_path(f"journal-{name}.jsonl")
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.results = {}
+        self.pending = set()
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        valid = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid += len(line)
+                if record["state"] == COMMITTED:
+                    self.results[record["key"]] = record.get("result")
+                    self.pending.discard(record["key"])
+                else:
+                    self.pending.add(record["key"])
+        # Drop a torn final line left by a crash mid-write, so new records
+        # start on a line of their own.
+        if valid < os.path.getsize(self.path):
+            os.truncate(self.path, valid)
+
+    def done(self, key):
+        return key in self.results
+
+    def result(self, key):
+        return self.results.get(key)
+
+    def plan(self, key, **detail):
+        self._append({"key": key, "state": PLANNED, **detail}, commit=False)
+
+    def commit(self, key, result=None):
+        self._append({"key": key, "state": COMMITTED, "result": result}, commit=True)
+        self.results[key] = result
+
+    def step(self, key, action, **detail):
+        """Run ``action()`` unless ``key`` already committed; return its result.
+
+        ``action`` signals failure by raising or returning ``None``; only
+        successful steps are committed, so failed ones run again on resume.
+        """
+        if key in self.results:
+            return self.results[key]
+        self.plan(key, **detail)
+        result = action()
+        if result is not None:
+            self.commit(key, result)
+        return result
+
+    def _append(self, record, commit):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            if not commit:
+                self.pending.add(record["key"])
+                return
+            self.pending.discard(record["key"])
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+    def finish(self):
+        """Close and remove the journal after a run completed end to end."""
+        self.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep the journal around for a resume unless every planned step
+        # committed: a failed step (or bulk row) stays pending, and the
+        # next run must still skip the steps that did commit.
+        if exc_type is None and not self.pending:
+            self.finish()
+        else:
+            self.close()
@@ -0,0 +1,313 @@
+"""Image ingest: cached downloads feeding concurrent ``productMediaCreate`` uploads."""
+import hashlib
+import json
+import mimetypes
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+
+import requests
+
+from . import config
+from .client import SaleorError
+from .executor import run_concurrently
+
+PRODUCT_MEDIA_CREATE = """
+mutation ProductMediaCreate($product: ID!, $image: Upload!, $alt: String!) {
+  productMediaCreate(input: { product: $product, image: $image, alt: $alt }) {
+    media { id url }
+    errors { field message }
+  }
+}
+"""
+
+PRODUCT_MEDIA_DELETE = """
+mutation ProductMediaDelete($id: ID!) {
+  productMediaDelete(id: $id) {
+    errors { field message }
+  }
+}
+"""
+
+UPDATE_PRIVATE_METADATA = """
+mutation MediaIndex($id: ID!, $input: [MetadataInput!]!) {
+  updatePrivateMetadata(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+# Selection that MediaIndex needs for every product it manages.
+MEDIA_FIELDS = "id media { id alt } privateMetadata { key value }"
+
+# Private product metadata key holding {media_id: {"sha256": ..., "alt": ...}}.
+MEDIA_INDEX_KEY = "vilaasa.media"
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadCache:
+    """Content-addressed on-disk cache of downloaded files, keyed by URL.
+
+    Blobs live under ``blobs/<sha256>``, so the same image behind two URLs is
+    stored once. A cached URL is served from disk without contacting the
+    origin; with ``revalidate=True`` a conditional GET (ETag /
+    Last-Modified) is sent and the body is only downloaded again on a
+    change.
+    """
+
+    def __init__(self, directory=None, session=None, timeout=None):
+        self.directory = directory or os.path.join(config.CACHE_DIR, "downloads")
+        os.makedirs(os.path.join(self.directory, "blobs"), mode=0o700, exist_ok=True)
+        # A separate session so the admin token never goes to the image host.
+        self.session = session or requests.Session()
+        self.timeout = timeout or (config.CONNECT_TIMEOUT, config.READ_TIMEOUT)
+        self.db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+        self.db.executescript(CACHE_SCHEMA)
+        self._lock = threading.Lock()
+        self._url_locks = {}
+
+    def blob_path(self, sha256):
+        return os.path.join(self.directory, "blobs", sha256)
+
+    def get(self, url, revalidate=False):
+        """Return ``(path, sha256, content_type)`` for ``url``, downloading if needed."""
+        # Concurrent requests for one URL wait for a single download.
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            return self._get(url, revalidate)
+
+    def _get(self, url, revalidate):
+        entry = self._entry(url)
+        if entry and not os.path.exists(self.blob_path(entry[0])):
+            entry = None
+        if entry and not revalidate:
+            return self.blob_path(entry[0]), entry[0], entry[1]
+
+        headers = {}
+        if entry and entry[2]:
+            headers["If-None-Match"] = entry[2]
+        if entry and entry[3]:
+            headers["If-Modified-Since"] = entry[3]
+
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and entry:
+                    return self.blob_path(entry[0]), entry[0], entry[1]
+                if response.status_code != 200:
+                    raise SaleorError(f"Download of {url} failed ({response.status_code})", response=response)
+                sha256 = self._store(response)
+                content_type = response.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except requests.RequestException as e:
+            raise SaleorError(f"Download of {url} failed: {e}") from e
+
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO downloads (url, sha256, content_type, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (url, sha256, content_type, etag, last_modified),
+            )
+        return self.blob_path(sha256), sha256, content_type
+
+    def _store(self, response):
+        # Stream to a temp file while hashing, then move it into place; a
+        # crashed download never leaves a partial blob behind.
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+            sha256 = digest.hexdigest()
+            os.replace(tmp, self.blob_path(sha256))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return sha256
+
+    def _entry(self, url):
+        with self._lock:
+            return self.db.execute(
+                "SELECT sha256, content_type, etag, last_modified FROM downloads WHERE url = ?", (url,)
+            ).fetchone()
+
+    def close(self):
+        self.db.close()
+        self.session.close()
+
+
+class MediaIndex:
+    """Which content each product's media holds, by SHA-256.
+
+    The map lives in the product's private metadata, so deciding whether an
+    image is already attached never requires downloading existing media.
+    Untracked media whose alt text matches the image (uploads made before
+    the index existed) are adopted instead of duplicated.
+    """
+
+    SKIP, ATTACH, REPLACE = "skip", "attach", "replace"
+
+    def __init__(self, products):
+        """``products`` maps a product ID to a node selected with ``MEDIA_FIELDS``."""
+        self.entries = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        for product_id, product in products.items():
+            live = {m["id"]: m["alt"] for m in product["media"]}
+            metadata = {m["key"]: m["value"] for m in product.get("privateMetadata") or []}
+            stored = json.loads(metadata.get(MEDIA_INDEX_KEY) or "{}")
+            # Forget media that were deleted in the dashboard.
+            entries = {media_id: entry for media_id, entry in stored.items() if media_id in live}
+            for media_id, alt in live.items():
+                entries.setdefault(media_id, {"sha256": None, "alt": alt})
+            self.entries[product_id] = entries
+            if entries != stored:
+                self._dirty.add(product_id)
+
+    def decide(self, product_id, sha256, alt):
+        """Return ``(action, media_id)`` for attaching ``sha256`` to a product.
+
+        ``skip`` names the media that already holds the content; ``replace``
+        names the media (same alt, different content) the new upload
+        supersedes.
+        """
+        with self._lock:
+            entries = self.entries.setdefault(product_id, {})
+            for media_id, entry in entries.items():
+                if entry["sha256"] == sha256:
+                    return self.SKIP, media_id
+            for media_id, entry in entries.items():
+                if entry["alt"] == alt:
+                    if entry["sha256"] is None:
+                        entry["sha256"] = sha256
+                        self._dirty.add(product_id)
+                        return self.SKIP, media_id
+                    return self.REPLACE, media_id
+            return self.ATTACH, None
+
+    def record(self, product_id, media_id, sha256, alt, replaces=None):
+        with self._lock:
+            entries = self.entries.setdefault(product_id, {})
+            entries.pop(replaces, None)
+            entries[media_id] = {"sha256": sha256, "alt": alt}
+            self._dirty.add(product_id)
+
+    def save(self, client):
+        """Write the index of every changed product back to its private metadata."""
+        with self._lock:
+            jobs = [
+                (UPDATE_PRIVATE_METADATA, {"id": product_id, "input": [
+                    {"key": MEDIA_INDEX_KEY, "value": json.dumps(self.entries[product_id], sort_keys=True)}
+                ]})
+                for product_id in sorted(self._dirty)
+            ]
+            self._dirty.clear()
+        for (_, variables), (data, error) in zip(jobs, run_concurrently(client, jobs)):
+            errors = error or data["updatePrivateMetadata"]["errors"]
+            if errors:
+                print(f"Error saving media index for {variables['id']}:", errors)
+
+
+def upload_media(client, product_id, path, content_type, alt):
+    """Attach the file at ``path`` to a product; return the mutation payload."""
+    filename = os.path.basename(path) + (mimetypes.guess_extension(content_type) or "")
+    # The open file is streamed into the request body, never read whole.
+    with open(path, "rb") as f:
+        res = client.upload(PRODUCT_MEDIA_CREATE, {"product": product_id, "alt": alt},
+                            {"image": (filename, f, content_type)})
+    if res.get("errors"):
+        raise SaleorError(res["errors"][0].get("message", "GraphQL error"), errors=res["errors"])
+    return res["data"]["productMediaCreate"]
+
+
+_DONE = object()
+
+
+def ingest(client, items, cache=None, download_workers=8, upload_workers=None, revalidate=False, index=None):
+    """Download and attach images with overlapping stages.
+
+    ``items`` are ``(product_id, url, alt)`` tuples. Download threads fill a
+    bounded queue that a separate pool of upload threads drains, so uploads
+    start as soon as the first image is on disk. With a ``MediaIndex``,
+    images a product already holds are skipped and superseded media are
+    deleted after the replacement is attached; call ``index.save()``
+    afterwards.
+
+    Returns one ``(item, action, payload, error)`` tuple per item, in input
+    order; ``action`` is ``"skip"``, ``"attach"`` or ``"replace"``. Any
+    exception raised for an item becomes that item's ``error``; the workers
+    carry on with the rest.
+    """
+    items = list(items)
+    cache = cache or DownloadCache()
+    upload_workers = min(upload_workers or client.concurrency, client.concurrency)
+    results = [None] * len(items)
+
+    todo = queue.Queue()
+    for position, item in enumerate(items):
+        todo.put((position, item))
+    # Bounded so downloads cannot run arbitrarily far ahead of uploads.
+    ready = queue.Queue(maxsize=upload_workers * 2)
+
+    def download():
+        while True:
+            try:
+                position, item = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                path, sha256, content_type = cache.get(item[1], revalidate=revalidate)
+                action, media_id = index.decide(item[0], sha256, item[2]) if index else (MediaIndex.ATTACH, None)
+            except Exception as e:
+                results[position] = (item, MediaIndex.ATTACH, None, e)
+                continue
+            if action == MediaIndex.SKIP:
+                results[position] = (item, action, {"media": {"id": media_id}, "errors": []}, None)
+                continue
+            ready.put((position, item, path, sha256, content_type, action, media_id))
+
+    def upload():
+        # Never returns before _DONE: downloaders block on the bounded queue
+        # until it is drained.
+        while True:
+            job = ready.get()
+            if job is _DONE:
+                return
+            position, item, path, sha256, content_type, action, old_media_id = job
+            try:
+                payload = upload_media(client, item[0], path, content_type, item[2])
+                if not payload["errors"]:
+                    if index:
+                        index.record(item[0], payload["media"]["id"], sha256, item[2], replaces=old_media_id)
+                    if old_media_id:
+                        client.data(PRODUCT_MEDIA_DELETE, {"id": old_media_id})
+                results[position] = (item, action, payload, None)
+            except Exception as e:
+                results[position] = (item, action, None, e)
+
+    downloaders = [threading.Thread(target=download, daemon=True) for _ in range(min(download_workers, len(items)))]
+    uploaders = [threading.Thread(target=upload, daemon=True) for _ in range(upload_workers)]
+    for thread in downloaders + uploaders:
+        thread.start()
+    for thread in downloaders:
+        thread.join()
+    for _ in uploaders:
+        ready.put(_DONE)
+    for thread in uploaders:
+        thread.join()
+    return results
@@ -0,0 +1,138 @@
+"""Per-operation request metrics and the ``--profile`` report.
+
+The transport records one sample per logical request (retries included)
+under the GraphQL operation name: wall time, bytes sent and received,
+retries and server errors. Recording is a lock and a list append, cheap
+enough to stay on for every run.
+"""
+import json
+import re
+import threading
+from functools import lru_cache
+
+# Upper bounds (seconds) of the Prometheus histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_NAMED = re.compile(r"^\s*(?:query|mutation|subscription)\s+(\w+)")
+_FIRST_FIELD = re.compile(r"\{\s*(?:\w+\s*:\s*)?(\w+)")
+
+
+@lru_cache(maxsize=1024)
+def operation_name(query):
+    """Name a request by its operation name, else by its first root field."""
+    if not query:
+        return "unknown"
+    match = _NAMED.match(query) or _FIRST_FIELD.search(query)
+    return match.group(1) if match else "unknown"
+
+
+class Stats:
+    __slots__ = ("durations", "sent", "received", "retries", "errors")
+
+    def __init__(self):
+        self.durations = []
+        self.sent = 0
+        self.received = 0
+        self.retries = 0
+        self.errors = 0
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Metrics:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds, sent=0, received=0, retries=0, error=False):
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = Stats()
+            stats.durations.append(seconds)
+            stats.sent += sent
+            stats.received += received
+            stats.retries += retries
+            stats.errors += bool(error)
+
+    def error(self, operation):
+        """Count a GraphQL-level error on an otherwise successful request."""
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is not None:
+                stats.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def summary(self):
+        """Return ``{operation: {...}}`` with counts, percentiles and totals."""
+        with self._lock:
+            items = [(name, sorted(s.durations), s.sent, s.received, s.retries, s.errors)
+                     for name, s in self._stats.items()]
+        summary = {}
+        for name, durations, sent, received, retries, errors in items:
+            summary[name] = {
+                "count": len(durations),
+                "total_seconds": sum(durations),
+                "p50": percentile(durations, 0.50),
+                "p95": percentile(durations, 0.95),
+                "p99": percentile(durations, 0.99),
+                "max": durations[-1] if durations else 0.0,
+                "bytes_sent": sent,
+                "bytes_received": received,
+                "retries": retries,
+                "errors": errors,
+            }
+        return summary
+
+    def table(self):
+        summary = self.summary()
+        rows = sorted(summary.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        header = f"{'operation':<32} {'count':>6} {'total s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sent KB':>8} {'recv KB':>8} {'retry':>5} {'err':>4}"
+        lines = [header, "-" * len(header)]
+        for name, s in rows:
+            lines.append(
+                f"{name[:32]:<32} {s['count']:>6} {s['total_seconds']:>8.2f} {s['p50'] * 1000:>8.1f} "
+                f"{s['p95'] * 1000:>8.1f} {s['p99'] * 1000:>8.1f} {s['bytes_sent'] / 1024:>8.1f} "
+                f"{s['bytes_received'] / 1024:>8.1f} {s['retries']:>5} {s['errors']:>4}"
+            )
+        requests = sum(s["count"] for s in summary.values())
+        lines.append(f"{requests} requests, {sum(s['total_seconds'] for s in summary.values()):.2f} s in flight")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        with self._lock:
+            items = [(name, list(s.durations), s.sent, s.received, s.retries, s.errors)
+                     for name, s in sorted(self._stats.items())]
+        lines = [
+            "# TYPE saleor_request_seconds histogram",
+        ]
+        for name, durations, _, _, _, _ in items:
+            for bound in BUCKETS:
+                lines.append(f'saleor_request_seconds_bucket{{operation="{name}",le="{bound}"}} {sum(d <= bound for d in durations)}')
+            lines.append(f'saleor_request_seconds_bucket{{operation="{name}",le="+Inf"}} {len(durations)}')
+            lines.append(f'saleor_request_seconds_sum{{operation="{name}"}} {sum(durations)}')
+            lines.append(f'saleor_request_seconds_count{{operation="{name}"}} {len(durations)}')
+        for metric, index in (("saleor_request_bytes_sent_total", 2), ("saleor_request_bytes_received_total", 3),
+                              ("saleor_request_retries_total", 4), ("saleor_request_errors_total", 5)):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{operation="{item[0]}"}} {item[index]}' for item in items)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the report as JSON, or Prometheus text for ``.prom``/``.txt`` paths."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+
+METRICS = Metrics()
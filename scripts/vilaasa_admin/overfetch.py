@@ -0,0 +1,361 @@
+"""How much of each storefront query's response the storefront actually reads.
+
+The GraphQL documents come from src/lib/graphql.ts and src/hooks/*.ts. The
+fields the site reads are found statically: every ``.field``, ``?.field``,
+``["field"]`` and destructured name in the functions a query's response
+flows through, starting at its ``graphqlRequest`` calls and following the
+functions they mention across the files that import lib/graphql (query
+texts, comments and type declarations left out). A field counts as read
+when every name on its path is read there, so the report errs towards
+"read": what it lists as unused is safe to drop.
+
+Each query runs with the variables of its ``graphqlRequest`` call site;
+variables filled at runtime (``{ slug }``) take a value found in an earlier
+response. The backend is one of:
+
+* a stand-in (default): the benchmark's FakeSaleor (bench/fakesaleor.py)
+  seeded in-process with the checked-in catalog (data/*.csv), its images
+  and the construction metadata, so sizes are those of real listings;
+* ``recorded``: responses saved earlier with ``record`` (a JSON file
+  ``{query: {"variables", "data"}}``), e.g. from production;
+* ``live``: the configured server, without a token as the site queries it.
+
+Byte costs are of the compact JSON, inclusive of everything under a field.
+A field that is null, empty or missing in every response is reported as
+"unmeasured", not as costing nothing: the sample says nothing about it.
+"""
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import tempfile
+from collections import defaultdict
+
+from . import config, storefront
+from .client import SaleorClient, SaleorError
+
+SOURCES = [storefront.GRAPHQL_TS, os.path.join(storefront.REPO_ROOT, "src", "hooks", "*.ts")]
+CODE = [os.path.join(storefront.REPO_ROOT, "src", "**", "*.ts"), os.path.join(storefront.REPO_ROOT, "src", "**", "*.tsx")]
+
+IMPORTS_GRAPHQL = re.compile(r"""from\s+["'][^"']*lib/graphql["']""")
+DECLARATION = re.compile(r"\b(?:interface\s+\w+[^{]*|type\s+\w+\s*=\s*)\{")
+COMMENT = re.compile(r"/\*.*?\*/|(?<![:\"'\w])//[^\n]*", re.S)
+READ = re.compile(r"(?:\?\.|(?<!\.)\.(?!\.))\s*([A-Za-z_$][\w$]*)|\[\s*[\"']([\w$]+)[\"']\s*\]")
+DESTRUCTURE = re.compile(r"\{([^{}]*)\}\s*(?::[^=;]*)?=(?!=)")
+FUNCTION = re.compile(r"\bfunction\s+(\w+)[^(]*\(|\b(?:const|let)\s+(\w+)\s*=\s*(?:async\s+)?(?:\([^()]*\)|\w+)\s*(?::[^=;]*)?=>")
+VARIABLE = re.compile(r"\$(\w+)\s*:")
+
+
+def expand(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    return paths
+
+
+def find_documents(paths):
+    """``{name: document}`` for the GraphQL operations defined in ``paths``."""
+    found = {}
+    for path in paths:
+        found.update(storefront.documents(path))
+    return found
+
+
+def _strip(text, documents):
+    for document in documents:
+        text = text.replace(document, "")
+    text = COMMENT.sub("", text)
+    # Type declarations name every field; they are not reads.
+    while True:
+        match = DECLARATION.search(text)
+        if not match:
+            return text
+        depth, end = 0, match.end() - 1
+        for end in range(match.end() - 1, len(text)):
+            depth += {"{": 1, "}": -1}.get(text[end], 0)
+            if depth == 0:
+                break
+        text = text[:match.start()] + text[end + 1:]
+
+
+def reads(text):
+    """Property names read in (stripped) TypeScript ``text``."""
+    names = {a or b for a, b in READ.findall(text)}
+    for match in DESTRUCTURE.finditer(text):
+        for part in match.group(1).split(","):
+            name = part.split(":")[0].split("=")[0].strip().lstrip(".")
+            if name.isidentifier():
+                names.add(name)
+    return names
+
+
+def _closing(text, start, pairs="{}"):
+    """Index just past the bracket that closes the one at ``start``."""
+    depth = 0
+    for i in range(start, len(text)):
+        depth += {pairs[0]: 1, pairs[1]: -1}.get(text[i], 0)
+        if depth == 0:
+            return i + 1
+    return len(text)
+
+
+def functions(text):
+    """``[(name, start, end)]`` for the named functions and arrow-function constants in ``text``."""
+    found = []
+    for match in FUNCTION.finditer(text):
+        if match.group(1):
+            start = text.find("{", _closing(text, match.end() - 1, "()"))
+        else:
+            start = match.end() + len(text[match.end():]) - len(text[match.end():].lstrip())
+        if start < 0:
+            continue
+        if text[start] == "{":
+            end = _closing(text, start)
+        else:
+            # Expression body: up to the end of the statement.
+            end = re.compile(r";|\n\s*\n").search(text, start)
+            end = end.end() if end else len(text)
+        found.append((match.group(1) or match.group(2), match.start(), end))
+    return found
+
+
+def query_reads(paths, documents, name):
+    """Names read by the code a query's response flows through, or ``None`` without call sites.
+
+    Starts from the functions around each ``graphqlRequest(name, ...)`` call
+    and follows every function they mention, preferring definitions in the
+    same file.
+    """
+    call = re.compile(rf"graphqlRequest\s*(?:<[^>]*>)?\s*\(\s*{name}\b")
+    texts = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            texts[path] = _strip(f.read(), documents)
+    defined = {path: functions(text) for path, text in texts.items()}
+    queue = []
+    for path, text in texts.items():
+        for match in call.finditer(text):
+            around = [(end - start, start, end) for _, start, end in defined[path] if start <= match.start() < end]
+            _, start, end = min(around) if around else (0, 0, len(text))
+            queue.append((path, start, end))
+    if not queue:
+        return None
+
+    names, seen = set(), set(queue)
+    while queue:
+        path, start, end = queue.pop()
+        body = texts[path][start:end]
+        names |= reads(body)
+        words = set(re.findall(r"[A-Za-z_$][\w$]*", body))
+        for word in words:
+            local = [(path, s, e) for n, s, e in defined[path] if n == word]
+            targets = local or [(p, s, e) for p in texts if p != path for n, s, e in defined[p] if n == word]
+            for target in targets:
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+    return names
+
+
+def consumers(paths):
+    """The files among ``paths`` that import lib/graphql, and lib/graphql itself."""
+    chosen = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if os.path.abspath(path) == storefront.GRAPHQL_TS or IMPORTS_GRAPHQL.search(f.read()):
+                chosen.append(path)
+    return chosen
+
+
+def call_variables(paths, name):
+    """Variables of the first ``graphqlRequest(name, {...})`` call: literals, ``None`` for runtime values."""
+    pattern = re.compile(rf"graphqlRequest\s*(?:<[^>]*>)?\s*\(\s*{name}\s*,\s*\{{([^}}]*)\}}")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            match = pattern.search(f.read())
+        if match:
+            variables = {}
+            for part in match.group(1).split(","):
+                key, _, value = (text.strip() for text in part.partition(":"))
+                if key:
+                    try:
+                        variables[key] = json.loads(value.replace("'", '"')) if value else None
+                    except ValueError:
+                        variables[key] = None
+            return variables
+    return {}
+
+
+def find_value(value, key):
+    """The first value of ``key`` anywhere in a response, or ``None``."""
+    if isinstance(value, list):
+        return next((found for item in value if (found := find_value(item, key)) is not None), None)
+    if isinstance(value, dict):
+        if value.get(key) is not None:
+            return value[key]
+        return next((found for item in value.values() if (found := find_value(item, key)) is not None), None)
+    return None
+
+
+def field_costs(value, tree, path=(), costs=None, measured=None):
+    """``{path: bytes}`` for every selected field of a response value.
+
+    Paths with a non-null value somewhere are added to the ``measured`` set.
+    """
+    costs = defaultdict(int) if costs is None else costs
+    if isinstance(value, list):
+        for item in value:
+            field_costs(item, tree, path, costs, measured)
+    elif isinstance(value, dict) and tree:
+        for key, (_, subtree) in tree.items():
+            if key in value:
+                # "key":value plus its separator
+                costs[path + (key,)] += len(json.dumps(key)) + len(_dumps(value[key])) + 2
+                if measured is not None and value[key] is not None:
+                    measured.add(path + (key,))
+                field_costs(value[key], subtree, path + (key,), costs, measured)
+    return costs
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _paths(tree, path=()):
+    for key, (_, subtree) in tree.items():
+        yield path + (key,)
+        if subtree:
+            yield from _paths(subtree, path + (key,))
+
+
+def analyze(execute, documents, reads_for, variables_for):
+    """Run every document through ``execute(name, document, variables)`` and measure it.
+
+    ``reads_for(name)`` is the set of names the storefront reads from that
+    query's response, ``variables_for(name)`` its call-site variables.
+
+    Returns ``[{"name", "variables", "bytes", "fields": [{"path", "bytes", "read", "measured"}]}]``.
+    """
+    reports, responses = [], []
+    for name, document in documents.items():
+        variables = dict(variables_for(name))
+        for variable in VARIABLE.findall(document.split("{", 1)[0]):
+            if variables.get(variable) is None:
+                variables[variable] = next((v for r in responses if (v := find_value(r, variable)) is not None), None)
+        data = execute(name, document, variables)
+        responses.append(data)
+        read = reads_for(name)
+        tree = storefront.parse(document)
+        measured = set()
+        costs = field_costs(data, tree, measured=measured)
+        fields = [{"path": ".".join(path), "bytes": costs.get(path, 0), "read": all(key in read for key in path),
+                   "measured": path in measured}
+                  for path in _paths(tree)]
+        reports.append({"name": name, "variables": variables, "bytes": len(_dumps(data)), "fields": fields})
+    return reports
+
+
+def print_report(reports):
+    for report in reports:
+        total = report["bytes"] or 1
+        print(f"\n{report['name']} {json.dumps(report['variables'])}: {report['bytes']:,} bytes")
+        print(f"  {'field':<52} {'bytes':>10} {'share':>7}")
+        for field in report["fields"]:
+            depth = field["path"].count(".")
+            label = "  " * depth + field["path"].rsplit(".", 1)[-1]
+            flag = "" if field["read"] else "  unused"
+            if field["measured"]:
+                print(f"  {label:<52} {field['bytes']:>10,} {field['bytes'] / total:>7.1%}{flag}")
+            else:
+                print(f"  {label:<52} {'unmeasured':>18}{flag}")
+        unused = _topmost([f for f in report["fields"] if not f["read"]])
+        wasted = sum(f["bytes"] for f in unused)
+        if unused:
+            print(f"  Unused: {', '.join(f['path'] for f in unused)} ({wasted:,} bytes, {wasted / total:.1%})")
+        else:
+            print("  Every selected field is read.")
+        unmeasured = _topmost([f for f in report["fields"] if not f["measured"]])
+        if unmeasured:
+            print(f"  Unmeasured (null or empty in every response): {', '.join(f['path'] for f in unmeasured)}")
+
+
+def _topmost(fields):
+    # Only the topmost of nested fields; what is under them goes with them.
+    return [f for f in fields if not any(f["path"].startswith(g["path"] + ".") for g in fields)]
+
+
+@contextlib.contextmanager
+def stand_in():
+    """A FakeSaleor holding the checked-in catalog; yields an anonymous client."""
+    import recreate_franchises_v2
+    import seed_properties
+    import update_construction_data
+    import upload_images_to_backend
+    from bench.fakesaleor import FakeSaleor
+
+    from .construction import sync_construction
+    from .history import ConstructionHistory
+
+    with tempfile.TemporaryDirectory() as directory, FakeSaleor() as server:
+        # Keep the seeding's registry and tokens out of the real cache.
+        cache_dir, config.CACHE_DIR = config.CACHE_DIR, directory
+        try:
+            admin = SaleorClient(url=server.url)
+            admin.login()
+            with contextlib.redirect_stdout(io.StringIO()):
+                seed_properties.run_seed(admin)
+                recreate_franchises_v2.main(admin)
+                sync_construction(admin, {"palm-royale": update_construction_data.CONSTRUCTION_DATA},
+                                  history=ConstructionHistory(path=os.path.join(directory, "history")))
+            for slug, url in upload_images_to_backend.IMAGE_MAP.items():
+                if slug in server.store.products:
+                    server.store.create_media(server.store.products[slug], {"mediaUrl": url, "alt": slug})
+            yield SaleorClient(url=server.url)
+        finally:
+            config.CACHE_DIR = cache_dir
+
+
+def run_overfetch(client, recorded=None, record=None, live=False):
+    """CLI entry point."""
+    sources = expand(SOURCES)
+    documents = find_documents(sources)
+    code = consumers(expand(CODE))
+    everything = set()
+    for path in code:
+        with open(path, encoding="utf-8") as f:
+            everything |= reads(_strip(f.read(), documents.values()))
+
+    def reads_for(name):
+        # Queries without a graphqlRequest call site: anything read anywhere counts.
+        found = query_reads(code, documents.values(), name)
+        return everything if found is None else found
+
+    print(f"{len(documents)} queries in {len(sources)} files; reads followed through {len(code)} files.")
+
+    saved = {}
+    if recorded:
+        with open(recorded, encoding="utf-8") as f:
+            saved = json.load(f)
+
+    def execute(name, document, variables):
+        if recorded:
+            if name not in saved:
+                raise SaleorError(f"{recorded} has no response for {name}")
+            return saved[name]["data"]
+        data = backend.data(document, variables)
+        saved[name] = {"variables": variables, "data": data}
+        return data
+
+    with contextlib.ExitStack() as stack:
+        backend = (SaleorClient(url=client.url) if client.token else client) if live else None
+        if not recorded and not live:
+            backend = stack.enter_context(stand_in())
+        reports = analyze(execute, documents, reads_for, lambda name: call_variables(code, name))
+    print_report(reports)
+    if record:
+        with open(record, "w", encoding="utf-8") as f:
+            json.dump(saved, f, ensure_ascii=False)
+        print(f"\nResponses recorded to {record}.")
+    return reports
@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import SaleorError
+from .metrics import METRICS, operation_name
+
+# Saleor rejects `first` above 100.
+MAX_PAGE_SIZE = 100
+MIN_PAGE_SIZE = 10
+
+PRODUCTS_QUERY = """
+query Products($first: Int!, $after: String, $channel: String) {
+  products(first: $first, after: $after, channel: $channel) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { %s } }
+  }
+}
+"""
+
+
+class PageSizer:
+    """Grows or shrinks the page size based on how the last page went.
+
+    Fast, small pages double the size; slow or heavy pages halve it.
+    """
+
+    def __init__(self, size=50, min_size=MIN_PAGE_SIZE, max_size=MAX_PAGE_SIZE,
+                 target_seconds=1.0, target_bytes=2_000_000):
+        self.size = max(min_size, min(size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.target_bytes = target_bytes
+
+    def observe(self, elapsed, nbytes):
+        if elapsed > self.target_seconds or nbytes > self.target_bytes:
+            self.size = max(self.min_size, self.size // 2)
+        elif elapsed < self.target_seconds / 2 and nbytes < self.target_bytes / 2:
+            self.size = min(self.max_size, self.size * 2)
+        return self.size
+
+
+def fetch_page(client, query, path, variables):
+    """Fetch one page and return ``(connection, elapsed_seconds, response_bytes)``."""
+    started = time.perf_counter()
+    response = client.post(json={"query": query, "variables": variables})
+    elapsed = time.perf_counter() - started
+    res = client.decode(response)
+    if res.get("errors"):
+        METRICS.error(operation_name(query))
+        raise SaleorError(res["errors"][0].get("message", "GraphQL error"), errors=res["errors"])
+
+    connection = res["data"]
+    for key in path.split("."):
+        connection = connection[key]
+    return connection, elapsed, len(response.content)
+
+
+def iter_connection(client, query, path, variables=None, page_size=50, prefetch=True, sizer=None, after=None):
+    """Yield every node of a cursor-paginated connection.
+
+    ``query`` must declare ``$first: Int!`` and ``$after: String`` and select
+    ``pageInfo { hasNextPage endCursor }`` plus ``edges { node }`` on the
+    connection found at ``path`` (dotted, relative to ``data``). At most two
+    pages are held in memory: the one being consumed and, with ``prefetch``,
+    the next one already in flight. Pass ``after`` to resume from a cursor.
+    """
+    sizer = sizer or PageSizer(page_size)
+    base = dict(variables or {})
+
+    def request(after):
+        return fetch_page(client, query, path, {**base, "first": sizer.size, "after": after})
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        pending = None
+        page = request(after)
+        while True:
+            connection, elapsed, nbytes = page
+            sizer.observe(elapsed, nbytes)
+            info = connection["pageInfo"]
+            if info["hasNextPage"] and executor:
+                pending = executor.submit(request, info["endCursor"])
+
+            for edge in connection["edges"]:
+                yield edge["node"]
+
+            if not info["hasNextPage"]:
+                return
+            page = pending.result() if pending else request(info["endCursor"])
+            pending = None
+    finally:
+        if executor:
+            if pending:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+
+def iter_products(client, fields="id name", channel=None, **kwargs):
+    """Stream every product, selecting ``fields`` on each node."""
+    return iter_connection(client, PRODUCTS_QUERY % fields, "products", {"channel": channel}, **kwargs)
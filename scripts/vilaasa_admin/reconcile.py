@@ -0,0 +1,453 @@
+"""Declarative reconcile engine: diff a desired catalog against Saleor.
+
+A desired-state document looks like::
+
+    {
+      "channel": "default-channel",
+      "categories": [{"slug": "franchises", "name": "Franchises", "parent": null}],
+      "attributes": {"status": ["Ready to Move", "Under Construction"]},
+      "products": [{
+        "slug": "zen-wellness-goa",
+        "name": "Zen Wellness Spa",
+        "productType": "Franchise",            # product type name or slug
+        "category": "real-estate",             # category slug
+        "description": {"blocks": [...]},      # EditorJS
+        "attributes": {"location": "Goa", "status": "Ready to Move"},
+        "variant": {"sku": "zen-wellness-goa-default", "price": 70300000},
+        "listing": {"isPublished": true, "visibleInListings": true,
+                    "isAvailableForPurchase": true,
+                    "availableForPurchaseAt": "2025-01-01T00:00:00+00:00"},
+        "metadata": {"key": "value"}
+      }, {"slug": "old-listing", "delete": true}]
+    }
+
+Attribute values are given by name (plain text as the text itself).
+Only the keys present on a product are compared, so a partial document
+leaves everything else alone.
+"""
+import json
+from collections import namedtuple
+
+from . import config
+from .attributes import AttributeCatalog
+from .batch import resolve_products
+from .bulk import bulk_create_products, bulk_delete_products
+from .client import SaleorError
+from .executor import run_concurrently
+from .pagination import iter_connection
+from .registry import CATEGORIES_QUERY, get_registry, not_found
+
+Change = namedtuple("Change", "action kind key fields")
+
+LIVE_PRODUCT_FIELDS = """
+id slug name description
+productType { id slug name }
+category { id slug }
+attributes {
+  attribute { slug inputType }
+  values { id name slug plainText richText }
+}
+variants {
+  id sku
+  channelListings { channel { id } price { amount } costPrice { amount } }
+}
+channelListings { channel { id } isPublished visibleInListings isAvailableForPurchase availableForPurchaseAt }
+metadata { key value }
+"""
+
+CATEGORY_CREATE = """
+mutation CategoryCreate($parent: ID, $input: CategoryInput!) {
+  categoryCreate(parent: $parent, input: $input) {
+    category { id slug name }
+    errors { field message }
+  }
+}
+"""
+
+CATEGORY_UPDATE = """
+mutation CategoryUpdate($id: ID!, $input: CategoryInput!) {
+  categoryUpdate(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+PRODUCT_UPDATE = """
+mutation ProductUpdate($id: ID!, $input: ProductInput!) {
+  productUpdate(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+VARIANT_PRICE_UPDATE = """
+mutation VariantPrice($id: ID!, $input: [ProductVariantChannelListingAddInput!]!) {
+  productVariantChannelListingUpdate(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+VARIANT_BULK_CREATE = """
+mutation VariantCreate($product: ID!, $variants: [ProductVariantBulkCreateInput!]!) {
+  productVariantBulkCreate(product: $product, variants: $variants) {
+    errors { field message }
+  }
+}
+"""
+
+PRODUCT_LISTING_UPDATE = """
+mutation ProductListing($id: ID!, $input: ProductChannelListingUpdateInput!) {
+  productChannelListingUpdate(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+METADATA_UPDATE = """
+mutation Metadata($id: ID!, $input: [MetadataInput!]!) {
+  updateMetadata(id: $id, input: $input) {
+    errors { field message }
+  }
+}
+"""
+
+LISTING_FLAGS = ("isPublished", "visibleInListings", "isAvailableForPurchase")
+
+
+class Reconciler:
+    """Diffs a desired-state document against the live catalog.
+
+    ``plan()`` only reads. ``apply()`` plans and then runs the minimal set
+    of mutations; for an unchanged catalog that set is empty. Failed product
+    mutations are printed and collected in ``errors`` by product slug. Pass
+    a loaded ``catalog`` to reuse it across reconcilers.
+    """
+
+    def __init__(self, client, desired, chunk_size=50, catalog=None):
+        self.client = client
+        self.desired = desired
+        self.chunk_size = chunk_size
+        self.registry = get_registry(client)
+        self.catalog = catalog or AttributeCatalog(client)
+        self.channel_id = self.registry.id("channel", slug=desired.get("channel", config.CHANNEL_SLUG))
+        self.mutations = 0
+        self.errors = {}
+
+    def plan(self):
+        return self._run(apply=False)
+
+    def apply(self):
+        return self._run(apply=True)
+
+    def _run(self, apply):
+        self._apply = apply
+        changes = self._categories(apply)
+        changes += self._attribute_values(apply)
+        changes += self._products(apply)
+        return changes
+
+    # Categories
+
+    def _categories(self, apply):
+        wanted = self.desired.get("categories", [])
+        if not wanted:
+            return []
+        live = {c["slug"]: c for c in iter_connection(self.client, CATEGORIES_QUERY, "categories", page_size=100)}
+        self._category_ids = {slug: c["id"] for slug, c in live.items()}
+
+        changes = []
+        for category in wanted:
+            current = live.get(category["slug"])
+            if current is None:
+                changes.append(Change("create", "category", category["slug"], ["name"]))
+                if apply:
+                    parent = self._category_ids.get(category.get("parent")) if category.get("parent") else None
+                    res = self._mutate(CATEGORY_CREATE, {
+                        "parent": parent,
+                        "input": {"name": category["name"], "slug": category["slug"]},
+                    }, "categoryCreate")
+                    created = res["category"]
+                    self._category_ids[created["slug"]] = created["id"]
+                    self.registry.record("category", created["id"], created["slug"], created["name"], parent)
+            elif category.get("name") and category["name"] != current["name"]:
+                changes.append(Change("update", "category", category["slug"], ["name"]))
+                if apply:
+                    self._mutate(CATEGORY_UPDATE, {"id": current["id"], "input": {"name": category["name"]}}, "categoryUpdate")
+        return changes
+
+    # Attribute values
+
+    def _attribute_values(self, apply):
+        wanted = {slug: list(names) for slug, names in self.desired.get("attributes", {}).items()}
+        # Dropdown values used by products must exist too.
+        for product in self.desired.get("products", []):
+            for slug, value in product.get("attributes", {}).items():
+                attribute = self.catalog.attribute(slug)
+                if attribute and attribute["inputType"] in ("DROPDOWN", "MULTISELECT", "SWATCH"):
+                    values = value if isinstance(value, list) else [value]
+                    wanted.setdefault(slug, []).extend(values)
+
+        changes = []
+        for slug, names in wanted.items():
+            for name in dict.fromkeys(names):
+                if self.catalog.value_id(slug, name=name) is None:
+                    changes.append(Change("create", "attribute_value", f"{slug}={name}", ["name"]))
+                    if apply:
+                        self.catalog.create_value(slug, name)
+                        self.mutations += 1
+        return changes
+
+    # Products
+
+    def _products(self, apply):
+        wanted = self.desired.get("products", [])
+        if not wanted:
+            return []
+        live = resolve_products(self.client, [p["slug"] for p in wanted], LIVE_PRODUCT_FIELDS)
+
+        changes, creates, deletes, jobs = [], [], [], []
+        for product in wanted:
+            current = live.get(product["slug"])
+            if product.get("delete"):
+                if current:
+                    changes.append(Change("delete", "product", product["slug"], []))
+                    deletes.append(current["id"])
+                continue
+
+            if current and product.get("productType") and not self._same_type(current, product["productType"]):
+                # The product type of an existing product cannot be changed.
+                changes.append(Change("delete", "product", product["slug"], ["productType"]))
+                deletes.append(current["id"])
+                current = None
+
+            if current is None:
+                changes.append(Change("create", "product", product["slug"], sorted(k for k in product if k != "slug")))
+                creates.append(product)
+                continue
+
+            for change, job in self._product_updates(product, current):
+                changes.append(change)
+                jobs.append((product["slug"], *job))
+
+        if apply:
+            if deletes:
+                bulk_delete_products(self.client, deletes, self.chunk_size, registry=self.registry)
+                self.mutations += -(-len(deletes) // self.chunk_size)
+            if creates:
+                self._create(creates)
+            results = run_concurrently(self.client, [(query, variables) for _, query, variables, _ in jobs])
+            for (slug, _, _, field), (data, error) in zip(jobs, results):
+                self.mutations += 1
+                errors = error or data[field]["errors"]
+                if errors:
+                    print(f"Error in {field} for {slug}:", errors)
+                    self.errors.setdefault(slug, []).extend(errors if isinstance(errors, list) else [str(errors)])
+        return changes
+
+    def _create(self, products, retry=True):
+        inputs = [self._create_input(p) for p in products]
+        stale = []
+        for product, (row, created, errors) in zip(products, bulk_create_products(self.client, inputs, self.chunk_size)):
+            if errors and retry and not_found(errors):
+                stale.append((product, row))
+            elif errors:
+                print(f"Error creating {row['slug']}:", errors)
+                self.errors.setdefault(row["slug"], []).extend(errors)
+            else:
+                self.registry.record("product", created["id"], created["slug"], row["name"])
+        self.mutations += -(-len(inputs) // self.chunk_size)
+        if stale:
+            # IDs from the registry that Saleor no longer knows (say, after a
+            # database reset): forget them, look them up again and retry once.
+            used = {"channel": {self.channel_id}, "product_type": set(), "category": set()}
+            for _, row in stale:
+                used["product_type"].add(row["productType"])
+                if row.get("category"):
+                    used["category"].add(row["category"])
+            for kind, ids in used.items():
+                self.registry.stale(kind, *ids)
+            self.channel_id = self.registry.id("channel", slug=self.desired.get("channel", config.CHANNEL_SLUG))
+            self._category_ids = {}
+            self._create([product for product, _ in stale], retry=False)
+
+    def _product_updates(self, product, current):
+        """Yield ``(Change, (query, variables, field))`` for every differing part."""
+        slug = product["slug"]
+        update, fields = {}, []
+
+        if "name" in product and product["name"] != current["name"]:
+            update["name"] = product["name"]
+            fields.append("name")
+        if "description" in product and not same_description(product["description"], current["description"]):
+            update["description"] = json.dumps(product["description"])
+            fields.append("description")
+        if "category" in product and product["category"] != (current["category"] or {}).get("slug"):
+            update["category"] = self._category_id(product["category"])
+            fields.append("category")
+
+        live_attributes = {a["attribute"]["slug"]: a for a in current["attributes"]}
+        attribute_inputs = []
+        for attr_slug, value in product.get("attributes", {}).items():
+            if not self._same_attribute(attr_slug, value, live_attributes.get(attr_slug)):
+                attribute_inputs.append(self._attribute_input(attr_slug, value))
+                fields.append(f"attributes.{attr_slug}")
+        if attribute_inputs:
+            update["attributes"] = attribute_inputs
+
+        if update:
+            yield Change("update", "product", slug, fields), (PRODUCT_UPDATE, {"id": current["id"], "input": update}, "productUpdate")
+
+        variant = product.get("variant")
+        if variant:
+            live_variant = next((v for v in current["variants"] if v["sku"] == variant["sku"]), None)
+            if live_variant is None:
+                yield (Change("create", "variant", slug, [variant["sku"]]),
+                       (VARIANT_BULK_CREATE, {"product": current["id"], "variants": [self._variant_input(variant)]}, "productVariantBulkCreate"))
+            elif "price" in variant and not self._same_price(live_variant, variant):
+                yield (Change("update", "price", slug, [variant["sku"]]),
+                       (VARIANT_PRICE_UPDATE, {"id": live_variant["id"], "input": [self._price_input(variant)]}, "productVariantChannelListingUpdate"))
+
+        listing = product.get("listing")
+        if listing is not None:
+            live_listing = next((l for l in current["channelListings"] if l["channel"]["id"] == self.channel_id), None)
+            if live_listing is None or any(listing.get(f, live_listing[f]) != live_listing[f] for f in LISTING_FLAGS):
+                channel = {"channelId": self.channel_id, **listing}
+                yield (Change("update", "listing", slug, sorted(listing)),
+                       (PRODUCT_LISTING_UPDATE, {"id": current["id"], "input": {"updateChannels": [channel]}}, "productChannelListingUpdate"))
+
+        metadata = product.get("metadata")
+        if metadata:
+            live_metadata = {m["key"]: m["value"] for m in current["metadata"]}
+            changed = [{"key": k, "value": str(v)} for k, v in metadata.items() if live_metadata.get(k) != str(v)]
+            if changed:
+                yield (Change("update", "metadata", slug, [m["key"] for m in changed]),
+                       (METADATA_UPDATE, {"id": current["id"], "input": changed}, "updateMetadata"))
+
+    def _create_input(self, product):
+        product_type = product["productType"]
+        row = {
+            "name": product["name"],
+            "slug": product["slug"],
+            "productType": self.registry.id("product_type", name=product_type) or self.registry.id("product_type", slug=product_type),
+            "attributes": [self._attribute_input(slug, value) for slug, value in product.get("attributes", {}).items()],
+        }
+        if "category" in product:
+            row["category"] = self._category_id(product["category"])
+        if "description" in product:
+            row["description"] = json.dumps(product["description"])
+        if product.get("metadata"):
+            row["metadata"] = [{"key": k, "value": str(v)} for k, v in product["metadata"].items()]
+        if product.get("listing") is not None:
+            row["channelListings"] = [{"channelId": self.channel_id, **product["listing"]}]
+        if product.get("variant"):
+            row["variants"] = [self._variant_input(product["variant"])]
+        return row
+
+    def _variant_input(self, variant):
+        row = {"sku": variant["sku"], "attributes": []}
+        if "price" in variant:
+            row["channelListings"] = [self._price_input(variant)]
+        return row
+
+    def _price_input(self, variant):
+        return {"channelId": self.channel_id, "price": variant["price"], "costPrice": variant.get("costPrice", variant["price"])}
+
+    def _same_price(self, live_variant, variant):
+        listing = next((l for l in live_variant["channelListings"] if l["channel"]["id"] == self.channel_id), None)
+        return bool(listing and listing["price"] and float(listing["price"]["amount"]) == float(variant["price"]))
+
+    def _same_type(self, current, product_type):
+        return product_type in (current["productType"]["name"], current["productType"]["slug"])
+
+    def _category_id(self, slug):
+        ids = getattr(self, "_category_ids", {})
+        found = ids.get(slug) or self.registry.id("category", slug=slug)
+        if found:
+            return found
+        if self._apply:
+            raise SaleorError(f"Unknown category: {slug} (list it under \"categories\" to create it)")
+        # Only ever shown in a plan.
+        return f"<new category {slug}>"
+
+    def _attribute_input(self, slug, value):
+        attribute = self.catalog.attribute(slug)
+        if attribute is None:
+            raise SaleorError(f"Unknown attribute: {slug}")
+        kind = attribute["inputType"]
+        if kind in ("DROPDOWN", "SWATCH"):
+            return {"id": attribute["id"], "dropdown": {"id": self._value_id(slug, value)}}
+        if kind == "MULTISELECT":
+            return {"id": attribute["id"], "multiselect": [{"id": self._value_id(slug, v)} for v in value]}
+        if kind == "RICH_TEXT":
+            return {"id": attribute["id"], "richText": json.dumps(value)}
+        if kind == "PLAIN_TEXT":
+            return {"id": attribute["id"], "plainText": value}
+        if kind == "NUMERIC":
+            return {"id": attribute["id"], "numeric": str(value)}
+        return {"id": attribute["id"], "values": [str(value)]}
+
+    def _value_id(self, slug, name):
+        found = self.catalog.value_id(slug, name=name)
+        if found:
+            return found
+        if self._apply:
+            # _attribute_values creates every value products use before they are written.
+            self.mutations += 1
+            return self.catalog.create_value(slug, name)
+        return f"<new value {slug}={name}>"
+
+    def _same_attribute(self, slug, value, live):
+        if live is None or not live["values"]:
+            return value in (None, "", [])
+        kind = live["attribute"]["inputType"]
+        values = live["values"]
+        if kind == "PLAIN_TEXT":
+            return values[0]["plainText"] == value
+        if kind == "RICH_TEXT":
+            return same_description(value, values[0]["richText"])
+        if kind == "MULTISELECT":
+            return sorted(v["name"] for v in values) == sorted(value)
+        return values[0]["name"] == str(value)
+
+    def _mutate(self, query, variables, field):
+        self.mutations += 1
+        payload = self.client.data(query, variables)[field]
+        if payload.get("errors"):
+            raise SaleorError(f"{field} failed", errors=payload["errors"])
+        return payload
+
+
+def same_description(desired, live):
+    """Compare EditorJS documents by block type and data only.
+
+    Saleor adds block IDs, ``time`` and ``version`` to what it stores.
+    """
+    if isinstance(live, str):
+        live = json.loads(live) if live else None
+    if not desired or not live:
+        return not desired and not live
+
+    def blocks(doc):
+        return [(b.get("type"), b.get("data")) for b in doc.get("blocks", [])]
+
+    return blocks(desired) == blocks(live)
+
+
+def format_plan(changes):
+    symbols = {"create": "+", "update": "~", "delete": "-"}
+    lines = []
+    for change in changes:
+        detail = f" ({', '.join(change.fields)})" if change.fields else ""
+        lines.append(f"{symbols[change.action]} {change.kind} {change.key}{detail}")
+    return "\n".join(lines) or "No changes."
+
+
+def reconcile(client, desired, dry_run=False, chunk_size=50):
+    """Plan (and unless ``dry_run``, apply) ``desired``; print and return the plan."""
+    reconciler = Reconciler(client, desired, chunk_size)
+    changes = reconciler.plan() if dry_run else reconciler.apply()
+    print(format_plan(changes))
+    if not dry_run:
+        print(f"{reconciler.mutations} mutation request(s) sent.")
+    return changes
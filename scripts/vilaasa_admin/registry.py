@@ -0,0 +1,260 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from . import config
+from .attributes import iter_attributes
+from .client import SaleorError, get_client
+from .pagination import iter_connection
+
+CHANNELS_QUERY = "query { channels { id slug name } }"
+
+PRODUCT_TYPES_QUERY = """
+query ProductTypes($first: Int!, $after: String) {
+  productTypes(first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { id slug name } }
+  }
+}
+"""
+
+CATEGORIES_QUERY = """
+query Categories($first: Int!, $after: String) {
+  categories(first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { id slug name parent { id } } }
+  }
+}
+"""
+
+PRODUCTS_QUERY = """
+query RegistryProducts($first: Int!, $after: String, $filter: ProductFilterInput) {
+  products(first: $first, after: $after, filter: $filter) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { id slug name } }
+  }
+}
+"""
+
+# "attribute_value" entries are loaded together with their attribute.
+KINDS = ("channel", "product_type", "category", "attribute", "product")
+
+# Bumped when SCHEMA changes; an older file is rebuilt (it is only a cache).
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    slug TEXT,
+    name TEXT,
+    parent TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (kind, id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS entities_slug ON entities (kind, parent, slug);
+CREATE INDEX IF NOT EXISTS entities_name ON entities (kind, parent, name);
+CREATE TABLE IF NOT EXISTS syncs (
+    kind TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL,
+    full_synced_at TEXT NOT NULL
+);
+"""
+
+
+def not_found(errors):
+    """Whether Saleor ``errors`` say that an ID in the request does not exist."""
+    return any(
+        error.get("code") == "NOT_FOUND" or "Couldn't resolve" in (error.get("message") or "")
+        for error in errors or [] if isinstance(error, dict)
+    )
+
+
+class Registry:
+    """On-disk slug/name -> global ID map for one Saleor server.
+
+    Lookups hit SQLite first. A miss refreshes only the kind that missed
+    (products incrementally through ``updatedAt``), at most once per process,
+    so warm runs resolve every ID without a round-trip. A kind last synced
+    more than ``ttl`` seconds ago is fully resynced on its first lookup in a
+    process, which also drops entities deleted elsewhere; callers told by
+    Saleor that an ID no longer exists pass it to ``stale()``.
+
+    Slugs are unique per kind (and parent). ``record()`` replaces any entry
+    with the same slug or name, so a re-created entity never loses to the
+    stale entry it replaces.
+    """
+
+    def __init__(self, client, path=None, ttl=None):
+        self.client = client
+        self.path = path or config.state_path("registry.sqlite3", client.url)
+        self.ttl = config.REGISTRY_TTL if ttl is None else ttl
+        self.db = sqlite3.connect(self.path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS entities; DROP TABLE IF EXISTS syncs;")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+        self._refreshed = set()
+
+    def id(self, kind, slug=None, name=None, parent=None):
+        """Return the ID of a ``kind`` entity by slug or name, or ``None``."""
+        synced = "attribute" if kind == "attribute_value" else kind
+        if synced not in self._refreshed and self._expired(synced):
+            self.refresh(synced, full=True)
+        found = self._lookup(kind, slug, name, parent)
+        if found is None and kind not in self._refreshed:
+            self.refresh(kind)
+            found = self._lookup(kind, slug, name, parent)
+        return found
+
+    def attribute_value(self, attribute_slug, slug=None, name=None):
+        attribute_id = self.id("attribute", slug=attribute_slug)
+        if attribute_id is None:
+            return None
+        return self.id("attribute_value", slug=slug, name=name, parent=attribute_id)
+
+    def record(self, kind, id, slug=None, name=None, parent=None):
+        """Remember an entity the caller just created, replacing entries with its slug or name."""
+        with self.db:
+            if name is not None:
+                self.db.execute("DELETE FROM entities WHERE kind = ? AND parent = ? AND name = ? AND id != ?",
+                                (kind, parent or "", name, id))
+            self.db.execute(
+                "INSERT OR REPLACE INTO entities (kind, id, slug, name, parent) VALUES (?, ?, ?, ?, ?)",
+                (kind, id, slug, name, parent or ""),
+            )
+
+    def forget(self, kind, id):
+        """Drop an entity the caller just deleted."""
+        with self.db:
+            self.db.execute("DELETE FROM entities WHERE kind = ? AND id = ?", (kind, id))
+            if kind == "attribute":
+                self.db.execute("DELETE FROM entities WHERE kind = 'attribute_value' AND parent = ?", (id,))
+
+    def stale(self, kind, *ids):
+        """Drop IDs Saleor reported as not found and resync their kind, so the next lookup is fresh."""
+        for id in ids:
+            self.forget(kind, id)
+        self.refresh(kind, full=True)
+
+    def clear(self):
+        """Forget everything; the next lookup of each kind resyncs it."""
+        with self.db:
+            self.db.execute("DELETE FROM entities")
+            self.db.execute("DELETE FROM syncs")
+        self._refreshed.clear()
+
+    def sync(self, kinds=KINDS, full=False):
+        """Fill the registry from a handful of paginated queries."""
+        for kind in kinds:
+            self.refresh(kind, full=full)
+
+    def refresh(self, kind, full=False):
+        # attribute values are loaded together with their attributes
+        if kind == "attribute_value":
+            kind = "attribute"
+        started = datetime.now(timezone.utc)
+        since = None if full else self._synced_at(kind)
+
+        full_synced_at = started.isoformat()
+        with self.db:
+            if kind == "product" and since:
+                # Leave a margin for clock skew between us and the server.
+                since = (datetime.fromisoformat(since) - timedelta(minutes=5)).isoformat()
+                rows = self._product_rows(since)
+                # An incremental sync does not see deletions.
+                full_synced_at = self._synced_at(kind, "full_synced_at")
+            else:
+                self.db.execute("DELETE FROM entities WHERE kind = ?", (kind,))
+                if kind == "attribute":
+                    self.db.execute("DELETE FROM entities WHERE kind = 'attribute_value'")
+                rows = self._rows(kind)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO entities (kind, id, slug, name, parent) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.db.execute("INSERT OR REPLACE INTO syncs (kind, synced_at, full_synced_at) VALUES (?, ?, ?)",
+                            (kind, started.isoformat(), full_synced_at))
+
+        self._refreshed.update({kind, "attribute_value"} if kind == "attribute" else {kind})
+
+    def _rows(self, kind):
+        if kind == "channel":
+            for node in self.client.data(CHANNELS_QUERY)["channels"]:
+                yield kind, node["id"], node["slug"], node["name"], ""
+        elif kind == "product_type":
+            for node in iter_connection(self.client, PRODUCT_TYPES_QUERY, "productTypes", page_size=100):
+                yield kind, node["id"], node["slug"], node["name"], ""
+        elif kind == "category":
+            for node in iter_connection(self.client, CATEGORIES_QUERY, "categories", page_size=100):
+                yield kind, node["id"], node["slug"], node["name"], (node["parent"] or {}).get("id", "")
+        elif kind == "attribute":
+            for attribute in iter_attributes(self.client):
+                yield kind, attribute["id"], attribute["slug"], attribute["name"], ""
+                for choice in attribute["choices"]:
+                    yield "attribute_value", choice["id"], choice["slug"], choice["name"], attribute["id"]
+        elif kind == "product":
+            yield from self._product_rows(None)
+        else:
+            raise ValueError(f"Unknown registry kind: {kind}")
+
+    def _product_rows(self, since):
+        product_filter = {"updatedAt": {"gte": since}} if since else {}
+        for node in iter_connection(self.client, PRODUCTS_QUERY, "products", {"filter": product_filter}, page_size=100):
+            yield "product", node["id"], node["slug"], node["name"], ""
+
+    def _lookup(self, kind, slug, name, parent):
+        if slug is not None:
+            column, value = "slug", slug
+        elif name is not None:
+            column, value = "name", name
+        else:
+            raise ValueError("Pass a slug or a name")
+
+        sql = f"SELECT id FROM entities WHERE kind = ? AND {column} = ?"
+        params = [kind, value]
+        if parent is not None:
+            sql += " AND parent = ?"
+            params.append(parent)
+        row = self.db.execute(sql + " ORDER BY rowid LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def _expired(self, kind):
+        synced_at = self._synced_at(kind, "full_synced_at")
+        if synced_at is None:
+            # Only entries recorded by callers, never checked against the server.
+            return self.db.execute("SELECT 1 FROM entities WHERE kind = ? LIMIT 1", (kind,)).fetchone() is not None
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(synced_at)
+        return age.total_seconds() > self.ttl
+
+    def _synced_at(self, kind, column="synced_at"):
+        row = self.db.execute(f"SELECT {column} FROM syncs WHERE kind = ?", (kind,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.db.close()
+
+
+_registries = {}
+
+
+def get_registry(client=None):
+    """Return the process-wide registry of ``client``'s server (default: the shared client)."""
+    client = client or get_client()
+    registry = _registries.get(client.url)
+    if registry is None:
+        registry = _registries[client.url] = Registry(client)
+    else:
+        registry.client = client
+    return registry
+
+
+def run_registry(client, action, full=False):
+    """CLI entry point: ``sync`` the registry from the server, or ``clear`` it."""
+    registry = get_registry(client)
+    if action == "clear":
+        registry.clear()
+        print(f"Cleared {registry.path}.")
+    elif action == "sync":
+        registry.sync(full=full)
+        counts = registry.db.execute("SELECT kind, COUNT(*) FROM entities GROUP BY kind ORDER BY kind").fetchall()
+        print(", ".join(f"{count} {kind}" for kind, count in counts) or "Nothing to sync.")
+    else:
+        raise SaleorError(f"Unknown registry action: {action}")
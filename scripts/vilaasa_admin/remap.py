@@ -0,0 +1,163 @@
+"""Move products from one attribute value to another, then delete the old value.
+
+Affected products are found with Saleor's attribute filter, selecting only
+their IDs and the one attribute being remapped, so the cost scales with the
+number of affected products rather than with the catalog. Updates go out as
+aliased ``productUpdate`` batches and the old values are removed with a
+single ``attributeValueBulkDelete``.
+"""
+from collections import namedtuple
+
+from . import config
+from .attributes import AttributeCatalog
+from .batch import aliased_document
+from .bulk import chunked
+from .client import SaleorError
+from .executor import run_concurrently
+from .pagination import iter_connection
+from .registry import get_registry
+
+Remap = namedtuple("Remap", "attribute bad good")
+
+AFFECTED_PRODUCTS_QUERY = """
+query RemapProducts($first: Int!, $after: String, $filter: ProductFilterInput, $attribute: String!) {
+  products(first: $first, after: $after, filter: $filter) {
+    pageInfo { hasNextPage endCursor }
+    edges { node { id attribute(slug: $attribute) { values { id } } } }
+  }
+}
+"""
+
+ATTRIBUTE_VALUE_BULK_DELETE = """
+mutation AttributeValueBulkDelete($ids: [ID!]!) {
+  attributeValueBulkDelete(ids: $ids) {
+    count
+    errors { field message }
+  }
+}
+"""
+
+CHOICE_TYPES = ("DROPDOWN", "MULTISELECT", "SWATCH")
+
+
+def parse_remap(text):
+    """Parse ``attribute:bad=good`` (values by ID, slug or name) into a ``Remap``."""
+    attribute, sep, rest = text.partition(":")
+    bad, sep2, good = rest.partition("=")
+    if not (sep and sep2 and attribute and bad and good):
+        raise ValueError(f"Expected ATTRIBUTE:BAD=GOOD, got {text!r}")
+    return Remap(attribute, bad, good)
+
+
+def find_value(catalog, attribute_slug, key):
+    """Return the value of an attribute given its ID, slug or name, or ``None``."""
+    found = catalog.value(key)
+    if found and found[0] == attribute_slug:
+        return found[1]
+    attribute = catalog.attribute(attribute_slug)
+    for field in ("slug", "name"):
+        for value in attribute["choices"]:
+            if value[field] == key:
+                return value
+    return None
+
+
+def remap_values(client, remaps, dry_run=False, delete=True, chunk_size=None, catalog=None):
+    """Apply ``(attribute, bad, good)`` remaps; return ``{"updated", "failed", "deleted"}``.
+
+    A bad value is deleted only once every product that used it was updated.
+    Bad values that no longer exist are skipped, so reruns are no-ops. Pass
+    a loaded ``catalog`` to reuse it.
+    """
+    catalog = catalog or AttributeCatalog(client)
+    mappings = {}  # attribute slug -> {bad value ID: good value ID}
+    bad_values = {}
+    for attribute_slug, bad, good in (Remap(*r) for r in remaps):
+        attribute = catalog.attribute(attribute_slug)
+        if attribute is None or attribute["inputType"] not in CHOICE_TYPES:
+            raise SaleorError(f"{attribute_slug} is not an attribute with choices")
+        bad_value = find_value(catalog, attribute_slug, bad)
+        good_value = find_value(catalog, attribute_slug, good)
+        if bad_value is None:
+            print(f"{attribute_slug}: {bad} not found, skipping.")
+            continue
+        if good_value is None:
+            raise SaleorError(f"{attribute_slug}: value {good} not found")
+        if bad_value["id"] == good_value["id"]:
+            continue
+        mappings.setdefault(attribute_slug, {})[bad_value["id"]] = good_value["id"]
+        bad_values[bad_value["id"]] = (attribute_slug, bad_value, good_value)
+
+    # Product ID -> attribute inputs, and the bad values each update removes.
+    updates, removes = {}, {}
+    affected = dict.fromkeys(bad_values, 0)
+    for attribute_slug, mapping in mappings.items():
+        attribute = catalog.attribute(attribute_slug)
+        slugs = [bad_values[bad_id][1]["slug"] for bad_id in mapping]
+        product_filter = {"attributes": [{"slug": attribute_slug, "values": slugs}]}
+        # Collected before updating: updates shrink the filtered set under the cursor.
+        for node in iter_connection(client, AFFECTED_PRODUCTS_QUERY, "products",
+                                    {"filter": product_filter, "attribute": attribute_slug}, page_size=100):
+            current = [v["id"] for v in (node["attribute"] or {}).get("values") or []]
+            remapped = list(dict.fromkeys(mapping.get(v, v) for v in current))
+            if remapped == current:
+                continue
+            updates.setdefault(node["id"], []).append(attribute_input(attribute, remapped))
+            for value_id in current:
+                if value_id in mapping:
+                    removes.setdefault(node["id"], set()).add(value_id)
+                    affected[value_id] += 1
+
+    for bad_id, (attribute_slug, bad_value, good_value) in bad_values.items():
+        if affected[bad_id]:
+            print(f"{attribute_slug}: {bad_value['slug']} -> {good_value['slug']} on {affected[bad_id]} product(s)")
+    unused = sum(1 for count in affected.values() if not count)
+    if unused:
+        print(f"{unused} old value(s) not used by any product.")
+    if dry_run:
+        return {"updated": 0, "failed": 0, "deleted": []}
+
+    failed = set()
+    ids = list(updates)
+    chunks = list(chunked(ids, chunk_size or config.BATCH_SIZE))
+    jobs = []
+    for chunk in chunks:
+        query = aliased_document("mutation", "RemapValues", "productUpdate", {"id": "ID!", "input": "ProductInput!"},
+                                 "errors { field message }", len(chunk))
+        variables = {}
+        for i, product_id in enumerate(chunk):
+            variables[f"id{i}"] = product_id
+            variables[f"input{i}"] = {"attributes": updates[product_id]}
+        jobs.append((query, variables))
+    for chunk, (data, error) in zip(chunks, run_concurrently(client, jobs)):
+        for i, product_id in enumerate(chunk):
+            errors = error or data[f"a{i}"]["errors"]
+            if errors:
+                print(f"Error remapping {product_id}:", errors)
+                failed.add(product_id)
+    kept = set().union(*(removes[product_id] for product_id in failed))
+
+    deleted = [bad_id for bad_id in bad_values if bad_id not in kept] if delete else []
+    if deleted:
+        payload = client.data(ATTRIBUTE_VALUE_BULK_DELETE, {"ids": deleted})["attributeValueBulkDelete"]
+        if payload["errors"]:
+            raise SaleorError("Could not delete the remapped values", errors=payload["errors"])
+        registry = get_registry(client)
+        for bad_id in deleted:
+            registry.forget("attribute_value", bad_id)
+            catalog.forget_value(bad_id)
+    print(f"{len(ids) - len(failed)} product(s) updated, {len(failed)} failed, {len(deleted)} value(s) deleted.")
+    return {"updated": len(ids) - len(failed), "failed": len(failed), "deleted": deleted}
+
+
+def attribute_input(attribute, value_ids):
+    kind = attribute["inputType"]
+    if kind == "MULTISELECT":
+        return {"id": attribute["id"], "multiselect": [{"id": v} for v in value_ids]}
+    key = "swatch" if kind == "SWATCH" else "dropdown"
+    return {"id": attribute["id"], key: {"id": value_ids[0]}}
+
+
+def run_remap(client, remaps, dry_run=False, keep=False):
+    """CLI entry point: ``remaps`` are ``attribute:bad=good`` strings."""
+    remap_values(client, [parse_remap(r) for r in remaps], dry_run=dry_run, delete=not keep)
@@ -0,0 +1,141 @@
+"""Static, content-hashed JSON snapshot of the storefront catalog.
+
+Runs the storefront's own ``PRODUCTS_QUERY`` and ``PRODUCT_BY_SLUG_QUERY``
+(read from src/lib/graphql.ts) as one paginated pass over the catalog, and
+writes their responses as static files a CDN can serve in place of the API:
+
+    <output>/manifest.json                   {"index": file, "products": {slug: file}, "categories": {slug: file}}
+    <output>/index.<hash>.json               ProductsResponse with every product
+    <output>/products/<slug>.<hash>.json     ProductBySlugResponse of one product
+    <output>/categories/<slug>.<hash>.json   ProductsResponse of one category
+
+Each shard is named by a hash of its content, so a file never changes once
+written and can be cached forever; only ``manifest.json`` needs a short
+cache lifetime. A rebuild writes only shards whose content changed, and
+removes shards referenced by neither the new manifest nor the previous one
+(pages still holding the previous manifest keep working).
+"""
+import hashlib
+import json
+import os
+import re
+
+from . import storefront
+from .client import SaleorClient
+from .pagination import iter_products
+
+MANIFEST = "manifest.json"
+SHARD = re.compile(r"\.[0-9a-f]{12}\.json$")
+
+
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class ShardWriter:
+    """Writes content-hashed files under ``root``, skipping the ones that exist."""
+
+    def __init__(self, root):
+        self.root = root
+        self.written = 0
+        self.unchanged = 0
+
+    def write(self, directory, name, value):
+        """Store ``value`` as ``<directory>/<name>.<hash>.json``; return its path relative to the root."""
+        data = dumps(value)
+        relative = shard_name(directory, f"{name}.{hashlib.sha256(data).hexdigest()[:12]}.json")
+        path = os.path.join(self.root, directory, os.path.basename(relative))
+        if os.path.exists(path):
+            self.unchanged += 1
+            return relative
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.written += 1
+        return relative
+
+
+def shard_name(directory, name):
+    # Manifest entries are URL paths, whatever the platform.
+    return f"{directory}/{name}" if directory else name
+
+
+def listing(nodes):
+    """A ``ProductsResponse`` for ``nodes``."""
+    return {"products": {"edges": [{"node": node} for node in nodes]}}
+
+
+def snapshot_catalog(client, output, source=storefront.GRAPHQL_TS):
+    """Write the snapshot to ``output``; return ``{"products", "written", "unchanged", "removed"}``.
+
+    Products are read without a token, as the storefront reads them, so
+    unpublished products stay out of the snapshot.
+    """
+    if client.token:
+        client = SaleorClient(url=client.url)
+    queries = storefront.documents(source)
+    list_tree = storefront.selection(queries["PRODUCTS_QUERY"], "node")
+    detail_tree = storefront.selection(queries["PRODUCT_BY_SLUG_QUERY"], "product")
+    # Slugs and categories name the shards even if the storefront stops selecting them.
+    fields = storefront.render(storefront.merge(list_tree, detail_tree, storefront.parse("{ slug category { slug } }")))
+    channel = storefront.argument(queries["PRODUCTS_QUERY"], "channel")
+
+    previous = read_manifest(output)
+    shards = ShardWriter(output)
+    index, categories, products = [], {}, {}
+    for node in iter_products(client, fields, channel=channel, page_size=100):
+        products[node["slug"]] = shards.write("products", node["slug"], {"product": storefront.project(node, detail_tree)})
+        card = storefront.project(node, list_tree)
+        index.append(card)
+        if node["category"]:
+            categories.setdefault(node["category"]["slug"], []).append(card)
+
+    manifest = {
+        "index": shards.write("", "index", listing(index)),
+        "products": products,
+        "categories": {slug: shards.write("categories", slug, listing(nodes)) for slug, nodes in categories.items()},
+    }
+    if manifest != previous:
+        tmp = os.path.join(output, f"{MANIFEST}.part")
+        with open(tmp, "wb") as f:
+            f.write(dumps(manifest))
+        os.replace(tmp, os.path.join(output, MANIFEST))
+    removed = prune(output, [manifest, previous or {}])
+    return {"products": len(index), "written": shards.written, "unchanged": shards.unchanged, "removed": removed}
+
+
+def read_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def prune(output, manifests):
+    """Delete shards under ``output`` that none of ``manifests`` references; return how many."""
+    keep = set()
+    for manifest in manifests:
+        if manifest:
+            keep.add(manifest["index"])
+            keep.update(manifest["products"].values())
+            keep.update(manifest["categories"].values())
+    removed = 0
+    for directory in ("", "products", "categories"):
+        path = os.path.join(output, directory)
+        if not os.path.isdir(path):
+            continue
+        for name in os.listdir(path):
+            if SHARD.search(name) and shard_name(directory, name) not in keep:
+                os.unlink(os.path.join(path, name))
+                removed += 1
+    return removed
+
+
+def run_snapshot(client, output, source=None):
+    """CLI entry point."""
+    counts = snapshot_catalog(client, output, source or storefront.GRAPHQL_TS)
+    print(f"Snapshot of {counts['products']} products in {output}: {counts['written']} shard(s) written, "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed.")
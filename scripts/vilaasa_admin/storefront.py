@@ -0,0 +1,108 @@
+"""The storefront's GraphQL documents, read from its TypeScript sources.
+
+Build steps that must ask exactly what the site asks take the queries from
+``src/lib/graphql.ts`` instead of keeping copies. Selections are handled as
+trees ``{response key: (head, subtree or None)}``, where ``head`` is the field
+as written (``alias: name(args)``); only what the storefront uses is parsed
+(fields, aliases, arguments; no fragments or directives).
+"""
+import os
+import re
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GRAPHQL_TS = os.path.join(REPO_ROOT, "src", "lib", "graphql.ts")
+
+# `const NAME = `...`` template strings (optionally tagged with gql).
+TEMPLATE = re.compile(r"\bconst\s+(\w+)\s*=\s*(?:gql\s*)?`([^`]*)`")
+OPERATION = re.compile(r"\s*(query|mutation|subscription)\b")
+TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|#[^\n]*|[{}():]|[^\s{}():,"#]+')
+
+
+def documents(path=GRAPHQL_TS):
+    """``{name: document}`` for the GraphQL operations defined as constants in a TypeScript file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return {name: body for name, body in TEMPLATE.findall(text) if OPERATION.match(body)}
+
+
+def parse(document):
+    """The selection tree of an operation (its root fields)."""
+    tokens = [(m.group(), m.start(), m.end()) for m in TOKEN.finditer(document) if not m.group().startswith("#")]
+    position = next(i for i, (token, _, _) in enumerate(tokens) if token == "{")
+
+    def block(i):
+        tree = {}
+        i += 1
+        while tokens[i][0] != "}":
+            key = head = tokens[i][0]
+            i += 1
+            if tokens[i][0] == ":":
+                head = f"{key}: {tokens[i + 1][0]}"
+                i += 2
+            if tokens[i][0] == "(":
+                start, depth = tokens[i][1], 0
+                while True:
+                    depth += {"(": 1, ")": -1}.get(tokens[i][0], 0)
+                    if depth == 0:
+                        break
+                    i += 1
+                head += document[start:tokens[i][2]]
+                i += 1
+            subtree = None
+            if tokens[i][0] == "{":
+                subtree, i = block(i)
+            tree[key] = (head, subtree)
+        return tree, i + 1
+
+    return block(position)[0]
+
+
+def find(tree, key):
+    """The ``(head, subtree)`` of the first field ``key`` in ``tree``, depth first, or ``None``."""
+    for name, (head, subtree) in tree.items():
+        if name == key:
+            return head, subtree
+        found = subtree and find(subtree, key)
+        if found:
+            return found
+    return None
+
+
+def selection(document, key):
+    """The selection tree of the first field ``key`` in ``document``."""
+    found = find(parse(document), key)
+    if found is None or found[1] is None:
+        raise ValueError(f"No {key} {{ ... }} selection in the document")
+    return found[1]
+
+
+def merge(*trees):
+    """One tree selecting everything any of ``trees`` selects."""
+    merged = {}
+    for tree in trees:
+        for key, (head, subtree) in tree.items():
+            if key in merged and merged[key][1] is not None and subtree is not None:
+                subtree = merge(merged[key][1], subtree)
+            merged[key] = (head, subtree)
+    return merged
+
+
+def render(tree):
+    """A tree as GraphQL selection text (without the outer braces)."""
+    return " ".join(head if subtree is None else f"{head} {{ {render(subtree)} }}"
+                    for head, subtree in tree.values())
+
+
+def project(value, tree):
+    """Keep only what ``tree`` selects of a response value."""
+    if value is None or tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return {key: project(value[key], subtree) for key, (_, subtree) in tree.items() if key in value}
+
+
+def argument(document, name):
+    """The first literal string argument ``name: "..."`` in ``document``, or ``None``."""
+    match = re.search(rf'\b{name}\s*:\s*"([^"]*)"', document)
+    return match.group(1) if match else None
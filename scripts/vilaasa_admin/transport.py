@@ -0,0 +1,217 @@
+"""Retries, backoff and adaptive rate limiting for requests to Saleor.
+
+``Transport.send()`` wraps every HTTP request the client makes:
+
+* a token bucket caps the request rate (``SALEOR_RATE_LIMIT`` per second,
+  unlimited by default);
+* an AIMD limiter caps requests in flight: starting at half of
+  ``SALEOR_CONCURRENCY``, it grows by one slot per window of successes up to
+  that ceiling and halves on overload (429, 502-504, timeouts, database lock
+  errors), so concurrency settles near what the backend sustains;
+* failed requests are retried with full-jitter exponential backoff,
+  honouring ``Retry-After``, but only when that is safe: queries and
+  idempotent mutations on any retryable failure, other mutations only when
+  the server cannot have run them (connection refused, 429, rolled-back
+  lock errors).
+"""
+import random
+import re
+import threading
+import time
+
+import requests
+import urllib3
+
+from . import config
+from .metrics import METRICS
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+# Statuses the server sends before doing any work; safe to retry any mutation.
+REJECTED_STATUS = {429}
+
+# Transient database errors Saleor surfaces as GraphQL errors. Lock errors
+# abort the mutation's transaction, so even non-idempotent ones can rerun.
+LOCK_ERRORS = re.compile(r"deadlock detected|could not obtain lock|lock timeout|could not serialize", re.IGNORECASE)
+CONNECTION_ERRORS = re.compile(r"server closed the connection|connection already closed", re.IGNORECASE)
+
+# Mutations that leave the same state however often they run.
+IDEMPOTENT_MUTATIONS = {
+    "tokenCreate", "tokenRefresh",
+    "productUpdate", "productDelete", "productBulkDelete",
+    "productChannelListingUpdate", "productVariantChannelListingUpdate",
+    "productVariantUpdate", "productVariantDelete",
+    "productMediaDelete",
+    "categoryUpdate", "categoryDelete",
+    "attributeUpdate", "attributeDelete",
+    "attributeValueUpdate", "attributeValueDelete", "attributeValueBulkDelete",
+    "productAttributeAssign",
+    "updateMetadata", "updatePrivateMetadata", "deleteMetadata", "deletePrivateMetadata",
+}
+
+_OPERATION = re.compile(r"^\s*(query|mutation|subscription)?\s*\w*\s*(\([^)]*\))?\s*\{", re.DOTALL)
+
+
+def is_idempotent(query):
+    """True for queries, and for mutations whose root fields are all idempotent."""
+    match = _OPERATION.match(query)
+    if match is None or match.group(1) != "mutation":
+        return True
+    body = query[match.end():]
+    fields = set()
+    depth = 0
+    # Root fields are the names at nesting depth 0 of the operation body.
+    for token in re.finditer(r"[{}()]|(?:\w+\s*:\s*)?\w+", body):
+        text = token.group(0)
+        if text in "{(":
+            depth += 1
+        elif text in "})":
+            depth -= 1
+        elif depth == 0:
+            fields.add(text.split(":")[-1].strip())
+    return bool(fields) and fields <= IDEMPOTENT_MUTATIONS
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted by additive increase / multiplicative decrease.
+
+    ``maximum`` is a hard ceiling (the connection pool size); the limit
+    starts at ``initial``, half the ceiling by default, so it has room to
+    probe upwards before it ever meets the ceiling.
+    """
+
+    def __init__(self, maximum, initial=None, minimum=1):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.limit = float(min(self.maximum, max(minimum, initial or maximum // 2)))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._sent = 0
+        self._decreased_at = 0
+
+    def acquire(self):
+        """Wait for a free slot; return a ticket to pass to ``release``."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self._sent += 1
+            return self._sent
+
+    def release(self, ticket, overloaded):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                # Only requests sent after the last decrease count, so one
+                # burst of failures halves the limit once, not once per request.
+                if ticket > self._decreased_at:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._decreased_at = self._sent
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class Transport:
+    def __init__(self, max_retries=None, rate=None, concurrency=None, backoff=0.25, max_backoff=10.0):
+        self.max_retries = config.MAX_RETRIES if max_retries is None else max_retries
+        self.bucket = TokenBucket(config.RATE_LIMIT if rate is None else rate)
+        self.limiter = AdaptiveLimiter(maximum=concurrency or config.CONCURRENCY)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def send(self, request, idempotent=True, rewind=None, operation=None):
+        """Call ``request()`` (returning a ``requests.Response``) with retries.
+
+        ``rewind`` is called before each retry to reset a streamed body. The
+        whole call, retries included, is recorded in ``metrics.METRICS``
+        under ``operation``.
+        """
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            ticket = self.limiter.acquire()
+            response = error = None
+            try:
+                response = request()
+            except requests.RequestException as e:
+                error = e
+            overloaded, retryable, rejected = self._classify(response, error)
+            self.limiter.release(ticket, overloaded)
+
+            safe = idempotent or rejected
+            if not retryable or not safe or attempt >= self.max_retries:
+                _record(operation, started, response, attempt, error)
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            if rewind:
+                rewind()
+            time.sleep(self._delay(attempt, response))
+
+    def _classify(self, response, error):
+        """Return ``(overloaded, retryable, rejected_before_processing)``."""
+        if error is not None:
+            return isinstance(error, requests.Timeout), True, _not_sent(error)
+        if response.status_code in RETRYABLE_STATUS:
+            return True, True, response.status_code in REJECTED_STATUS
+        if b'"errors"' in response.content[:1 << 16]:
+            if LOCK_ERRORS.search(response.text):
+                return True, True, True
+            if CONNECTION_ERRORS.search(response.text):
+                return True, True, False
+        return False, False, False
+
+    def _delay(self, attempt, response):
+        retry_after = response is not None and response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter: uniform over [0, base * 2^attempt], capped.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+def _not_sent(error):
+    """True if the request failed before any of it reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def _record(operation, started, response, retries, error):
+    sent = received = 0
+    if response is not None:
+        body = response.request.body
+        sent = len(body) if body is not None else 0
+        received = len(response.content)
+    failed = error is not None or response.status_code >= 500
+    METRICS.record(operation or "unknown", time.perf_counter() - started, sent, received, retries, failed)
@@ -8,6 +8,7 @@ import {
   SaleorProduct,
   ProductAttribute,
 } from "@/lib/graphql";
+import { parseConstructionMetadata } from "@/lib/construction";
 import {
   PropertyListItem,
   PropertyDetail,
@@ -324,13 +325,9 @@ export function useProperty(slug: string) {
 function transformToConstructionAsset(
   product: SaleorProduct,
 ): ConstructionAsset | null {
-  const meta = product.metadata?.find(
-    (m: any) => m.key === "construction_asset",
-  );
-  if (!meta) return null;
-
   try {
-    const data = JSON.parse(meta.value);
+    const data = parseConstructionMetadata(product);
+    if (!data) return null;
     return {
       id: product.slug,
       name: product.name,
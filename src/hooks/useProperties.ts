@@ -8,6 +8,7 @@ import {
   SaleorProduct,
   ProductAttribute,
 } from "@/lib/graphql";
+import { parseConstructionMetadata } from "@/lib/construction";
 import {
   PropertyListItem,
   PropertyDetail,
@@ -329,13 +330,9 @@ const DEFAULT_CONSTRUCTION_ASSET: ConstructionAsset = {
 function transformToConstructionAsset(
   product: SaleorProduct,
 ): ConstructionAsset | null {
-  const assetMeta = product.metadata?.find(
-    (m: any) => m.key === "construction_asset",
-  );
-  if (!assetMeta) return null;
-
   try {
-    const data = JSON.parse(assetMeta.value);
+    const data = parseConstructionMetadata(product);
+    if (!data) return null;
     return {
       id: product.slug,
       name: product.name,
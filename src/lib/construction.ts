@@ -0,0 +1,22 @@
+import type { SaleorProduct } from "@/lib/graphql";
+
+// Construction metadata: the published summary under "construction_asset"
+// (progress, milestones, latest photos). Products synced before summaries
+// were published may still have milestones and gallery under their own keys.
+// Summaries leave out entry ids, which only key the rendered lists, so
+// entries without one are numbered here.
+export function parseConstructionMetadata(product: SaleorProduct): any | null {
+  const value = (key: string) =>
+    product.metadata?.find((m: any) => m.key === key)?.value;
+  const core = value("construction_asset");
+  if (!core) return null;
+  const data = JSON.parse(core);
+  for (const key of ["milestones", "gallery"]) {
+    const part = value(`construction_asset.${key}`);
+    if (part) data[key] = JSON.parse(part);
+    if (Array.isArray(data[key])) {
+      data[key] = data[key].map((item: any, i: number) => ({ id: String(i + 1), ...item }));
+    }
+  }
+  return data;
+}